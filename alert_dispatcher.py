@@ -0,0 +1,495 @@
+import logging
+import os
+import random
+import threading
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from alert_manager import AlertManager, plugin_cache
+from database import db
+from models import AlertOutbox
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Plain copy of the application fields the plugins format into messages, so
+# alerts can be delivered after the application changed or was deleted
+AlertApplication = namedtuple(
+    "AlertApplication",
+    ["id", "name", "uuid", "expected_interval", "grace_period"],
+)
+
+
+class AlertDispatcher:
+    """
+    Delivers alerts from a durable outbox on background worker threads.
+
+    The heartbeat monitor only writes one ``AlertOutbox`` row per transition
+    and alert config. Every alert type has ``concurrency`` worker threads
+    that claim due rows in batches and hand them to the plugin, so a slow
+    SMTP server or webhook only delays alerts of its own type and never the
+    monitor's checks. Failed deliveries are retried with exponential backoff
+    and jitter until ``max_attempts`` is reached, and rows claimed by a
+    process that died become due again once the claim expires. Network calls
+    inside the plugins are bounded by ``ALERT_DELIVERY_TIMEOUT``.
+
+    New alerts wait ``coalesce_window`` seconds, and alerts claimed together
+    for the same destination (webhook, email address or phone number) are
+    sent as one digest, so an alert storm costs one message per destination
+    rather than one per application. Deliveries are paced by per-destination
+    token buckets; alerts over the limit stay queued until a token is free.
+
+    Until it is started, alerts are delivered inline and not retried.
+    """
+
+    def __init__(self, app=None, plugins=None):
+        self.app = None
+        self.plugins = plugins or AlertManager().plugins
+        self.plugin_cache = plugin_cache
+        self.rate_limiter = RateLimiter()
+        self.concurrency = int(os.getenv("ALERT_PLUGIN_CONCURRENCY", 2))
+        self.batch_size = int(os.getenv("ALERT_OUTBOX_BATCH_SIZE", 100))
+        self.coalesce_window = float(
+            os.getenv("ALERT_COALESCE_WINDOW", 2.0)
+        )  # seconds new alerts wait for others to the same destination
+        self.poll_interval = float(
+            os.getenv("ALERT_OUTBOX_POLL_INTERVAL", 1.0)
+        )  # seconds
+        self.claim_seconds = int(
+            os.getenv("ALERT_OUTBOX_CLAIM_SECONDS", 300)
+        )  # seconds before a crashed worker's batch is picked up again
+        self.max_attempts = int(os.getenv("ALERT_MAX_ATTEMPTS", 8))
+        self.retry_base_delay = float(os.getenv("ALERT_RETRY_BASE_DELAY", 5))
+        self.retry_max_delay = float(os.getenv("ALERT_RETRY_MAX_DELAY", 600))
+        self._threads = []
+        self._wakeups = {alert_type: threading.Event() for alert_type in self.plugins}
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {alert_type: self._new_stats() for alert_type in self.plugins}
+
+        if app is not None:
+            self.init_app(app)
+
+    @staticmethod
+    def _new_stats():
+        return {
+            "queued": 0,
+            "delivered": 0,
+            "failed": 0,
+            "dead": 0,
+            "digests": 0,
+            "deferred": 0,
+            "last_latency_seconds": 0.0,
+            "max_latency_seconds": 0.0,
+            "total_latency_seconds": 0.0,
+        }
+
+    def init_app(self, app):
+        self.app = app
+
+    @property
+    def running(self):
+        return bool(self._threads)
+
+    def start(self):
+        """Start the worker threads for every alert type"""
+        if self.running:
+            logger.warning("Alert dispatcher is already running")
+            return
+
+        if not self.app:
+            raise RuntimeError("Alert dispatcher requires a Flask app")
+
+        self._stop_event.clear()
+        for alert_type in self.plugins:
+            for number in range(self.concurrency):
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(alert_type,),
+                    name=f"alert-{alert_type}-{number}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        logger.info(
+            f"Alert dispatcher started - {self.concurrency} workers per alert type"
+        )
+
+    def stop(self):
+        """
+        Stop the workers after their current delivery
+
+        Alerts still in the outbox are delivered after the next start.
+        """
+        if not self.running:
+            return
+
+        self._stop_event.set()
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        logger.info("Alert dispatcher stopped")
+
+    def dispatch(self, alert_type, configuration, application, kind, context):
+        """
+        Queue an alert for delivery (requires an app context)
+
+        Args:
+            alert_type: Plugin name, e.g. ``"slack"``
+            configuration: The alert config's plugin configuration
+            application: Application (or any object with the same fields)
+            kind: ``"missed_heartbeat"`` or ``"recovery"``
+            context: Alert context dictionary passed to the plugin
+
+        Returns:
+            True if the alert was queued (or delivered inline), False if the
+            alert type is unknown, the outbox write or inline delivery failed
+        """
+        if alert_type not in self.plugins:
+            logger.error(f"Unknown alert type: {alert_type}")
+            return False
+
+        snapshot = AlertApplication(
+            application.id,
+            application.name,
+            application.uuid,
+            application.expected_interval,
+            application.grace_period,
+        )
+
+        if not self.running:
+            return (
+                self._deliver(alert_type, configuration, snapshot, kind, context)
+                is None
+            )
+
+        try:
+            db.session.add(
+                AlertOutbox(
+                    alert_type=alert_type,
+                    kind=kind,
+                    configuration=configuration,
+                    application=snapshot._asdict(),
+                    context=_encode_context(context),
+                    next_attempt_at=datetime.now()
+                    + timedelta(seconds=self.coalesce_window),
+                )
+            )
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                f"Failed to queue {kind} alert for {application.name}: {str(e)}"
+            )
+            return False
+
+        self._increment(alert_type, "queued")
+        self._wakeups[alert_type].set()
+        return True
+
+    def get_status(self):
+        """
+        Get outbox depth, delivery latency and failure counts per alert type
+        """
+        with self._stats_lock:
+            plugins = {
+                alert_type: dict(stats) for alert_type, stats in self._stats.items()
+            }
+
+        counts = {}
+        if self.app:
+            with self.app.app_context():
+                counts = {
+                    (alert_type, status): count
+                    for alert_type, status, count in db.session.execute(
+                        select(
+                            AlertOutbox.alert_type,
+                            AlertOutbox.status,
+                            func.count(),
+                        ).group_by(AlertOutbox.alert_type, AlertOutbox.status)
+                    )
+                }
+
+        for alert_type, stats in plugins.items():
+            stats["pending"] = counts.get((alert_type, "pending"), 0)
+            stats["undeliverable"] = counts.get((alert_type, "failed"), 0)
+
+        return {
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "max_attempts": self.max_attempts,
+            "plugin_cache": self.plugin_cache.get_status(),
+            "rate_limits": self.rate_limiter.get_status(),
+            "plugins": plugins,
+        }
+
+    def _run(self, alert_type):
+        wakeup = self._wakeups[alert_type]
+
+        with self.app.app_context():
+            while not self._stop_event.is_set():
+                try:
+                    claimed = self._process_batch(alert_type)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error processing {alert_type} alerts: {str(e)}")
+                    claimed = 0
+                finally:
+                    db.session.remove()
+
+                if not claimed:
+                    wakeup.wait(self.poll_interval)
+                    wakeup.clear()
+
+    def _process_batch(self, alert_type):
+        """
+        Claim and deliver a batch of due alerts
+
+        Returns:
+            Number of alerts claimed
+        """
+        alerts = self._claim(alert_type)
+        groups = self._group_by_destination(alert_type, alerts)
+
+        for position, (destination, plugin, group) in enumerate(groups):
+            if self._stop_event.is_set():
+                self._release(
+                    [alert for _, _, rest in groups[position:] for alert in rest]
+                )
+                break
+
+            if destination is not None:
+                wait = self.rate_limiter.try_acquire(alert_type, destination)
+                if wait > 0:
+                    # Hold the alerts back instead of failing against the
+                    # provider; more may join them in a digest meanwhile
+                    self._release(group, delay=wait)
+                    self._increment(alert_type, "deferred", len(group))
+                    continue
+
+            if len(group) == 1:
+                alert = group[0]
+                error = self._deliver(
+                    alert.alert_type,
+                    alert.configuration,
+                    AlertApplication(**alert.application),
+                    alert.kind,
+                    _decode_context(alert.context),
+                )
+            else:
+                error = self._deliver_digest(alert_type, plugin, group)
+
+            for alert in group:
+                self._complete(alert, error)
+
+        return len(alerts)
+
+    def _group_by_destination(self, alert_type, alerts):
+        """
+        Combine alerts headed for the same destination
+
+        Returns:
+            List of (destination, plugin, alerts) tuples in claim order
+        """
+        groups = {}
+
+        for alert in alerts:
+            try:
+                plugin = self.plugin_cache.get(
+                    alert_type, self.plugins[alert_type], alert.configuration
+                )
+                destination = plugin.destination()
+            except Exception as e:
+                self._complete(alert, str(e))
+                continue
+
+            key = destination if destination is not None else ("alert", alert.id)
+            groups.setdefault(key, (destination, plugin, []))[2].append(alert)
+
+        return list(groups.values())
+
+    def _claim(self, alert_type):
+        """
+        Take ownership of up to ``batch_size`` due alerts
+
+        Claiming pushes ``next_attempt_at`` past the claim timeout, so other
+        workers skip the rows while they are being delivered.
+        """
+        token = uuid.uuid4().hex
+        now = datetime.now()
+        due = (
+            select(AlertOutbox.id)
+            .where(
+                AlertOutbox.status == "pending",
+                AlertOutbox.alert_type == alert_type,
+                AlertOutbox.next_attempt_at <= now,
+            )
+            .order_by(AlertOutbox.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        db.session.execute(
+            update(AlertOutbox)
+            .where(
+                AlertOutbox.id.in_(due),
+                AlertOutbox.status == "pending",
+                AlertOutbox.next_attempt_at <= now,
+            )
+            .values(
+                claim_token=token,
+                next_attempt_at=now + timedelta(seconds=self.claim_seconds),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        return list(
+            db.session.execute(
+                select(AlertOutbox)
+                .where(AlertOutbox.claim_token == token)
+                .order_by(AlertOutbox.id)
+            ).scalars()
+        )
+
+    def _complete(self, alert, error):
+        """
+        Delete a delivered alert or schedule its next attempt
+        """
+        if error is None:
+            self._record(alert.alert_type, "delivered", alert.created_at)
+            db.session.delete(alert)
+            db.session.commit()
+            return
+
+        alert.attempts += 1
+        alert.last_error = error
+        alert.claim_token = None
+        self._increment(alert.alert_type, "failed")
+
+        if alert.attempts >= self.max_attempts:
+            alert.status = "failed"
+            self._increment(alert.alert_type, "dead")
+            logger.error(
+                f"Giving up on {alert.alert_type} {alert.kind} alert {alert.id} "
+                f"after {alert.attempts} attempts"
+            )
+        else:
+            alert.next_attempt_at = datetime.now() + timedelta(
+                seconds=self._retry_delay(alert.attempts)
+            )
+
+        db.session.commit()
+
+    def _release(self, alerts, delay=0):
+        """Hand claimed but undelivered alerts back to the outbox"""
+        next_attempt_at = datetime.now() + timedelta(seconds=delay)
+        for alert in alerts:
+            alert.claim_token = None
+            alert.next_attempt_at = next_attempt_at
+        db.session.commit()
+
+    def _retry_delay(self, attempts):
+        """
+        Exponential backoff, jittered so alerts that failed together during
+        an outage do not all retry at the same moment
+        """
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _deliver(self, alert_type, configuration, application, kind, context):
+        """
+        Send a single alert through its plugin
+
+        Returns:
+            None if the plugin delivered the alert, otherwise the error message
+        """
+        try:
+            plugin = self.plugin_cache.get(
+                alert_type, self.plugins[alert_type], configuration
+            )
+
+            if kind == "missed_heartbeat":
+                plugin.send_failure_alert(application, context)
+            elif kind == "recovery":
+                plugin.send_recovery_alert(application, context)
+
+        except Exception as e:
+            logger.error(
+                f"Alert plugin {alert_type} failed for {application.name}: {str(e)}"
+            )
+            return str(e) or type(e).__name__
+
+        logger.info(f"Sent {kind} alert via {alert_type}")
+        return None
+
+    def _deliver_digest(self, alert_type, plugin, alerts):
+        """
+        Send alerts for one destination as a single digest
+
+        Returns:
+            None if the plugin delivered the digest, otherwise the error message
+        """
+        try:
+            plugin.send_digest(
+                [
+                    (
+                        AlertApplication(**alert.application),
+                        alert.kind,
+                        _decode_context(alert.context),
+                    )
+                    for alert in alerts
+                ]
+            )
+        except Exception as e:
+            logger.error(
+                f"Alert plugin {alert_type} failed to send a digest of "
+                f"{len(alerts)} alerts: {str(e)}"
+            )
+            return str(e) or type(e).__name__
+
+        logger.info(f"Sent digest of {len(alerts)} alerts via {alert_type}")
+        self._increment(alert_type, "digests")
+        return None
+
+    def _record(self, alert_type, outcome, created_at):
+        latency = (datetime.now() - created_at).total_seconds()
+
+        with self._stats_lock:
+            stats = self._stats[alert_type]
+            stats[outcome] += 1
+            stats["last_latency_seconds"] = latency
+            stats["total_latency_seconds"] += latency
+            stats["max_latency_seconds"] = max(stats["max_latency_seconds"], latency)
+
+    def _increment(self, alert_type, counter, amount=1):
+        with self._stats_lock:
+            self._stats[alert_type][counter] += amount
+
+
+def _encode_context(context):
+    """Make an alert context JSON serializable, keeping datetimes intact"""
+    return {
+        key: {"$datetime": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in context.items()
+    }
+
+
+def _decode_context(context):
+    return {
+        key: (
+            datetime.fromisoformat(value["$datetime"])
+            if isinstance(value, dict) and "$datetime" in value
+            else value
+        )
+        for key, value in context.items()
+    }
+
+
+alert_dispatcher = AlertDispatcher()
@@ -1,4 +1,11 @@
+import hashlib
+import json
 import logging
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event
 
 from alert_plugins.discord_plugin import DiscordAlertPlugin
 from alert_plugins.email_plugin import EmailAlertPlugin
@@ -9,6 +16,87 @@ from models import ApplicationAlertConfig
 logger = logging.getLogger(__name__)
 
 
+class PluginCache:
+    """
+    LRU cache of configured alert plugin instances.
+
+    Entries are keyed by alert type and a fingerprint of the configuration,
+    so unchanged alert configs reuse a validated plugin whose clients
+    (Twilio, HTTP and SMTP connections) stay warm between alerts, while an
+    edited config simply gets a new instance. Instances are shared between
+    alert workers and must not keep per-alert state.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or int(os.getenv("ALERT_PLUGIN_CACHE_SIZE", 256))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def fingerprint(configuration):
+        encoded = json.dumps(configuration, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def get(self, alert_type, plugin_class, configuration):
+        """
+        Get the plugin for a configuration, creating it on a miss
+
+        Raises:
+            ValueError: If the plugin rejects the configuration
+        """
+        key = (alert_type, self.fingerprint(configuration))
+
+        with self._lock:
+            plugin = self._entries.get(key)
+            if plugin is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return plugin
+            self._stats["misses"] += 1
+
+        plugin = plugin_class(configuration)
+
+        with self._lock:
+            self._entries[key] = plugin
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+        return plugin
+
+    def invalidate(self, alert_type, configuration):
+        """Drop the plugin for a configuration that was changed or deleted"""
+        with self._lock:
+            self._entries.pop((alert_type, self.fingerprint(configuration)), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_status(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        stats["max_size"] = self.max_size
+        return stats
+
+
+plugin_cache = PluginCache()
+
+
+@event.listens_for(ApplicationAlertConfig.configuration, "set", active_history=True)
+def _invalidate_replaced_configuration(target, value, oldvalue, initiator):
+    """Release the plugin built for an alert config's previous configuration"""
+    if isinstance(oldvalue, dict) and oldvalue != value:
+        plugin_cache.invalidate(target.alert_type, oldvalue)
+
+
+@event.listens_for(ApplicationAlertConfig, "before_delete")
+def _invalidate_deleted_configuration(mapper, connection, target):
+    plugin_cache.invalidate(target.alert_type, target.configuration)
+
+
 class AlertManager:
     """
     Manages alert plugins and sends notifications
@@ -64,7 +152,9 @@ class AlertManager:
             return
 
         try:
-            plugin = plugin_class(alert_config.configuration)
+            plugin = plugin_cache.get(
+                alert_config.alert_type, plugin_class, alert_config.configuration
+            )
 
             # Create alert context from result
             alert_context = (
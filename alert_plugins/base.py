@@ -1,5 +1,7 @@
 import logging
+import os
 from abc import ABC, abstractmethod
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,7 @@ class BaseAlertPlugin(ABC):
 
     def __init__(self, config):
         self.config = config
+        self.timeout = float(os.getenv("ALERT_DELIVERY_TIMEOUT", 10))  # seconds
         self.validate_config()
 
     @abstractmethod
@@ -43,6 +46,70 @@ class BaseAlertPlugin(ABC):
         """
         pass
 
+    def destination(self):
+        """
+        Identify where this plugin delivers, e.g. a webhook URL
+
+        Alerts for the same destination are combined into one digest during
+        an alert storm. Plugins returning None never have their alerts
+        combined.
+        """
+        return None
+
+    def send_digest(self, alerts):
+        """
+        Send several alerts to this plugin's destination as one message
+
+        Plugins that support digests override this; the default sends each
+        alert on its own.
+
+        Args:
+            alerts: List of (application, kind, alert_context) tuples, where
+                kind is ``"missed_heartbeat"`` or ``"recovery"``
+        """
+        for application, kind, alert_context in alerts:
+            if kind == "missed_heartbeat":
+                self.send_failure_alert(application, alert_context)
+            elif kind == "recovery":
+                self.send_recovery_alert(application, alert_context)
+
+    def format_digest_message(self, alerts, max_listed=50):
+        """
+        Format a digest message listing every application in ``alerts``
+        """
+        sections = []
+        for kind, heading in (
+            ("missed_heartbeat", "🚨 HEARTBEATS MISSED"),
+            ("recovery", "✅ HEARTBEATS RECOVERED"),
+        ):
+            applications = [
+                application
+                for application, alert_kind, _ in alerts
+                if alert_kind == kind
+            ]
+            if not applications:
+                continue
+
+            lines = [f"{heading}: {len(applications)} applications", ""]
+            lines.extend(
+                f"- {application.name} ({application.uuid})"
+                for application in applications[:max_listed]
+            )
+            if len(applications) > max_listed:
+                lines.append(f"... and {len(applications) - max_listed} more")
+            sections.append("\n".join(lines))
+
+        sections.append(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def digest_counts(alerts):
+        """
+        Count the missed and recovered applications in a digest
+        """
+        missed = sum(1 for _, kind, _ in alerts if kind == "missed_heartbeat")
+        return missed, len(alerts) - missed
+
     def format_failure_message(self, application, alert_context):
         """
         Format a failure alert message
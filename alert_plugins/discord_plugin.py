@@ -1,8 +1,7 @@
 import logging
 
-import requests
-
 from .base import BaseAlertPlugin
+from .http_session import webhook_session
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +25,15 @@ class DiscordAlertPlugin(BaseAlertPlugin):
         message = self.format_recovery_message(application, alert_context)
         self._send_discord_message(message, color=0x00FF00)  # Green
 
+    def destination(self):
+        return ("discord", self.config["webhook_url"])
+
+    def send_digest(self, alerts):
+        missed, _ = self.digest_counts(alerts)
+        # Embed descriptions are limited to 4096 characters
+        message = self.format_digest_message(alerts, max_listed=40)
+        self._send_discord_message(message, color=0xFF0000 if missed else 0x00FF00)
+
     def _send_discord_message(self, message, color=0xFFAA00):
         try:
             webhook_url = self.config["webhook_url"]
@@ -36,7 +44,9 @@ class DiscordAlertPlugin(BaseAlertPlugin):
                 "embeds": [{"description": message, "color": color}],
             }
 
-            response = requests.post(webhook_url, json=payload, timeout=10)
+            response = webhook_session.post(
+                webhook_url, json=payload, timeout=self.timeout
+            )
             response.raise_for_status()
 
             logger.info("Discord message sent successfully")
@@ -1,10 +1,10 @@
 import logging
 import os
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
 from .base import BaseAlertPlugin
+from .smtp_pool import smtp_pool
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,18 @@ class EmailAlertPlugin(BaseAlertPlugin):
         message = self.format_recovery_message(application, alert_context)
         self._send_email(subject, message)
 
+    def destination(self):
+        return ("email", self.config["to_email"])
+
+    def send_digest(self, alerts):
+        missed, recovered = self.digest_counts(alerts)
+        if missed:
+            subject = f"[ALERT] {missed} applications missed heartbeats"
+        else:
+            subject = f"[RECOVERY] {recovered} applications resumed heartbeats"
+        message = self.format_digest_message(alerts, max_listed=500)
+        self._send_email(subject, message)
+
     def _send_email(self, subject, message):
         try:
             # Use environment variables or config defaults
@@ -52,12 +64,10 @@ class EmailAlertPlugin(BaseAlertPlugin):
             msg["Subject"] = subject
             msg.attach(MIMEText(message, "plain"))
 
-            # Send email
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(username, password)
-            server.send_message(msg)
-            server.quit()
+            # Send email over a pooled, already authenticated connection
+            smtp_pool.send_message(
+                msg, smtp_server, smtp_port, username, password, timeout=self.timeout
+            )
 
             logger.info(f"Email sent to {to_email}")
 
@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookRetry(Retry):
+    """Retry policy that caps how long a ``Retry-After`` header can stall"""
+
+    def __init__(self, *args, max_retry_after=30, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def parse_retry_after(self, retry_after):
+        return min(super().parse_retry_after(retry_after), self.max_retry_after)
+
+
+class WebhookSession:
+    """
+    Shared keep-alive HTTP session for the webhook plugins.
+
+    Connections are pooled per host, so a burst of Slack or Discord alerts
+    reuses a few TLS connections instead of opening one per message.
+    Connection failures and ``429`` responses are retried with backoff,
+    honouring ``Retry-After`` up to ``HTTP_MAX_RETRY_AFTER`` seconds. Both
+    mean the webhook never handled the message, so a retry cannot post it
+    twice. ``5xx`` responses and read errors are not retried here - the
+    message may already be posted, and the alert dispatcher's outbox
+    retries failed deliveries with its own backoff. urllib3's pools are
+    thread-safe, so every alert worker shares the one session.
+    """
+
+    def __init__(self):
+        self.pool_connections = int(
+            os.getenv("HTTP_POOL_CONNECTIONS", 10)
+        )  # hosts to keep pools for
+        self.pool_size = int(os.getenv("HTTP_POOL_SIZE", 10))  # connections per host
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", 2))
+        self.max_retry_after = float(
+            os.getenv("HTTP_MAX_RETRY_AFTER", 30)
+        )  # seconds to wait for a throttled webhook
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        retry = WebhookRetry(
+            total=self.max_retries,
+            read=0,  # The webhook may already have posted the message
+            backoff_factor=0.5,
+            backoff_max=self.max_retry_after,
+            status_forcelist=(429,),  # 5xx is left to the alert outbox
+            allowed_methods=None,
+            raise_on_status=False,
+            max_retry_after=self.max_retry_after,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            session, self._session = self._session, None
+
+        if session is not None:
+            session.close()
+
+
+webhook_session = WebhookSession()
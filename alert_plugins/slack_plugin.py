@@ -1,8 +1,7 @@
 import logging
 
-import requests
-
 from .base import BaseAlertPlugin
+from .http_session import webhook_session
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +25,14 @@ class SlackAlertPlugin(BaseAlertPlugin):
         message = self.format_recovery_message(application, alert_context)
         self._send_slack_message(message, color="good")
 
+    def destination(self):
+        return ("slack", self.config["webhook_url"], self.config.get("channel"))
+
+    def send_digest(self, alerts):
+        missed, _ = self.digest_counts(alerts)
+        message = self.format_digest_message(alerts)
+        self._send_slack_message(message, color="danger" if missed else "good")
+
     def _send_slack_message(self, message, color="warning"):
         try:
             webhook_url = self.config["webhook_url"]
@@ -42,7 +49,9 @@ class SlackAlertPlugin(BaseAlertPlugin):
             if channel:
                 payload["channel"] = channel
 
-            response = requests.post(webhook_url, json=payload, timeout=10)
+            response = webhook_session.post(
+                webhook_url, json=payload, timeout=self.timeout
+            )
             response.raise_for_status()
 
             logger.info("Slack message sent successfully")
@@ -1,6 +1,7 @@
 import logging
 import os
 
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 
 from .base import BaseAlertPlugin
@@ -13,6 +14,8 @@ class SMSAlertPlugin(BaseAlertPlugin):
     SMS alert plugin using Twilio
     """
 
+    _client = None
+
     def validate_config(self):
         required_fields = ["to_number"]
         for field in required_fields:
@@ -33,6 +36,18 @@ class SMSAlertPlugin(BaseAlertPlugin):
         )
         self._send_sms(message)
 
+    def destination(self):
+        return ("sms", self.config["to_number"])
+
+    def send_digest(self, alerts):
+        missed, recovered = self.digest_counts(alerts)
+        parts = []
+        if missed:
+            parts.append(f"ALERT: {missed} apps missed heartbeats")
+        if recovered:
+            parts.append(f"RECOVERY: {recovered} apps resumed heartbeats")
+        self._send_sms("\n".join(parts))
+
     def _send_sms(self, message):
         try:
             # Use config or environment variables
@@ -48,7 +63,15 @@ class SMSAlertPlugin(BaseAlertPlugin):
             if not account_sid or not auth_token or not from_number:
                 raise ValueError("Twilio credentials not configured")
 
-            client = Client(account_sid, auth_token)
+            # Plugins are cached per configuration, so the client and its
+            # connection pool are reused across alerts
+            if self._client is None:
+                self._client = Client(
+                    account_sid,
+                    auth_token,
+                    http_client=TwilioHttpClient(timeout=self.timeout),
+                )
+            client = self._client
 
             message = client.messages.create(
                 body=message, from_=from_number, to=to_number
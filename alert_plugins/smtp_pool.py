@@ -0,0 +1,150 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP connections shared between email alerts.
+
+    Connections are keyed by server, port and username and returned to the
+    pool after each message, so a burst of alerts to the same provider
+    pays for one STARTTLS handshake and login instead of one per message.
+    Idle connections are checked with NOOP before reuse and replaced when
+    the server has dropped them.
+    """
+
+    def __init__(self):
+        self.max_idle = int(os.getenv("SMTP_POOL_SIZE", 4))  # per server and user
+        self.idle_timeout = float(
+            os.getenv("SMTP_POOL_IDLE_TIMEOUT", 60)
+        )  # seconds, most servers drop idle sessions after a few minutes
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "reused": 0, "discarded": 0, "sent": 0}
+
+    def send_message(self, message, server, port, username, password, timeout=None):
+        """
+        Send a message over a pooled connection
+
+        A reused connection that turns out to be dead is replaced once
+        before giving up. A message the server rejects is not retried and
+        its connection goes back to the pool.
+        """
+        key = (server, int(port), username)
+
+        while True:
+            connection = self._checkout(key)
+            reused = connection is not None
+            if not reused:
+                connection = self._connect(key, password, timeout)
+
+            try:
+                connection.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                self._discard(connection)
+                if reused:
+                    continue
+                raise
+            except smtplib.SMTPException:
+                # The server rejected this message and may have accepted some
+                # recipients already, so never resend; the session is fine
+                self._checkin(key, connection)
+                raise
+            except OSError:
+                # SMTPException is an OSError too, this is a broken socket
+                self._discard(connection)
+                if reused:
+                    continue
+                raise
+
+            self._checkin(key, connection)
+            self._increment("sent")
+            return
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for connections in idle.values():
+            for connection, _ in connections:
+                self._quit(connection)
+
+    def get_status(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = sum(len(connections) for connections in self._idle.values())
+        return stats
+
+    def _checkout(self, key):
+        """
+        Take the most recently used live connection for ``key``, if any
+        """
+        while True:
+            with self._lock:
+                connections = self._idle.get(key)
+                if not connections:
+                    return None
+                connection, returned_at = connections.pop()
+
+            if time.monotonic() - returned_at > self.idle_timeout:
+                self._discard(connection)
+                continue
+
+            try:
+                alive = connection.noop()[0] == 250
+            except (smtplib.SMTPException, OSError):
+                alive = False
+
+            if alive:
+                self._increment("reused")
+                return connection
+
+            self._discard(connection)
+
+    def _connect(self, key, password, timeout):
+        server, port, username = key
+
+        connection = smtplib.SMTP(server, port, timeout=timeout)
+        try:
+            connection.starttls()
+            connection.login(username, password)
+        except Exception:
+            self._quit(connection)
+            raise
+
+        self._increment("opened")
+        logger.debug(f"Opened SMTP connection to {server}:{port} as {username}")
+        return connection
+
+    def _checkin(self, key, connection):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.max_idle:
+                connections.append((connection, time.monotonic()))
+                return
+
+        self._quit(connection)
+
+    def _discard(self, connection):
+        self._increment("discarded")
+        self._quit(connection)
+
+    @staticmethod
+    def _quit(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def _increment(self, counter, amount=1):
+        with self._lock:
+            self._stats[counter] += amount
+
+
+smtp_pool = SMTPConnectionPool()
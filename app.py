@@ -4,7 +4,8 @@ import os
 from dotenv import load_dotenv
 from flask import Flask
 
-from database import db
+from database import db, upgrade_schema
+from sqlite_engine import sqlite_engine
 
 load_dotenv()
 
@@ -15,27 +16,75 @@ app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
 )
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+sqlite_engine.configure(app)
 db.init_app(app)
 
 logging.basicConfig(level=logging.INFO)
+# The monitor reschedules its deadline job on every wakeup, keep that quiet
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+from alert_dispatcher import alert_dispatcher  # noqa: E402
+from alert_plugins.http_session import webhook_session  # noqa: E402
+from alert_plugins.smtp_pool import smtp_pool  # noqa: E402
+from application_index import application_index  # noqa: E402
+from application_service import ApplicationService  # noqa: E402
+from heartbeat_buffer import heartbeat_buffer  # noqa: E402
+from heartbeat_listener import HeartbeatListener  # noqa: E402
 from heartbeat_monitor import HeartbeatMonitor  # noqa: E402
+from heartbeat_partitions import heartbeat_partitions  # noqa: E402
+from heartbeat_rollups import HeartbeatRollups  # noqa: E402
+from heartbeat_timeline import heartbeat_timeline  # noqa: E402
 from models import *  # noqa: F401,F403,E402
+from monitor_coordinator import MonitorCoordinator  # noqa: E402
 from routes import *  # noqa: F401,F403,E402
 
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        heartbeat_partitions.ensure()
+        db.session.commit()
+        ApplicationService.backfill_next_deadlines()
+        HeartbeatRollups.backfill()
+        if heartbeat_timeline.enabled:
+            heartbeat_timeline.migrate_events()
+        application_index.load()
 
-    # Initialize and start heartbeat monitor
-    heartbeat_monitor = HeartbeatMonitor(app)
+    # Batch heartbeat writes in the background if enabled or timeline storage
+    # needs it, and with SQLite production mode so heartbeats are
+    # group-committed by one writer thread
+    heartbeat_buffer.init_app(app)
+    if heartbeat_buffer.enabled or sqlite_engine.active:
+        heartbeat_buffer.start()
+
+    # Deliver alerts from the outbox on background workers so slow or failing
+    # plugins never stall checks
+    alert_dispatcher.init_app(app)
+    alert_dispatcher.start()
+
+    # Initialize and start heartbeat monitor, coordinating with other
+    # instances through the database unless running standalone
+    monitor_mode = os.getenv("HEARTBEAT_MONITOR_MODE", "standalone").lower()
+    coordinator = (
+        None if monitor_mode == "standalone" else MonitorCoordinator(monitor_mode)
+    )
+    heartbeat_monitor = HeartbeatMonitor(app, coordinator)
     heartbeat_monitor.start()
 
+    # Start the UDP/TCP heartbeat listeners if ports are configured
+    heartbeat_listener = HeartbeatListener(app)
+    heartbeat_listener.start()
+
     try:
         debug_mode = os.getenv("FLASK_DEBUG", "False").lower() == "true"
         port = int(os.getenv("PORT", "5000"))
         logger.info("Starting Flask application with heartbeat monitoring enabled")
         app.run(host="0.0.0.0", port=port, debug=debug_mode)
     finally:
+        heartbeat_listener.stop()
         heartbeat_monitor.stop()
+        alert_dispatcher.stop()
+        smtp_pool.close_all()
+        webhook_session.close()
+        heartbeat_buffer.stop()
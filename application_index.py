@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import select
+
+from database import db
+from models import Application
+
+logger = logging.getLogger(__name__)
+
+CachedApplication = namedtuple(
+    "CachedApplication",
+    ["id", "name", "is_active", "expected_interval", "grace_period"],
+)
+
+
+class ApplicationIndex:
+    """
+    In-memory UUID to application lookup for the heartbeat ingest path.
+
+    Holds just the columns needed to accept or reject a heartbeat, so the
+    ingest path does not have to load an ``Application`` for every request.
+    Routes and ``ApplicationService`` keep it current after each commit that
+    creates, updates or deletes an application. Changes made through other
+    processes are picked up by the monitor's periodic reload, and a UUID
+    missing from the index is looked up in the database before it is
+    rejected; UUIDs the database does not know either are remembered for
+    ``miss_ttl`` seconds.
+    """
+
+    def __init__(self):
+        self.miss_ttl = float(
+            os.getenv("APPLICATION_INDEX_MISS_TTL", 5)
+        )  # seconds an unknown UUID is rejected without a query
+        self._entries = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        """
+        Fill the index from the database (requires an app context)
+
+        Returns:
+            Number of applications indexed
+        """
+        with self._lock:
+            rows = db.session.execute(
+                select(
+                    Application.uuid,
+                    Application.id,
+                    Application.name,
+                    Application.is_active,
+                    Application.expected_interval,
+                    Application.grace_period,
+                )
+            ).all()
+            self._entries = {row.uuid: self._entry(row) for row in rows}
+            self._misses = {}
+            self.loaded = True
+
+        logger.info(f"Application index loaded with {len(rows)} applications")
+        return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._misses = {}
+            self.loaded = False
+
+    def get(self, app_uuid):
+        """
+        Look up an application by UUID
+
+        Returns:
+            CachedApplication or None if the UUID is unknown
+        """
+        return self._entries.get(app_uuid)
+
+    def is_missing(self, app_uuid):
+        """Check whether the database recently had no application for a UUID"""
+        expires = self._misses.get(app_uuid)
+        return expires is not None and expires > time.monotonic()
+
+    def remember(self, app_uuid, entry):
+        """
+        Cache the result of a database lookup for a UUID not in the index
+
+        Args:
+            app_uuid: Application UUID
+            entry: CachedApplication, or None if the UUID is unknown
+        """
+        if not self.loaded:
+            return
+
+        with self._lock:
+            if entry is None:
+                self._misses[app_uuid] = time.monotonic() + self.miss_ttl
+            else:
+                self._misses.pop(app_uuid, None)
+                self._entries[app_uuid] = entry
+
+    def put(self, application):
+        """Add or refresh the entry for an application"""
+        if not self.loaded:
+            return
+
+        with self._lock:
+            self._misses.pop(application.uuid, None)
+            self._entries[application.uuid] = self._entry(application)
+
+    def remove(self, app_uuid):
+        """Drop the entry for a deleted application"""
+        with self._lock:
+            self._entries.pop(app_uuid, None)
+
+    @staticmethod
+    def _entry(application):
+        return CachedApplication(
+            application.id,
+            application.name,
+            application.is_active,
+            application.expected_interval,
+            application.grace_period or 0,
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+
+application_index = ApplicationIndex()
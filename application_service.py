@@ -1,8 +1,19 @@
+import base64
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from sqlalchemy import insert, select, tuple_, update
+
+from application_index import CachedApplication, application_index
 from database import db
+from deadline_index import deadline_index
+from event_broker import event_broker
+from heartbeat_buffer import heartbeat_buffer
+from heartbeat_retention import heartbeat_retention
+from heartbeat_rollups import HeartbeatRollups
+from heartbeat_timeline import TimelineHeartbeat, heartbeat_timeline
 from models import Application, HeartbeatEvent
 
 logger = logging.getLogger(__name__)
@@ -57,6 +68,9 @@ class ApplicationService:
 
             db.session.add(application)
             db.session.commit()
+            application_index.put(application)
+            deadline_index.schedule_application(application)
+            event_broker.publish("application_created", {"id": application.id})
 
             logger.info(
                 f"Created application: {application.name} (UUID: {application.uuid})"
@@ -117,6 +131,9 @@ class ApplicationService:
 
             application.updated_at = datetime.now()
             db.session.commit()
+            application_index.put(application)
+            deadline_index.schedule_application(application)
+            event_broker.publish("application_updated", {"id": application.id})
 
             logger.info(f"Updated application: {application.name}")
             return application
@@ -126,6 +143,391 @@ class ApplicationService:
             logger.error(f"Failed to update application: {str(e)}")
             raise
 
+    @staticmethod
+    def lookup_application(app_uuid: str) -> Optional[CachedApplication]:
+        """
+        Find the application a heartbeat belongs to
+
+        Served from the in-memory application index once it is loaded. A
+        UUID missing from the index, for example an application created
+        through another process, is looked up in the database and the
+        result cached, so repeated unknown UUIDs are rejected without a
+        query.
+
+        Args:
+            app_uuid: Application UUID
+
+        Returns:
+            CachedApplication or None if the UUID is unknown
+        """
+        if application_index.loaded:
+            entry = application_index.get(app_uuid)
+            if entry is not None or application_index.is_missing(app_uuid):
+                return entry
+
+        row = db.session.execute(
+            select(
+                Application.id,
+                Application.name,
+                Application.is_active,
+                Application.expected_interval,
+                Application.grace_period,
+            ).where(Application.uuid == app_uuid)
+        ).first()
+
+        entry = None
+        if row:
+            app_id, name, is_active, expected_interval, grace_period = row
+            entry = CachedApplication(
+                app_id, name, is_active, expected_interval, grace_period or 0
+            )
+        application_index.remember(app_uuid, entry)
+        return entry
+
+    @staticmethod
+    def record_heartbeat(application: CachedApplication, received_at: datetime) -> bool:
+        """
+        Record a heartbeat for an application
+
+        Goes through the write-behind buffer when it is running, otherwise
+        updates ``last_heartbeat`` and logs the event in one transaction.
+
+        Args:
+            application: Application returned by lookup_application
+            received_at: When the heartbeat was received
+
+        Returns:
+            True if recorded, False if the buffer is full
+        """
+        next_deadline = Application.calculate_deadline(
+            received_at, None, application.expected_interval, application.grace_period
+        )
+
+        if heartbeat_buffer.running:
+            if not heartbeat_buffer.submit(application.id, received_at, next_deadline):
+                return False
+        else:
+            try:
+                HeartbeatRollups.record_one(application.id, received_at)
+                db.session.execute(
+                    update(Application)
+                    .where(Application.id == application.id)
+                    .values(last_heartbeat=received_at, next_deadline=next_deadline)
+                )
+                if heartbeat_timeline.enabled:
+                    heartbeat_timeline.append([(application.id, received_at)])
+                else:
+                    db.session.add(
+                        HeartbeatEvent(
+                            application_id=application.id, received_at=received_at
+                        )
+                    )
+                db.session.commit()
+
+            except Exception:
+                db.session.rollback()
+                raise
+
+        deadline_index.touch(application.id, next_deadline)
+        event_broker.publish(
+            "heartbeat", {"id": application.id, "last_heartbeat": received_at}
+        )
+        return True
+
+    @staticmethod
+    def record_heartbeats(heartbeats: List[Tuple[str, datetime]]) -> List[Dict]:
+        """
+        Record heartbeats for many applications in a single transaction
+
+        Uses one ``IN`` lookup for all UUIDs, one bulk insert of the events
+        and one bulk ``last_heartbeat`` update. ``last_heartbeat`` never
+        moves backwards when a client reports an older timestamp.
+
+        Args:
+            heartbeats: (application UUID, received_at) pairs
+
+        Returns:
+            One result dictionary per heartbeat, in the same order
+        """
+        if not heartbeats:
+            return []
+
+        uuids = {app_uuid for app_uuid, _ in heartbeats}
+        applications = {
+            row.uuid: row
+            for row in db.session.execute(
+                select(
+                    Application.id,
+                    Application.uuid,
+                    Application.name,
+                    Application.is_active,
+                    Application.expected_interval,
+                    Application.grace_period,
+                    Application.last_heartbeat,
+                ).where(Application.uuid.in_(uuids))
+            )
+        }
+
+        results = []
+        events = []
+        latest = {}
+
+        for app_uuid, received_at in heartbeats:
+            application = applications.get(app_uuid)
+            if not application:
+                results.append(
+                    {
+                        "uuid": app_uuid,
+                        "status": "error",
+                        "error": "Application not found",
+                    }
+                )
+                continue
+
+            if not application.is_active:
+                results.append(
+                    {
+                        "uuid": app_uuid,
+                        "status": "error",
+                        "error": "Application is not active",
+                    }
+                )
+                continue
+
+            events.append(
+                {"application_id": application.id, "received_at": received_at}
+            )
+            newest = latest.get(application.id, {}).get(
+                "last_heartbeat", application.last_heartbeat
+            )
+            if newest is None or received_at > newest:
+                latest[application.id] = {
+                    "id": application.id,
+                    "last_heartbeat": received_at,
+                    "next_deadline": Application.calculate_deadline(
+                        received_at,
+                        None,
+                        application.expected_interval,
+                        application.grace_period,
+                    ),
+                }
+
+            results.append(
+                {
+                    "uuid": app_uuid,
+                    "status": "ok",
+                    "application": application.name,
+                    "timestamp": received_at.isoformat(),
+                }
+            )
+
+        if not events:
+            return results
+
+        try:
+            pairs = [
+                (event["application_id"], event["received_at"]) for event in events
+            ]
+            if latest:
+                db.session.execute(update(Application), list(latest.values()))
+            if heartbeat_timeline.enabled:
+                heartbeat_timeline.append(pairs)
+            else:
+                db.session.execute(insert(HeartbeatEvent), events)
+            HeartbeatRollups.record(
+                pairs, {row.id: row.last_heartbeat for row in applications.values()}
+            )
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to record heartbeat batch: {str(e)}")
+            raise
+
+        for values in latest.values():
+            deadline_index.touch(values["id"], values["next_deadline"])
+            event_broker.publish(
+                "heartbeat",
+                {"id": values["id"], "last_heartbeat": values["last_heartbeat"]},
+            )
+
+        logger.info(
+            f"Recorded {len(events)} of {len(heartbeats)} heartbeats from batch"
+        )
+        return results
+
+    @staticmethod
+    def get_heartbeat_page(
+        app_id: int,
+        limit: int = 50,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Dict:
+        """
+        Get one page of an application's heartbeat history, newest first
+
+        Pages are addressed by cursors on ``(received_at, id)`` rather than
+        offsets, so every page costs one index range scan however deep it is.
+
+        Args:
+            app_id: Application ID
+            limit: Maximum number of heartbeats to return
+            before: Cursor returning heartbeats older than it
+            after: Cursor returning heartbeats newer than it
+            include_total: Whether to count all heartbeats of the application
+
+        Returns:
+            Dictionary with the heartbeats, cursors for the older (``next``)
+            and newer (``prev``) pages and optionally the total
+
+        Raises:
+            ValueError: If a cursor is invalid
+        """
+        after_key = ApplicationService._decode_cursor(after) if after else None
+        before_key = ApplicationService._decode_cursor(before) if before else None
+
+        if heartbeat_timeline.enabled:
+            rows = list(
+                islice(
+                    heartbeat_timeline.history(
+                        app_id, before=before_key, after=after_key
+                    ),
+                    limit + 1,
+                )
+            )
+        else:
+            key = tuple_(HeartbeatEvent.received_at, HeartbeatEvent.id)
+            query = HeartbeatEvent.query.filter(HeartbeatEvent.application_id == app_id)
+            if after_key:
+                # Walk forward from the cursor, flipped back to newest first below
+                query = query.filter(key > after_key).order_by(
+                    HeartbeatEvent.received_at, HeartbeatEvent.id
+                )
+            else:
+                if before_key:
+                    query = query.filter(key < before_key)
+                query = query.order_by(
+                    HeartbeatEvent.received_at.desc(), HeartbeatEvent.id.desc()
+                )
+            rows = query.limit(limit + 1).all()
+
+        if after_key:
+            has_newer, has_older = len(rows) > limit, True
+            heartbeats = list(reversed(rows[:limit]))
+        else:
+            has_newer, has_older = bool(before_key), len(rows) > limit
+            heartbeats = rows[:limit]
+
+        page = {
+            "heartbeats": [heartbeat.to_dict() for heartbeat in heartbeats],
+            "next_cursor": (
+                ApplicationService._encode_cursor(heartbeats[-1])
+                if heartbeats and has_older
+                else None
+            ),
+            "prev_cursor": (
+                ApplicationService._encode_cursor(heartbeats[0])
+                if heartbeats and has_newer
+                else None
+            ),
+        }
+        if include_total:
+            page["total"] = (
+                heartbeat_timeline.total(app_id)
+                if heartbeat_timeline.enabled
+                else HeartbeatEvent.query.filter_by(application_id=app_id).count()
+            )
+        return page
+
+    @staticmethod
+    def get_latest_heartbeats(applications: List[Application]) -> Dict:
+        """
+        Get the most recent heartbeat of each application without a query
+
+        The latest heartbeat is exactly ``last_heartbeat``, which is kept
+        with every write and never moves backwards, so the dashboard does not
+        read ``heartbeat_event`` however much history it holds.
+
+        Args:
+            applications: Applications to look up
+
+        Returns:
+            Dictionary of application ID to its latest heartbeat, for
+            applications that have one
+        """
+        return {
+            application.id: TimelineHeartbeat(
+                None, application.id, application.last_heartbeat
+            )
+            for application in applications
+            if application.last_heartbeat
+        }
+
+    @staticmethod
+    def iter_heartbeat_events(
+        application_id: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[List]:
+        """
+        Stream heartbeat events in batches, oldest first
+
+        Rows are fetched ``batch_size`` at a time (through a server-side
+        cursor where the database supports one) and are plain rows rather
+        than ORM objects, so memory use does not grow with the export size.
+
+        Args:
+            application_id: Only export this application's heartbeats
+            start: Only heartbeats received at or after this time
+            end: Only heartbeats received before this time
+            batch_size: Rows per batch
+
+        Yields:
+            Lists of rows with ``id``, ``application_id`` and ``received_at``
+        """
+        if heartbeat_timeline.enabled:
+            yield from heartbeat_timeline.iter_events(
+                application_id, start, end, batch_size
+            )
+            return
+
+        query = select(
+            HeartbeatEvent.id, HeartbeatEvent.application_id, HeartbeatEvent.received_at
+        )
+        if application_id is not None:
+            query = query.where(HeartbeatEvent.application_id == application_id)
+        if start is not None:
+            query = query.where(HeartbeatEvent.received_at >= start)
+        if end is not None:
+            query = query.where(HeartbeatEvent.received_at < end)
+
+        result = db.session.execute(
+            query.order_by(HeartbeatEvent.received_at, HeartbeatEvent.id),
+            execution_options={"yield_per": batch_size},
+        )
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
+    @staticmethod
+    def _encode_cursor(heartbeat: HeartbeatEvent) -> str:
+        value = f"{heartbeat.received_at.isoformat()}|{heartbeat.id}"
+        return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            received_at, heartbeat_id = (
+                base64.urlsafe_b64decode(padded).decode().split("|")
+            )
+            return datetime.fromisoformat(received_at), int(heartbeat_id)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}") from None
+
     @staticmethod
     def get_application_status(app_id: int) -> Dict:
         """
@@ -141,15 +543,12 @@ class ApplicationService:
         if not application:
             raise ValueError(f"Application with ID {app_id} not found")
 
-        # Get heartbeat statistics
-        total_heartbeats = HeartbeatEvent.query.filter_by(application_id=app_id).count()
+        # Get heartbeat statistics from the rollups
+        summary = HeartbeatRollups.summary(app_id)
 
         # Get recent heartbeats (last 24 hours)
         yesterday = datetime.now() - timedelta(hours=24)
-        recent_heartbeats = HeartbeatEvent.query.filter(
-            HeartbeatEvent.application_id == app_id,
-            HeartbeatEvent.received_at >= yesterday,
-        ).count()
+        recent_heartbeats = HeartbeatRollups.count(yesterday, application_id=app_id)
 
         # Calculate uptime percentage (basic calculation)
         uptime_percentage = ApplicationService._calculate_uptime(application)
@@ -157,8 +556,12 @@ class ApplicationService:
         return {
             "application": application.to_dict(),
             "is_overdue": application.is_overdue(),
-            "total_heartbeats": total_heartbeats,
+            "total_heartbeats": summary["heartbeats"],
             "recent_heartbeats_24h": recent_heartbeats,
+            "first_heartbeat": (
+                summary["first_seen"].isoformat() if summary["first_seen"] else None
+            ),
+            "longest_gap_seconds": summary["max_gap"],
             "uptime_percentage": uptime_percentage,
             "next_expected_heartbeat": ApplicationService._get_next_expected_heartbeat(
                 application
@@ -170,11 +573,43 @@ class ApplicationService:
         """
         Get all applications that are currently overdue for heartbeats
 
+        A single range query on the (is_active, next_deadline) index, so only
+        the overdue rows are read.
+
         Returns:
             List of overdue Application instances
         """
-        active_applications = Application.query.filter_by(is_active=True).all()
-        return [app for app in active_applications if app.is_overdue()]
+        return (
+            Application.query.filter(
+                Application.is_active.is_(True),
+                Application.next_deadline <= datetime.now(),
+            )
+            .order_by(Application.next_deadline)
+            .all()
+        )
+
+    @staticmethod
+    def backfill_next_deadlines() -> int:
+        """
+        Store next_deadline for applications created before it existed
+
+        Returns:
+            Number of applications updated
+        """
+        applications = Application.query.filter(
+            Application.next_deadline.is_(None)
+        ).all()
+
+        for application in applications:
+            application.next_deadline = application.get_deadline()
+
+        if applications:
+            db.session.commit()
+            logger.info(
+                f"Backfilled next_deadline for {len(applications)} applications"
+            )
+
+        return len(applications)
 
     @staticmethod
     def get_system_statistics() -> Dict:
@@ -190,9 +625,7 @@ class ApplicationService:
 
         # Get heartbeat counts
         today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        heartbeats_today = HeartbeatEvent.query.filter(
-            HeartbeatEvent.received_at >= today
-        ).count()
+        heartbeats_today = HeartbeatRollups.count(today)
 
         return {
             "total_applications": total_applications,
@@ -208,33 +641,16 @@ class ApplicationService:
         """
         Clean up old heartbeat events to prevent database bloat
 
+        Deletes in short batches through the retention job, so heartbeat
+        writes are not blocked while a large backlog is removed.
+
         Args:
             days_to_keep: Number of days of heartbeat events to keep
 
         Returns:
             Number of events deleted
         """
-        if days_to_keep <= 0:
-            raise ValueError("Days to keep must be positive")
-
-        cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-
-        try:
-            deleted_count = HeartbeatEvent.query.filter(
-                HeartbeatEvent.received_at < cutoff_date
-            ).delete()
-
-            db.session.commit()
-
-            if deleted_count > 0:
-                logger.info(f"Cleaned up {deleted_count} old heartbeat events")
-
-            return deleted_count
-
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Failed to cleanup old heartbeat events: {str(e)}")
-            raise
+        return heartbeat_retention.run(days_to_keep)
 
     @staticmethod
     def _calculate_uptime(application: Application) -> float:
@@ -259,10 +675,9 @@ class ApplicationService:
 
         # Get actual heartbeats in the last 24 hours
         yesterday = datetime.now() - timedelta(hours=24)
-        actual_heartbeats = HeartbeatEvent.query.filter(
-            HeartbeatEvent.application_id == application.id,
-            HeartbeatEvent.received_at >= yesterday,
-        ).count()
+        actual_heartbeats = HeartbeatRollups.count(
+            yesterday, application_id=application.id
+        )
 
         if expected_heartbeats == 0:
             return 100.0
@@ -306,16 +721,30 @@ class ApplicationService:
             return False
 
         try:
+            received_at = datetime.now()
+            previous = application.last_heartbeat
+
             # Update last heartbeat
-            application.last_heartbeat = datetime.now()
+            application.last_heartbeat = received_at
 
             # Create heartbeat event
-            heartbeat_event = HeartbeatEvent(
-                application_id=application.id, received_at=datetime.now()
+            if heartbeat_timeline.enabled:
+                heartbeat_timeline.append([(application.id, received_at)])
+            else:
+                db.session.add(
+                    HeartbeatEvent(
+                        application_id=application.id, received_at=received_at
+                    )
+                )
+            HeartbeatRollups.record(
+                [(application.id, received_at)], {application.id: previous}
             )
-
-            db.session.add(heartbeat_event)
             db.session.commit()
+            deadline_index.touch(application.id, application.get_deadline())
+            event_broker.publish(
+                "heartbeat",
+                {"id": application.id, "last_heartbeat": application.last_heartbeat},
+            )
 
             logger.info(f"Simulated heartbeat for {application.name}")
             return True
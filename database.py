@@ -1,5 +1,107 @@
 """Database initialization module to avoid circular imports."""
 
+import logging
+
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event, inspect, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateTable
+
+logger = logging.getLogger(__name__)
+
+# Bind of the read-only connections used in SQLite production mode
+READER_BIND = "reader"
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain reads to the ``reader`` bind when one is
+    configured, until it writes in its current transaction. Reads after a
+    write, and ``SELECT ... FOR UPDATE``, use the writer so they see the
+    transaction's own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self.info.get("writing")
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            reader = self._db.engines.get(READER_BIND)
+            if reader is not None:
+                return reader
+
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _flushing(session, flush_context, instances):
+    session.info["writing"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _executing(execute_state):
+    if not execute_state.is_select:
+        execute_state.session.info["writing"] = True
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _transaction_ended(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def upgrade_schema():
+    """
+    Bring tables created by an older release up to date
+
+    ``db.create_all()`` only creates missing tables, so columns and indexes
+    added to existing models are created here. New columns must therefore
+    be nullable. Requires an app context.
+    """
+    inspector = inspect(db.engine)
+
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {table.name} "
+                        f"ADD COLUMN {column.name} {column_type}"
+                    )
+                )
+                logger.info(f"Added column {table.name}.{column.name}")
+
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+@compiles(CreateTable, "postgresql")
+def _create_table(create, compiler, **kw):
+    """
+    Add the partition key to a partitioned table's primary key
 
-db = SQLAlchemy()
+    PostgreSQL requires it, but adding it to the model would cost SQLite its
+    rowid primary key, so tables name it in ``info["partition_key"]``.
+    """
+    ddl = compiler.visit_create_table(create, **kw)
+    partition_key = create.element.info.get("partition_key")
+    if partition_key:
+        columns = ", ".join(column.name for column in create.element.primary_key)
+        ddl = ddl.replace(
+            f"PRIMARY KEY ({columns})", f"PRIMARY KEY ({columns}, {partition_key})"
+        )
+    return ddl
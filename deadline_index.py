@@ -0,0 +1,200 @@
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineIndex:
+    """
+    Min-heap of application heartbeat deadlines for the monitor.
+
+    A deadline is the moment an application becomes overdue if no further
+    heartbeat arrives. Heartbeats only ever move a deadline later, so
+    ``touch`` just records the new value and the stale heap entry is pushed
+    back when it reaches the top. The monitor therefore only does work when
+    a deadline actually expires or an overdue application recovers.
+
+    The index is inert until the monitor activates it, so processes that
+    only ingest heartbeats pay nothing for it.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+        self._expired = set()
+        self._recovered = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._owns = None
+        self.active = False
+
+    def activate(self, listener=None, owns=None):
+        """
+        Start tracking deadlines
+
+        Args:
+            listener: Called with a datetime whenever the monitor should wake
+                up earlier than the current earliest deadline
+            owns: Optional predicate on application IDs; applications it
+                rejects belong to another monitor and are ignored
+        """
+        self._listener = listener
+        self._owns = owns
+        self.active = True
+
+    def deactivate(self):
+        self.active = False
+        self._listener = None
+        self._owns = None
+        self.clear()
+
+    def tracks(self, app_id):
+        return self.active and (self._owns is None or self._owns(app_id))
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+            self._deadlines = {}
+            self._expired = set()
+            self._recovered = set()
+
+    def schedule(self, app_id, deadline):
+        """
+        Set an application's deadline, earlier or later than before
+
+        Used when an application is created, reconfigured or reloaded.
+        """
+        if not self.tracks(app_id):
+            return
+
+        with self._lock:
+            current = self._deadlines.get(app_id)
+            self._deadlines[app_id] = deadline
+            self._expired.discard(app_id)
+
+            if current is not None and deadline >= current:
+                return
+
+            heapq.heappush(self._heap, (deadline, app_id))
+            wake = self._heap[0][0] == deadline
+
+        if wake:
+            self._notify(deadline)
+
+    def schedule_application(self, application):
+        """Schedule from an Application, dropping inactive ones"""
+        if not application.is_active:
+            self.discard(application.id)
+            return
+
+        self.schedule(application.id, application.get_deadline())
+
+    def touch(self, app_id, deadline):
+        """
+        Record a heartbeat that moves an application's deadline later
+
+        If the application had already expired it is queued as recovered and
+        the monitor is woken straight away.
+        """
+        if not self.tracks(app_id):
+            return
+
+        with self._lock:
+            current = self._deadlines.get(app_id)
+            if current is not None:
+                if deadline > current:
+                    self._deadlines[app_id] = deadline
+                return
+
+            self._deadlines[app_id] = deadline
+            heapq.heappush(self._heap, (deadline, app_id))
+
+            recovered = app_id in self._expired
+            if recovered:
+                self._expired.discard(app_id)
+                self._recovered.add(app_id)
+
+        if recovered:
+            self._notify(None)
+
+    def discard(self, app_id):
+        """Stop tracking a deleted or deactivated application"""
+        with self._lock:
+            self._deadlines.pop(app_id, None)
+            self._expired.discard(app_id)
+            self._recovered.discard(app_id)
+
+    def pop_expired(self, now):
+        """
+        Remove and return every application whose deadline has passed
+
+        Returns:
+            List of (app_id, deadline) tuples
+        """
+        expired = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, app_id = heapq.heappop(self._heap)
+                current = self._deadlines.get(app_id)
+
+                if current is None or current < deadline:
+                    continue  # Deleted, or a duplicate of an entry already handled
+
+                if current > deadline:
+                    heapq.heappush(self._heap, (current, app_id))
+                    continue
+
+                del self._deadlines[app_id]
+                expired.append((app_id, deadline))
+
+        return expired
+
+    def mark_expired(self, app_id):
+        """Remember that an application is overdue so a heartbeat recovers it"""
+        with self._lock:
+            if app_id not in self._deadlines:
+                self._expired.add(app_id)
+
+    def pop_recovered(self):
+        """
+        Remove and return the expired applications that sent a heartbeat
+        """
+        with self._lock:
+            recovered = self._recovered
+            self._recovered = set()
+        return recovered
+
+    def get_deadline(self, app_id):
+        return self._deadlines.get(app_id)
+
+    def next_deadline(self):
+        """
+        Get the earliest pending deadline, or None if nothing is tracked
+        """
+        with self._lock:
+            while self._heap:
+                deadline, app_id = self._heap[0]
+                if self._deadlines.get(app_id) == deadline:
+                    return deadline
+                if self._deadlines.get(app_id, deadline) > deadline:
+                    # Stale entry after a heartbeat, reposition it
+                    heapq.heapreplace(self._heap, (self._deadlines[app_id], app_id))
+                else:
+                    heapq.heappop(self._heap)
+            return None
+
+    def _notify(self, when):
+        listener = self._listener
+        if listener:
+            try:
+                listener(when)
+            except Exception as e:
+                logger.error(f"Deadline index listener failed: {str(e)}")
+
+    def __len__(self):
+        return len(self._deadlines)
+
+
+deadline_index = DeadlineIndex()
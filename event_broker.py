@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe of application state changes.
+
+    Ingest, the monitor and the application routes publish small events
+    (heartbeat received, overdue, recovered, application created, updated
+    or deleted) and every open dashboard receives them over Server-Sent
+    Events, so watching the dashboard costs no database queries. Each
+    subscriber has a bounded queue; a subscriber that falls behind is sent
+    a ``resync`` event and disconnected instead of slowing publishers down.
+
+    Heartbeat events are coalesced per application: at most one is sent
+    every ``EVENT_STREAM_HEARTBEAT_INTERVAL`` seconds, carrying the latest
+    heartbeat, so a chatty application cannot fill the queues. Any other
+    event for the application sends its held heartbeat first, keeping
+    events in order.
+    """
+
+    def __init__(self):
+        self.queue_size = int(os.getenv("EVENT_STREAM_QUEUE_SIZE", 1000))
+        self.keepalive = float(
+            os.getenv("EVENT_STREAM_KEEPALIVE", 15)
+        )  # seconds between comments that keep proxies from closing the stream
+        self.heartbeat_interval = float(
+            os.getenv("EVENT_STREAM_HEARTBEAT_INTERVAL", 1)
+        )  # seconds between heartbeat events for one application
+        self._subscribers = set()
+        self._heartbeat_sent = {}  # application id -> monotonic time last sent
+        self._held_heartbeats = {}  # application id -> latest unsent heartbeat
+        self._flush_timer = None
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = _Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event_type, data):
+        """
+        Send an event to every subscriber without blocking
+
+        Args:
+            event_type: e.g. ``"heartbeat"`` or ``"overdue"``
+            data: JSON serializable payload
+        """
+        if not self._subscribers:
+            return
+
+        if event_type == "heartbeat" and self.heartbeat_interval > 0:
+            if not self._heartbeat_due(data):
+                return
+        else:
+            with self._lock:
+                held = self._held_heartbeats.pop(data.get("id"), None)
+            if held is not None:
+                self._send("heartbeat", held)
+
+        self._send(event_type, data)
+
+    def _heartbeat_due(self, data):
+        """
+        Note a heartbeat event, holding it back if its application had one
+        sent within the interval
+
+        Returns:
+            True if the event should be sent now
+        """
+        now = time.monotonic()
+        with self._lock:
+            sent = self._heartbeat_sent.get(data["id"])
+            if sent is None or now - sent >= self.heartbeat_interval:
+                self._heartbeat_sent[data["id"]] = now
+                self._held_heartbeats.pop(data["id"], None)
+                return True
+
+            self._held_heartbeats[data["id"]] = data
+            if self._flush_timer is None:
+                self._schedule_flush(sent + self.heartbeat_interval - now)
+            return False
+
+    def _schedule_flush(self, delay):
+        self._flush_timer = threading.Timer(delay, self._flush_heartbeats)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _flush_heartbeats(self):
+        """Send the held heartbeats whose interval has passed"""
+        now = time.monotonic()
+        with self._lock:
+            self._flush_timer = None
+            due = [
+                app_id
+                for app_id in self._held_heartbeats
+                if now - self._heartbeat_sent[app_id] >= self.heartbeat_interval
+            ]
+            flushed = [self._held_heartbeats.pop(app_id) for app_id in due]
+            for app_id in due:
+                self._heartbeat_sent[app_id] = now
+
+            # Forget applications that have been quiet for a whole interval
+            for app_id, sent in list(self._heartbeat_sent.items()):
+                if (
+                    now - sent >= self.heartbeat_interval
+                    and app_id not in self._held_heartbeats
+                ):
+                    del self._heartbeat_sent[app_id]
+
+            if self._held_heartbeats:
+                next_due = min(
+                    self._heartbeat_sent[app_id] for app_id in self._held_heartbeats
+                )
+                self._schedule_flush(max(next_due + self.heartbeat_interval - now, 0))
+
+        for data in flushed:
+            self._send("heartbeat", data)
+
+    def _send(self, event_type, data):
+        message = f"event: {event_type}\ndata: {json.dumps(data, default=_to_json)}\n\n"
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def stream(self, subscriber):
+        """
+        Yield Server-Sent Events for a subscriber until it falls behind
+        """
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = subscriber.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if message is None:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class _Subscriber:
+    def __init__(self, queue_size):
+        # One extra slot so the overflow marker always fits
+        self.queue = queue.Queue(maxsize=queue_size + 1)
+        self.queue_size = queue_size
+        self.overflowed = False
+        self._lock = threading.Lock()
+
+    def put(self, message):
+        with self._lock:
+            if self.overflowed:
+                return
+
+            if self.queue.qsize() >= self.queue_size:
+                self.overflowed = True
+                self.queue.put_nowait(None)
+                return
+
+            self.queue.put_nowait(message)
+
+
+event_broker = EventBroker()
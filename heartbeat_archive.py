@@ -0,0 +1,283 @@
+import logging
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"HBA1"
+# magic, heartbeats, first/last offset (ms), longest gap (ms), column lengths
+HEADER = struct.Struct("<4sIIIIII")
+MILLISECOND = timedelta(milliseconds=1)
+
+ArchiveHeader = namedtuple(
+    "ArchiveHeader",
+    [
+        "magic",
+        "heartbeats",
+        "first_ms",
+        "last_ms",
+        "max_gap_ms",
+        "times_len",
+        "ids_len",
+    ],
+)
+
+
+class HeartbeatArchive:
+    """
+    Expired heartbeat events kept as compressed columnar files.
+
+    Retention writes each application's events for a day to
+    ``<HEARTBEAT_ARCHIVE_DIR>/<application id>/<YYYY-MM-DD>.hba`` before
+    deleting them. A file holds two zlib-compressed, delta-encoded columns,
+    millisecond offsets into the day and event ids, behind a fixed header
+    with the day's count, first and last heartbeat and longest gap. Range
+    summaries read just the headers of whole days through ``mmap`` and only
+    decompress the days at either end of a range.
+
+    Archiving is disabled unless ``HEARTBEAT_ARCHIVE_DIR`` is set.
+    """
+
+    def __init__(self):
+        self.directory = os.getenv("HEARTBEAT_ARCHIVE_DIR", "")
+        self.compression_level = int(os.getenv("HEARTBEAT_ARCHIVE_COMPRESSION", 6))
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def write(self, events):
+        """
+        Add events to the archive, merging with days already archived
+
+        Events already in a file (same id) are not duplicated, so writing a
+        batch again after a failed delete is harmless.
+
+        Args:
+            events: (id, application_id, received_at) tuples
+
+        Returns:
+            Number of events written
+        """
+        days = {}
+        for event_id, application_id, received_at in events:
+            key = (application_id, received_at.date())
+            days.setdefault(key, {})[event_id] = received_at
+
+        for (application_id, day), new in days.items():
+            path = self._path(application_id, day)
+            existing = dict(self._read_columns(path)) if os.path.exists(path) else {}
+            existing.update(new)
+            self._write_day(path, day, existing)
+
+        return sum(len(new) for new in days.values())
+
+    def read_day(self, application_id, day):
+        """
+        Get an application's archived heartbeats for a day, oldest first
+
+        Returns:
+            List of (id, received_at) pairs, empty if nothing is archived
+        """
+        path = self._path(application_id, day)
+        if not os.path.exists(path):
+            return []
+        return self._read_columns(path)
+
+    def span(self, application_id):
+        """
+        Get the range of days archived for an application
+
+        Returns:
+            ``(start, end)`` datetimes from the start of the first archived
+            day to the end of the last, or None if nothing is archived
+        """
+        try:
+            names = os.listdir(os.path.join(self.directory, str(application_id)))
+        except FileNotFoundError:
+            return None
+
+        days = sorted(
+            date.fromisoformat(name.removesuffix(".hba"))
+            for name in names
+            if name.endswith(".hba")
+        )
+        if not days:
+            return None
+        return (
+            datetime.combine(days[0], time()),
+            datetime.combine(days[-1], time()) + timedelta(days=1),
+        )
+
+    def summary(self, application_id, start, end):
+        """
+        Summarize an application's archived heartbeats in ``[start, end)``
+
+        Returns:
+            Dictionary with heartbeats, first_seen, last_seen, max_gap
+            (seconds), the number of archived days read and the seconds of
+            the range those days cover
+        """
+        heartbeats = 0
+        first_seen = last_seen = None
+        max_gap = 0.0
+        days = 0
+        covered = 0.0
+
+        day = start.date()
+        while datetime.combine(day, time()) < end:
+            path = self._path(application_id, day)
+            day_start = datetime.combine(day, time())
+            day_end = day_start + timedelta(days=1)
+            day += timedelta(days=1)
+            if not os.path.exists(path):
+                continue
+
+            days += 1
+            covered += (min(day_end, end) - max(day_start, start)).total_seconds()
+            if start <= day_start and day_end <= end:
+                header = self._read_header(path)
+                count = header.heartbeats
+                first = day_start + header.first_ms * MILLISECOND
+                last = day_start + header.last_ms * MILLISECOND
+                gap = header.max_gap_ms / 1000
+            else:
+                times = [
+                    received_at
+                    for _, received_at in self._read_columns(path)
+                    if start <= received_at < end
+                ]
+                if not times:
+                    continue
+                count, first, last = len(times), times[0], times[-1]
+                gap = max(
+                    ((b - a).total_seconds() for a, b in zip(times, times[1:])),
+                    default=0.0,
+                )
+
+            if last_seen is not None:
+                gap = max(gap, (first - last_seen).total_seconds())
+            heartbeats += count
+            first_seen = first_seen or first
+            last_seen = last
+            max_gap = max(max_gap, gap)
+
+        return {
+            "heartbeats": heartbeats,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "max_gap": max_gap,
+            "days": days,
+            "covered": covered,
+        }
+
+    def uptime(self, application_id, start, end, expected_interval, summary=None):
+        """
+        Uptime percentage in ``[start, end)``, calculated like the live
+        uptime from expected versus received heartbeats
+
+        Heartbeats are only expected over the archived days in the range,
+        as days outside the archive are either still in the database or
+        were never recorded. Pass a ``summary`` already read for the same
+        range to reuse it.
+
+        Returns:
+            The percentage, or None if no day in the range is archived
+        """
+        summary = summary or self.summary(application_id, start, end)
+        if not summary["days"]:
+            return None
+
+        expected = summary["covered"] // expected_interval
+        if expected <= 0:
+            return 100.0
+
+        received = summary["heartbeats"]
+        return round(min(100.0, received / expected * 100.0), 2)
+
+    def _path(self, application_id, day):
+        return os.path.join(self.directory, str(application_id), f"{day}.hba")
+
+    def _write_day(self, path, day, events):
+        """
+        Write a day's events atomically, replacing any previous file
+        """
+        day_start = datetime.combine(day, time())
+        ordered = sorted(events.items(), key=lambda event: (event[1], event[0]))
+        offsets = [
+            (received_at - day_start) // MILLISECOND for _, received_at in ordered
+        ]
+        ids = [event_id for event_id, _ in ordered]
+
+        times_column = zlib.compress(
+            array("I", _deltas(offsets)).tobytes(), self.compression_level
+        )
+        ids_column = zlib.compress(
+            array("q", _deltas(ids)).tobytes(), self.compression_level
+        )
+        header = HEADER.pack(
+            MAGIC,
+            len(offsets),
+            offsets[0],
+            offsets[-1],
+            max(_deltas(offsets)[1:], default=0),
+            len(times_column),
+            len(ids_column),
+        )
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(header)
+            f.write(times_column)
+            f.write(ids_column)
+        os.replace(temporary, path)
+
+    def _read_header(self, path):
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        ):
+            return self._header(data, path)
+
+    def _read_columns(self, path):
+        day_start = datetime.combine(
+            date.fromisoformat(os.path.basename(path)[:10]), time()
+        )
+
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        ):
+            header = self._header(data, path)
+            ids_start = HEADER.size + header.times_len
+            with memoryview(data) as view:
+                offsets = array("I", zlib.decompress(view[HEADER.size : ids_start]))
+                ids = array(
+                    "q", zlib.decompress(view[ids_start : ids_start + header.ids_len])
+                )
+
+        return [
+            (event_id, day_start + offset * MILLISECOND)
+            for event_id, offset in zip(accumulate(ids), accumulate(offsets))
+        ]
+
+    @staticmethod
+    def _header(data, path):
+        header = ArchiveHeader._make(HEADER.unpack_from(data))
+        if header.magic != MAGIC:
+            raise ValueError(f"Not a heartbeat archive: {path}")
+        return header
+
+
+def _deltas(values):
+    return [b - a for a, b in zip([0] + values, values)]
+
+
+heartbeat_archive = HeartbeatArchive()
@@ -0,0 +1,302 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import insert, select, update
+
+from database import db
+from heartbeat_rollups import HeartbeatRollups
+from heartbeat_timeline import heartbeat_timeline
+from models import Application, HeartbeatEvent
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    """
+    Write-behind buffer for heartbeat ingestion.
+
+    Heartbeats are acknowledged as soon as they are queued. A background
+    thread drains the queue and writes them in batches: repeated
+    ``last_heartbeat`` updates for the same application are merged into one
+    UPDATE and the ``HeartbeatEvent`` rows are bulk inserted. A batch is
+    written once ``batch_size`` heartbeats are pending or ``flush_interval``
+    seconds have passed, whichever comes first. A batch that fails to write
+    is retried ``max_retries`` times with doubling delays before it is
+    dropped, since its heartbeats have already been acknowledged.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.configured = (
+            os.getenv("HEARTBEAT_BUFFER_ENABLED", "False").lower() == "true"
+        )
+        self.max_size = int(os.getenv("HEARTBEAT_BUFFER_SIZE", 10000))
+        self.batch_size = int(os.getenv("HEARTBEAT_BUFFER_BATCH_SIZE", 500))
+        self.flush_interval = float(
+            os.getenv("HEARTBEAT_BUFFER_FLUSH_INTERVAL", 1.0)
+        )  # seconds
+        self.put_timeout = float(
+            os.getenv("HEARTBEAT_BUFFER_PUT_TIMEOUT", 0.5)
+        )  # seconds to wait for space before rejecting a heartbeat
+        self.max_retries = int(os.getenv("HEARTBEAT_BUFFER_MAX_RETRIES", 3))
+        self.retry_delay = float(
+            os.getenv("HEARTBEAT_BUFFER_RETRY_DELAY", 0.5)
+        )  # seconds before the first retry, doubled for each one after
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "buffered": 0,
+            "rejected": 0,
+            "written": 0,
+            "merged_updates": 0,
+            "retries": 0,
+            "failed": 0,
+            "flushes": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+            "total_flush_seconds": 0.0,
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+
+    @property
+    def enabled(self):
+        """
+        Whether the app should run the buffer: when configured, and always
+        with timeline storage, which must append heartbeats a batch at a time
+        """
+        return self.configured or heartbeat_timeline.enabled
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background flush thread"""
+        if self.running:
+            logger.warning("Heartbeat buffer is already running")
+            return
+
+        if not self.app:
+            raise RuntimeError("Heartbeat buffer requires a Flask app")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="heartbeat-buffer", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Heartbeat buffer started - batch size {self.batch_size}, "
+            f"flushing every {self.flush_interval} seconds"
+        )
+
+    def stop(self):
+        """Stop the flush thread and write out everything still queued"""
+        if self.running:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+        flushed = self.flush()
+        logger.info(f"Heartbeat buffer stopped - flushed {flushed} pending heartbeats")
+
+    def submit(self, application_id, received_at, next_deadline):
+        """
+        Queue a heartbeat for writing
+
+        Blocks for at most ``put_timeout`` seconds when the buffer is full.
+
+        Returns:
+            True if the heartbeat was queued, False if it was rejected
+        """
+        try:
+            self._queue.put(
+                (application_id, received_at, next_deadline), timeout=self.put_timeout
+            )
+        except queue.Full:
+            self._increment("rejected")
+            return False
+
+        self._increment("buffered")
+        return True
+
+    def flush(self):
+        """
+        Synchronously write every queued heartbeat
+
+        Returns:
+            Number of heartbeats written
+        """
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            written += self._write_batch(batch)
+
+    def get_status(self):
+        """
+        Get the current status and counters of the buffer
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats.update(
+            {
+                "running": self.running,
+                "pending": self._queue.qsize(),
+                "max_size": self.max_size,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+            }
+        )
+        return stats
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while not self._stop_event.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout > 0:
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    pass
+                else:
+                    batch.extend(self._drain(self.batch_size - len(batch)))
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write_batch(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        if batch:
+            self._write_batch(batch)
+
+    def _drain(self, limit):
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _write_batch(self, batch):
+        """
+        Write a batch of heartbeats, retrying it if the write fails
+
+        Returns:
+            Number of heartbeats written, 0 if the batch was dropped
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._commit_batch(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(
+                        f"Dropped {len(batch)} buffered heartbeats after "
+                        f"{attempt + 1} failed writes: {str(e)}"
+                    )
+                    self._increment("failed", len(batch))
+                    return 0
+
+                delay = self.retry_delay * 2**attempt
+                logger.warning(
+                    f"Failed to write {len(batch)} buffered heartbeats, "
+                    f"retrying in {delay}s: {str(e)}"
+                )
+                self._increment("retries")
+                time.sleep(delay)
+
+    def _commit_batch(self, batch):
+        """
+        Write a batch of heartbeats in a single transaction
+        """
+        # Only the most recent heartbeat per application needs an UPDATE
+        latest = {}
+        for application_id, received_at, next_deadline in batch:
+            current = latest.get(application_id)
+            if current is None or received_at > current["last_heartbeat"]:
+                latest[application_id] = {
+                    "id": application_id,
+                    "last_heartbeat": received_at,
+                    "next_deadline": next_deadline,
+                }
+
+        started = time.perf_counter()
+
+        with self._write_lock, self.app.app_context():
+            try:
+                # Applications deleted since their heartbeat was queued are skipped
+                previous = dict(
+                    db.session.execute(
+                        select(Application.id, Application.last_heartbeat).where(
+                            Application.id.in_(latest)
+                        )
+                    ).all()
+                )
+                existing = set(previous)
+                events = [
+                    {"application_id": application_id, "received_at": received_at}
+                    for application_id, received_at, _ in batch
+                    if application_id in existing
+                ]
+
+                if events:
+                    pairs = [
+                        (event["application_id"], event["received_at"])
+                        for event in events
+                    ]
+                    if heartbeat_timeline.enabled:
+                        heartbeat_timeline.append(pairs)
+                    else:
+                        db.session.execute(insert(HeartbeatEvent), events)
+                    db.session.execute(
+                        update(Application),
+                        [
+                            values
+                            for application_id, values in latest.items()
+                            if application_id in existing
+                        ],
+                    )
+                    HeartbeatRollups.record(pairs, previous)
+                db.session.commit()
+
+            except Exception:
+                db.session.rollback()
+                raise
+
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            self._stats["written"] += len(events)
+            self._stats["merged_updates"] += len(batch) - len(latest)
+            self._stats["flushes"] += 1
+            self._stats["last_flush_seconds"] = elapsed
+            self._stats["total_flush_seconds"] += elapsed
+            self._stats["max_flush_seconds"] = max(
+                self._stats["max_flush_seconds"], elapsed
+            )
+
+        logger.debug(f"Flushed {len(events)} heartbeats in {elapsed:.3f}s")
+        return len(events)
+
+    def _increment(self, counter, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+
+heartbeat_buffer = HeartbeatBuffer()
@@ -0,0 +1,214 @@
+import hmac
+import logging
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime
+
+from application_service import ApplicationService
+from database import db
+from heartbeat_buffer import heartbeat_buffer
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatListener:
+    """
+    Optional UDP and line-based TCP heartbeat listener.
+
+    Each UDP datagram or TCP line carries an application UUID, optionally
+    followed by whitespace and the shared ``HEARTBEAT_LISTENER_TOKEN``.
+    Heartbeats go through the same lookup and recording logic as the HTTP
+    endpoint, without the request, routing and JSON overhead. The listener
+    starts the write-behind heartbeat buffer if it is not already running,
+    so a datagram only queues a tuple and rows are written in batches. UDP
+    is fire and forget; TCP answers every line with ``OK`` or
+    ``ERR <reason>`` once the heartbeat is queued.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.host = os.getenv("HEARTBEAT_LISTENER_HOST", "0.0.0.0")
+        self.udp_port = self._get_port("HEARTBEAT_UDP_PORT")
+        self.tcp_port = self._get_port("HEARTBEAT_TCP_PORT")
+        self.token = os.getenv("HEARTBEAT_LISTENER_TOKEN")
+        self._udp_socket = None
+        self._tcp_server = None
+        self._threads = []
+        self._started_buffer = False
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"received": 0, "accepted": 0, "rejected": 0}
+
+    @staticmethod
+    def _get_port(name):
+        value = os.getenv(name)
+        return int(value) if value else None
+
+    @property
+    def enabled(self):
+        return self.udp_port is not None or self.tcp_port is not None
+
+    def start(self):
+        """Start the configured listeners"""
+        if not self.enabled:
+            return
+
+        self._stop_event.clear()
+
+        if not heartbeat_buffer.running:
+            if heartbeat_buffer.app is None:
+                heartbeat_buffer.init_app(self.app)
+            heartbeat_buffer.start()
+            self._started_buffer = True
+
+        if self.udp_port is not None:
+            self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._udp_socket.bind((self.host, self.udp_port))
+            self._udp_socket.settimeout(1.0)
+            self.udp_port = self._udp_socket.getsockname()[1]
+            self._start_thread("heartbeat-udp", self._serve_udp)
+            logger.info(f"UDP heartbeat listener on {self.host}:{self.udp_port}")
+
+        if self.tcp_port is not None:
+            self._tcp_server = _HeartbeatTCPServer(
+                (self.host, self.tcp_port), _HeartbeatTCPHandler
+            )
+            self._tcp_server.listener = self
+            self.tcp_port = self._tcp_server.server_address[1]
+            self._start_thread("heartbeat-tcp", self._tcp_server.serve_forever)
+            logger.info(f"TCP heartbeat listener on {self.host}:{self.tcp_port}")
+
+    def stop(self):
+        """Stop all listeners"""
+        if not self._threads:
+            return
+
+        self._stop_event.set()
+
+        if self._tcp_server:
+            self._tcp_server.shutdown()
+            self._tcp_server.server_close()
+            self._tcp_server = None
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        if self._udp_socket:
+            self._udp_socket.close()
+            self._udp_socket = None
+
+        if self._started_buffer:
+            heartbeat_buffer.stop()
+            self._started_buffer = False
+
+        logger.info("Heartbeat listeners stopped")
+
+    def handle_line(self, line):
+        """
+        Process a single heartbeat line (requires an app context)
+
+        Args:
+            line: Raw bytes of ``<uuid> [token]``
+
+        Returns:
+            None if accepted, otherwise a short rejection reason
+        """
+        self._increment("received")
+
+        parts = line.split()
+        if not parts or len(parts) > 2:
+            return self._reject("invalid")
+
+        if self.token is not None:
+            supplied = parts[1] if len(parts) == 2 else b""
+            if not hmac.compare_digest(supplied, self.token.encode()):
+                return self._reject("unauthorized")
+
+        try:
+            app_uuid = parts[0].decode("ascii").lower()
+        except UnicodeDecodeError:
+            return self._reject("invalid")
+
+        application = ApplicationService.lookup_application(app_uuid)
+        if not application:
+            return self._reject("not_found")
+
+        if not application.is_active:
+            return self._reject("inactive")
+
+        try:
+            if not ApplicationService.record_heartbeat(application, datetime.now()):
+                return self._reject("busy")
+        except Exception as e:
+            logger.error(f"Error processing heartbeat for {app_uuid}: {str(e)}")
+            return self._reject("error")
+
+        self._increment("accepted")
+        return None
+
+    def get_status(self):
+        """
+        Get the current status and counters of the listeners
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats.update(
+            {
+                "udp_port": self.udp_port if self._udp_socket else None,
+                "tcp_port": self.tcp_port if self._tcp_server else None,
+            }
+        )
+        return stats
+
+    def _start_thread(self, name, target):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _serve_udp(self):
+        with self.app.app_context():
+            while not self._stop_event.is_set():
+                try:
+                    data, _ = self._udp_socket.recvfrom(65535)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+
+                for line in data.splitlines():
+                    self.handle_line(line)
+
+                db.session.remove()
+
+    def _reject(self, reason):
+        self._increment("rejected")
+        return reason
+
+    def _increment(self, counter, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+
+class _HeartbeatTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _HeartbeatTCPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        listener = self.server.listener
+
+        with listener.app.app_context():
+            for line in self.rfile:
+                reason = listener.handle_line(line)
+                db.session.remove()
+
+                if reason is None:
+                    self.wfile.write(b"OK\n")
+                else:
+                    self.wfile.write(f"ERR {reason}\n".encode())
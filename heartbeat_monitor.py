@@ -1,11 +1,20 @@
 import logging
 import os
+import threading
 from datetime import datetime
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-
-from alert_manager import AlertManager
+from sqlalchemy import or_, select, update
+
+from alert_dispatcher import alert_dispatcher
+from application_index import application_index
+from database import db
+from deadline_index import deadline_index
+from event_broker import event_broker
+from heartbeat_partitions import heartbeat_partitions
+from heartbeat_retention import heartbeat_retention
 from models import Application, ApplicationAlertConfig
 
 logger = logging.getLogger(__name__)
@@ -15,14 +24,29 @@ class HeartbeatMonitor:
     """
     Background service that monitors applications for missed heartbeats
     and triggers alerts when applications are overdue.
+
+    Deadlines live in the shared deadline index and the monitor sleeps until
+    the earliest one expires, so each run only looks at applications whose
+    state may have changed instead of scanning every application.
     """
 
-    def __init__(self, app=None):
+    def __init__(self, app=None, coordinator=None):
         self.scheduler = BackgroundScheduler()
-        self.alert_manager = AlertManager()
+        self.alert_dispatcher = alert_dispatcher
         self.app = app
+        self.coordinator = coordinator
         self.check_interval = int(os.getenv("HEARTBEAT_CHECK_INTERVAL", 30))  # seconds
+        self.index_refresh_interval = int(
+            os.getenv("APPLICATION_INDEX_REFRESH_INTERVAL", 30)
+        )  # seconds
+        self.deadlines = deadline_index
+        self.partitions = heartbeat_partitions
+        self.retention = heartbeat_retention
         self._overdue_applications = set()  # Track which apps are currently overdue
+        self._shard = None  # (index, count) of the applications this monitor owns
+        self._process_lock = threading.Lock()
+        self._wakeup_lock = threading.Lock()
+        self._next_wakeup = None
 
     def start(self):
         """Start the heartbeat monitoring service"""
@@ -30,29 +54,198 @@ class HeartbeatMonitor:
             logger.warning("Heartbeat monitor is already running")
             return
 
-        # Schedule the heartbeat check job
+        # Other processes, such as further web replicas, may change
+        # applications behind this one's back
         self.scheduler.add_job(
-            func=self._check_heartbeats,
-            trigger=IntervalTrigger(seconds=self.check_interval),
-            id="heartbeat_monitor",
+            func=self._refresh_application_index,
+            trigger=IntervalTrigger(seconds=self.index_refresh_interval),
+            id="application_index_refresh",
             replace_existing=True,
         )
 
+        if self.coordinator:
+            # Monitoring starts once the coordinator assigns this instance work
+            self.scheduler.add_job(
+                func=self._update_membership,
+                trigger=IntervalTrigger(seconds=self.coordinator.renew_interval),
+                id="heartbeat_membership",
+                replace_existing=True,
+                next_run_time=datetime.now(),
+            )
+            self.scheduler.start()
+            logger.info(
+                f"Heartbeat monitor {self.coordinator.instance_id} started in "
+                f"{self.coordinator.mode} mode"
+            )
+            return
+
         self.scheduler.start()
-        logger.info(
-            f"Heartbeat monitor started - checking every {self.check_interval} seconds"
-        )
+        self._activate((0, 1))
 
     def stop(self):
         """Stop the heartbeat monitoring service"""
         if self.scheduler.running:
+            self.retention.cancel()
             self.scheduler.shutdown()
+            self.deadlines.deactivate()
+
+            if self.coordinator and self.app:
+                with self.app.app_context():
+                    self.coordinator.release()
+
             logger.info("Heartbeat monitor stopped")
 
-    def _check_heartbeats(self):
+    def _activate(self, shard):
         """
-        Check all active applications for missed heartbeats
-        This method is called by the scheduler at regular intervals
+        Start monitoring the applications in ``shard``
+        """
+        with self._process_lock:
+            self._shard = shard
+            index, count = shard
+
+            self.deadlines.deactivate()
+            self.deadlines.activate(
+                self._wake,
+                owns=(lambda app_id: app_id % count == index) if count > 1 else None,
+            )
+            self._load_deadlines()
+
+            # Safety net for changes made by other processes, also run right
+            # away to pick up recoveries that happened while nothing monitored
+            self.scheduler.add_job(
+                func=self._check_heartbeats,
+                trigger=IntervalTrigger(seconds=self.check_interval),
+                id="heartbeat_monitor",
+                replace_existing=True,
+                next_run_time=datetime.now(),
+            )
+
+            # One instance is enough to create partitions for the coming months
+            if index == 0:
+                self.scheduler.add_job(
+                    func=self._ensure_partitions,
+                    trigger=IntervalTrigger(seconds=self.partitions.interval),
+                    id="heartbeat_partitions",
+                    replace_existing=True,
+                )
+            elif self.scheduler.get_job("heartbeat_partitions"):
+                self.scheduler.remove_job("heartbeat_partitions")
+
+            # ... and to expire old heartbeat events
+            if index == 0 and self.retention.days_to_keep > 0:
+                self.scheduler.add_job(
+                    func=self._run_retention,
+                    trigger=IntervalTrigger(seconds=self.retention.interval),
+                    id="heartbeat_retention",
+                    replace_existing=True,
+                )
+            elif self.scheduler.get_job("heartbeat_retention"):
+                self.scheduler.remove_job("heartbeat_retention")
+
+        self._wake(self.deadlines.next_deadline())
+        logger.info(
+            f"Heartbeat monitor active for shard {index + 1}/{count} - tracking "
+            f"{len(self.deadlines)} deadlines, re-checking every "
+            f"{self.check_interval} seconds"
+        )
+
+    def _deactivate(self):
+        """
+        Stop monitoring, another instance has taken over
+        """
+        with self._process_lock:
+            self._shard = None
+            self._overdue_applications = set()
+            self.deadlines.deactivate()
+
+            for job_id in (
+                "heartbeat_monitor",
+                "heartbeat_deadlines",
+                "heartbeat_partitions",
+                "heartbeat_retention",
+            ):
+                if self.scheduler.get_job(job_id):
+                    self.scheduler.remove_job(job_id)
+
+            with self._wakeup_lock:
+                self._next_wakeup = None
+
+        logger.info("Heartbeat monitor on standby")
+
+    def _update_membership(self):
+        """
+        Renew this instance's lease and follow any change in assignment
+        """
+        with self.app.app_context():
+            shard = self.coordinator.renew()
+
+        if shard == self._shard:
+            return
+
+        if shard is None:
+            self._deactivate()
+        else:
+            self._activate(shard)
+
+    def _refresh_application_index(self):
+        with self.app.app_context():
+            try:
+                application_index.load()
+            except Exception as e:
+                logger.error(f"Error refreshing application index: {str(e)}")
+
+    def _ensure_partitions(self):
+        with self.app.app_context():
+            try:
+                self.partitions.ensure()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error creating heartbeat partitions: {str(e)}")
+
+    def _run_retention(self):
+        with self.app.app_context():
+            try:
+                self.retention.run()
+            except Exception as e:
+                logger.error(f"Error running heartbeat retention: {str(e)}")
+
+    def _shard_filter(self):
+        """
+        SQL criteria limiting a query to the applications this monitor owns
+        """
+        index, count = self._shard or (0, 1)
+        return [Application.id % count == index] if count > 1 else []
+
+    def _wake(self, when=None):
+        """
+        Process deadlines at ``when`` (default: now) unless already due sooner
+        """
+        if not self.scheduler.running:
+            return
+
+        when = max(when or datetime.now(), datetime.now())
+
+        with self._wakeup_lock:
+            if self._next_wakeup is not None and self._next_wakeup <= when:
+                return
+            self._next_wakeup = when
+
+        self.scheduler.add_job(
+            func=self._process_deadlines,
+            trigger=DateTrigger(run_date=when),
+            id="heartbeat_deadlines",
+            replace_existing=True,
+            max_instances=2,
+            misfire_grace_time=None,
+        )
+
+    def _load_deadlines(self):
+        """
+        Warm-start from the stored deadlines and persisted overdue state
+
+        Applications that were already overdue before a restart are not
+        alerted again; they are only watched for recovery.
         """
         if not self.app:
             logger.error("No Flask app context available for heartbeat monitoring")
@@ -60,35 +253,187 @@ class HeartbeatMonitor:
 
         with self.app.app_context():
             try:
-                # Get all active applications
-                active_applications = Application.query.filter_by(is_active=True).all()
+                rows = db.session.execute(
+                    select(
+                        Application.id,
+                        Application.is_active,
+                        Application.next_deadline,
+                        Application.monitor_state,
+                    ).where(
+                        or_(
+                            Application.is_active.is_(True),
+                            Application.monitor_state == "overdue",
+                        ),
+                        *self._shard_filter(),
+                    )
+                ).all()
 
-                logger.debug(f"Checking {len(active_applications)} active applications")
+            except Exception as e:
+                logger.error(f"Error loading heartbeat deadlines: {str(e)}")
+                return
+
+        now = datetime.now()
+        self._overdue_applications = {
+            row.id for row in rows if row.monitor_state == "overdue"
+        }
+
+        for row in rows:
+            if not row.is_active or row.next_deadline is None:
+                continue
+
+            if row.id in self._overdue_applications and row.next_deadline <= now:
+                self.deadlines.mark_expired(row.id)
+            else:
+                self.deadlines.schedule(row.id, row.next_deadline)
+
+        logger.info(
+            f"Loaded deadlines for {len(self.deadlines)} active applications, "
+            f"{len(self._overdue_applications)} already overdue"
+        )
 
-                for application in active_applications:
-                    self._check_application_heartbeat(application)
+    def _check_heartbeats(self):
+        """
+        Re-check overdue applications and process any expired deadlines
+        This method is called by the scheduler at regular intervals
+        """
+        if not self.app:
+            logger.error("No Flask app context available for heartbeat monitoring")
+            return
 
+        with self._process_lock, self.app.app_context():
+            try:
+                self._recheck_overdue_applications()
+                self._schedule_overdue_applications()
             except Exception as e:
                 logger.error(f"Error during heartbeat check: {str(e)}")
 
-    def _check_application_heartbeat(self, application):
+        self._process_deadlines()
+
+    def _recheck_overdue_applications(self):
+        """
+        Detect recoveries from heartbeats recorded by other processes
+        """
+        if not self._overdue_applications:
+            return
+
+        applications = Application.query.filter(
+            Application.id.in_(self._overdue_applications)
+        ).all()
+
+        # Forget applications that were deleted while overdue
+        self._overdue_applications &= {application.id for application in applications}
+
+        for application in applications:
+            if application.is_active and not application.is_overdue():
+                self.deadlines.schedule(application.id, application.get_deadline())
+                self._check_application_heartbeat(application, False)
+
+    def _schedule_overdue_applications(self):
+        """
+        Queue applications the database reports as overdue
+
+        Catches applications created or reconfigured by other processes,
+        using the (is_active, next_deadline) index so only overdue rows
+        are read.
+        """
+        rows = db.session.execute(
+            select(Application.id, Application.next_deadline).where(
+                Application.is_active.is_(True),
+                Application.next_deadline <= datetime.now(),
+                *self._shard_filter(),
+            )
+        ).all()
+
+        for app_id, next_deadline in rows:
+            if app_id not in self._overdue_applications:
+                self.deadlines.schedule(app_id, next_deadline)
+
+    def _process_deadlines(self):
+        """
+        Handle expired deadlines and recoveries, then sleep until the next one
+        """
+        if not self.app:
+            logger.error("No Flask app context available for heartbeat monitoring")
+            return
+
+        with self._process_lock:
+            with self._wakeup_lock:
+                self._next_wakeup = None
+
+            with self.app.app_context():
+                try:
+                    expired = self.deadlines.pop_expired(datetime.now())
+                    recovered = self.deadlines.pop_recovered()
+
+                    if expired:
+                        self._handle_expired([app_id for app_id, _ in expired])
+                    if recovered:
+                        self._handle_recovered(recovered)
+
+                except Exception as e:
+                    logger.error(f"Error during heartbeat check: {str(e)}")
+
+            next_deadline = self.deadlines.next_deadline()
+            if next_deadline:
+                self._wake(next_deadline)
+
+    def _handle_expired(self, app_ids):
+        """
+        Confirm expired deadlines against the database and alert on new overdues
+        """
+        applications = Application.query.filter(Application.id.in_(app_ids)).all()
+
+        logger.debug(
+            f"Checking {len(applications)} applications with expired deadlines"
+        )
+
+        for application in applications:
+            if not application.is_active:
+                continue  # Deactivated, stop tracking it
+
+            # Another process may have recorded a heartbeat in the meantime
+            is_currently_overdue = application.is_overdue()
+            if is_currently_overdue:
+                self.deadlines.mark_expired(application.id)
+            else:
+                self.deadlines.schedule(application.id, application.get_deadline())
+
+            self._check_application_heartbeat(application, is_currently_overdue)
+
+    def _handle_recovered(self, app_ids):
+        """
+        Send recovery alerts for overdue applications that sent a heartbeat
+        """
+        applications = Application.query.filter(Application.id.in_(app_ids)).all()
+
+        for application in applications:
+            # The heartbeat may still be in the write-behind buffer, so trust
+            # the index rather than last_heartbeat here
+            self._check_application_heartbeat(application, False)
+
+    def _check_application_heartbeat(self, application, is_currently_overdue=None):
         """
         Check a single application for missed heartbeats and handle alerts
         """
         try:
-            is_currently_overdue = application.is_overdue()
+            if is_currently_overdue is None:
+                is_currently_overdue = application.is_overdue()
             was_previously_overdue = application.id in self._overdue_applications
 
             if is_currently_overdue and not was_previously_overdue:
                 # Application just became overdue - send alert
                 self._send_missed_heartbeat_alert(application)
                 self._overdue_applications.add(application.id)
+                self._save_monitor_state(application, "overdue")
+                event_broker.publish("overdue", {"id": application.id})
                 logger.warning(f"Application '{application.name}' is now overdue")
 
             elif not is_currently_overdue and was_previously_overdue:
                 # Application recovered - send recovery alert
                 self._send_heartbeat_recovery_alert(application)
                 self._overdue_applications.discard(application.id)
+                self._save_monitor_state(application, "healthy")
+                event_broker.publish("recovered", {"id": application.id})
                 logger.info(f"Application '{application.name}' has recovered")
 
             elif is_currently_overdue and was_previously_overdue:
@@ -98,6 +443,30 @@ class HeartbeatMonitor:
         except Exception as e:
             logger.error(f"Error checking heartbeat for {application.name}: {str(e)}")
 
+    def _save_monitor_state(self, application, state):
+        """
+        Persist a state transition so a restarted monitor does not re-alert
+        """
+        try:
+            # Core UPDATE so heartbeat columns written meanwhile are untouched
+            db.session.execute(
+                update(Application)
+                .where(Application.id == application.id)
+                .values(
+                    monitor_state=state,
+                    monitor_state_changed_at=datetime.now(),
+                    updated_at=Application.updated_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                f"Failed to save monitor state for {application.name}: {str(e)}"
+            )
+
     def _send_missed_heartbeat_alert(self, application):
         """
         Send alerts when an application misses its heartbeat window
@@ -118,6 +487,7 @@ class HeartbeatMonitor:
                 "status": "missed_heartbeat",
                 "application": application.name,
                 "last_heartbeat": application.last_heartbeat,
+                "last_seen_at": application.last_heartbeat or "Never",
                 "expected_interval": application.expected_interval,
                 "grace_period": application.grace_period,
                 "checked_at": datetime.now(),
@@ -133,7 +503,7 @@ class HeartbeatMonitor:
                         f"Failed to send {alert_config.alert_type} alert: {str(e)}"
                     )
 
-            logger.info(f"Sent missed heartbeat alerts for {application.name}")
+            logger.info(f"Queued missed heartbeat alerts for {application.name}")
 
         except Exception as e:
             logger.error(f"Error sending missed heartbeat alert: {str(e)}")
@@ -152,7 +522,9 @@ class HeartbeatMonitor:
                 "status": "heartbeat_recovered",
                 "application": application.name,
                 "last_heartbeat": application.last_heartbeat,
+                "last_seen_at": application.last_heartbeat or "Never",
                 "checked_at": datetime.now(),
+                "recovered_at": datetime.now(),
             }
 
             for alert_config in alert_configs:
@@ -163,52 +535,39 @@ class HeartbeatMonitor:
                 except Exception as e:
                     logger.error(f"Failed to send recovery alert: {str(e)}")
 
-            logger.info(f"Sent heartbeat recovery alerts for {application.name}")
+            logger.info(f"Queued heartbeat recovery alerts for {application.name}")
 
         except Exception as e:
             logger.error(f"Error sending heartbeat recovery alert: {str(e)}")
 
     def _send_application_alert(self, alert_config, application, result, alert_type):
         """
-        Send a single alert using the alert manager
+        Queue a single alert for delivery by the alert dispatcher
         """
-        plugin_class = self.alert_manager.plugins.get(alert_config.alert_type)
-        if not plugin_class:
-            logger.error(f"Unknown alert type: {alert_config.alert_type}")
-            return
-
-        try:
-            plugin = plugin_class(alert_config.configuration)
-
-            # Create alert context from result
-            alert_context = (
-                result
-                if isinstance(result, dict)
-                else {
-                    "checked_at": result,
-                    "last_seen_at": getattr(application, "last_heartbeat_at", None),
-                    "recovered_at": result if alert_type == "recovery" else None,
-                }
-            )
-
-            if alert_type == "missed_heartbeat":
-                plugin.send_failure_alert(application, alert_context)
-            elif alert_type == "recovery":
-                plugin.send_recovery_alert(application, alert_context)
-
-            logger.info(f"Sent {alert_type} alert via {alert_config.alert_type}")
-
-        except Exception as e:
-            logger.error(f"Alert plugin {alert_config.alert_type} failed: {str(e)}")
-            raise
+        self.alert_dispatcher.dispatch(
+            alert_config.alert_type,
+            alert_config.configuration,
+            application,
+            alert_type,
+            result,
+        )
 
     def get_status(self):
         """
         Get the current status of the heartbeat monitor
         """
+        next_deadline = self.deadlines.next_deadline()
         return {
             "running": self.scheduler.running,
+            "instance_id": self.coordinator.instance_id if self.coordinator else None,
+            "shard": list(self._shard) if self._shard else None,
             "check_interval": self.check_interval,
+            "tracked_applications": len(self.deadlines),
+            "next_deadline": next_deadline.isoformat() if next_deadline else None,
             "overdue_applications": len(self._overdue_applications),
             "overdue_app_ids": list(self._overdue_applications),
+            "partitions_scheduled": bool(
+                self.scheduler.get_job("heartbeat_partitions")
+            ),
+            "retention_scheduled": bool(self.scheduler.get_job("heartbeat_retention")),
         }
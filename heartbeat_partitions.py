@@ -0,0 +1,178 @@
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+TABLE = "heartbeat_event"
+
+
+def month_start(moment: datetime, offset: int = 0) -> datetime:
+    """
+    Get the first instant of the month containing ``moment``, moved by
+    ``offset`` months
+    """
+    months = moment.year * 12 + moment.month - 1 + offset
+    return datetime(months // 12, months % 12 + 1, 1)
+
+
+class HeartbeatPartitions:
+    """
+    Monthly range partitions of ``heartbeat_event`` on PostgreSQL.
+
+    New PostgreSQL databases create ``heartbeat_event`` partitioned by
+    ``received_at``, with one table per month named
+    ``heartbeat_event_pYYYYMM`` and a default partition for anything outside
+    them. Queries bounded by ``received_at`` only touch the months they
+    cover, and retention drops whole months instead of deleting rows.
+
+    The monitor creates upcoming months on a schedule of its own, whether
+    or not retention is enabled, so rows never pile up in the default
+    partition. Every method is a no-op on SQLite and on PostgreSQL tables
+    created before partitioning was introduced, where retention falls back
+    to deleting rows.
+    """
+
+    def __init__(self):
+        self.months_ahead = int(
+            os.getenv("HEARTBEAT_PARTITION_MONTHS_AHEAD", 2)
+        )  # future months to create partitions for
+        self.interval = int(
+            os.getenv("HEARTBEAT_PARTITION_INTERVAL", 86400)
+        )  # seconds between checks for missing partitions
+
+    def enabled(self):
+        """Check whether heartbeat_event is a partitioned table"""
+        if db.session.get_bind().dialect.name != "postgresql":
+            return False
+
+        return bool(
+            db.session.execute(
+                text(
+                    "SELECT 1 FROM pg_partitioned_table p "
+                    "JOIN pg_class c ON c.oid = p.partrelid "
+                    "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+                ),
+                {"table": TABLE},
+            ).first()
+        )
+
+    def ensure(self, now=None):
+        """
+        Create partitions for this month and the next ``months_ahead``
+        without committing
+
+        Returns:
+            Number of partitions created
+        """
+        if not self.enabled():
+            return 0
+
+        existing = {start for _, start in self.partitions()}
+        now = now or datetime.now()
+        db.session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {TABLE}_default "
+                f"PARTITION OF {TABLE} DEFAULT"
+            )
+        )
+
+        created = 0
+        for offset in range(self.months_ahead + 1):
+            start = month_start(now, offset)
+            if start in existing:
+                continue
+
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(
+                        text(
+                            f"CREATE TABLE {self._name(start)} PARTITION OF {TABLE} "
+                            f"FOR VALUES FROM ('{start.isoformat()}') "
+                            f"TO ('{month_start(start, 1).isoformat()}')"
+                        )
+                    )
+            except SQLAlchemyError as e:
+                # The default partition already holds rows for this month
+                logger.warning(
+                    f"Could not create heartbeat partition {self._name(start)}: {e}"
+                )
+                continue
+
+            created += 1
+            logger.info(f"Created heartbeat partition {self._name(start)}")
+
+        return created
+
+    def partitions(self):
+        """
+        Get the monthly partitions, oldest first
+
+        Returns:
+            List of (table name, month start) pairs
+        """
+        if not self.enabled():
+            return []
+
+        names = db.session.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table AND c.relname LIKE :pattern"
+            ),
+            {"table": TABLE, "pattern": f"{TABLE}_p%"},
+        ).scalars()
+
+        return sorted(
+            ((name, datetime.strptime(name[-6:], "%Y%m")) for name in names),
+            key=lambda partition: partition[1],
+        )
+
+    def expired(self, cutoff):
+        """
+        Get the monthly partitions that end at or before ``cutoff``
+
+        Returns:
+            List of (table name, month start, month end) tuples
+        """
+        return [
+            (name, start, month_start(start, 1))
+            for name, start in self.partitions()
+            if month_start(start, 1) <= cutoff
+        ]
+
+    def drop_before(self, cutoff):
+        """
+        Drop every monthly partition that ends at or before ``cutoff``
+        without committing
+
+        Returns:
+            Estimated number of heartbeat events dropped, from the planner
+            statistics rather than a count of each partition
+        """
+        dropped = 0
+        for name, _, _ in self.expired(cutoff):
+            dropped += db.session.execute(
+                text(
+                    "SELECT greatest(reltuples, 0)::bigint FROM pg_class "
+                    "WHERE oid = to_regclass(:name)"
+                ),
+                {"name": name},
+            ).scalar()
+            db.session.execute(text(f"DROP TABLE {name}"))
+            logger.info(f"Dropped heartbeat partition {name}")
+
+        return dropped
+
+    @staticmethod
+    def _name(start):
+        return f"{TABLE}_p{start:%Y%m}"
+
+
+heartbeat_partitions = HeartbeatPartitions()
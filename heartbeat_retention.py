@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from database import db
+from heartbeat_archive import heartbeat_archive
+from heartbeat_partitions import heartbeat_partitions
+from heartbeat_rollups import HeartbeatRollups
+from heartbeat_timeline import heartbeat_timeline
+from models import HeartbeatEvent
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatRetention:
+    """
+    Deletes heartbeat events older than ``days_to_keep`` in small batches.
+
+    A run walks the primary key upwards a window of ``batch_size`` ids at a
+    time and deletes the expired rows in each window in its own short
+    transaction, sleeping ``pause`` seconds in between, so heartbeat writes
+    never wait long for the table. It ends at the first window without
+    expired rows, where the newer part of the table begins. A run cut short
+    by ``max_runtime`` or an error resumes from the same id next time. Whole
+    months are dropped first on partitioned PostgreSQL tables, and timeline
+    storage expires whole days. When the archive is enabled, events are
+    archived before they are deleted.
+
+    Nothing is deleted on a schedule unless ``HEARTBEAT_RETENTION_DAYS`` is
+    set, so upgrading never removes history an install used to keep.
+    """
+
+    def __init__(self):
+        self.days_to_keep = int(
+            os.getenv("HEARTBEAT_RETENTION_DAYS", 0)
+        )  # 0 keeps every event and schedules no runs
+        self.interval = int(os.getenv("HEARTBEAT_RETENTION_INTERVAL", 3600))  # seconds
+        self.batch_size = int(os.getenv("HEARTBEAT_RETENTION_BATCH_SIZE", 1000))
+        self.pause = float(
+            os.getenv("HEARTBEAT_RETENTION_PAUSE", 0.1)
+        )  # seconds between batches
+        self.max_runtime = float(
+            os.getenv("HEARTBEAT_RETENTION_MAX_RUNTIME", 300)
+        )  # seconds per run before yielding to the next one
+        self._resume = None  # (days_to_keep, last id handled) of an unfinished run
+        self._cancelled = threading.Event()
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "deleted": 0,
+            "batches": 0,
+            "partitions_dropped": 0,
+            "archived": 0,
+            "last_run_at": None,
+            "last_run_deleted": 0,
+            "last_run_batches": 0,
+            "last_run_seconds": 0.0,
+            "last_rows_per_second": 0.0,
+            "last_max_lock_seconds": 0.0,
+            "total_lock_seconds": 0.0,
+            "max_lock_seconds": 0.0,
+        }
+
+    def run(self, days_to_keep=None):
+        """
+        Delete expired heartbeat events (requires an app context)
+
+        Args:
+            days_to_keep: Override the configured number of days to keep
+
+        Returns:
+            Number of events deleted
+        """
+        days_to_keep = self.days_to_keep if days_to_keep is None else days_to_keep
+        if days_to_keep <= 0:
+            raise ValueError("Days to keep must be positive")
+
+        with self._run_lock:
+            self._cancelled.clear()
+            return self._run(days_to_keep)
+
+    def cancel(self):
+        """Stop a run in progress after its current batch"""
+        self._cancelled.set()
+
+    def _run(self, days_to_keep):
+        started = time.monotonic()
+        cutoff = datetime.now() - timedelta(days=days_to_keep)
+        resume_days, cursor = self._resume or (days_to_keep, 0)
+        if resume_days != days_to_keep:
+            cursor = 0
+
+        deleted = batches = dropped = archived = 0
+        max_lock = 0.0
+        finished = False
+
+        try:
+            if heartbeat_archive.enabled:
+                for _, month, month_end in heartbeat_partitions.expired(cutoff):
+                    archived += self._archive_range(month, month_end)
+
+            dropped = len(heartbeat_partitions.partitions())
+            deleted += heartbeat_partitions.drop_before(cutoff)
+            dropped -= len(heartbeat_partitions.partitions())
+            heartbeat_partitions.ensure()
+            db.session.commit()
+
+            while heartbeat_timeline.enabled and not self._cancelled.is_set():
+                timelines = heartbeat_timeline.expired(cutoff, self.batch_size)
+                if not timelines:
+                    break
+
+                if heartbeat_archive.enabled:
+                    archived += heartbeat_archive.write(
+                        tuple(heartbeat)
+                        for timeline in timelines
+                        for heartbeat in heartbeat_timeline.heartbeats(timeline)
+                    )
+
+                locked = time.monotonic()
+                deleted += heartbeat_timeline.delete(timelines)
+                db.session.commit()
+                lock_seconds = time.monotonic() - locked
+
+                batches += 1
+                max_lock = max(max_lock, lock_seconds)
+                self._record_batch(lock_seconds)
+                self._cancelled.wait(self.pause)
+
+            while not self._cancelled.is_set():
+                window = db.session.execute(
+                    select(
+                        HeartbeatEvent.id,
+                        HeartbeatEvent.application_id,
+                        HeartbeatEvent.received_at,
+                    )
+                    .where(HeartbeatEvent.id > cursor)
+                    .order_by(HeartbeatEvent.id)
+                    .limit(self.batch_size)
+                ).all()
+                expired = [
+                    tuple(row)
+                    for row in window
+                    if row.received_at is not None and row.received_at < cutoff
+                ]
+
+                if expired:
+                    if heartbeat_archive.enabled:
+                        archived += heartbeat_archive.write(expired)
+
+                    locked = time.monotonic()
+                    result = db.session.execute(
+                        delete(HeartbeatEvent).where(
+                            HeartbeatEvent.id > cursor,
+                            HeartbeatEvent.id <= window[-1].id,
+                            HeartbeatEvent.received_at < cutoff,
+                        )
+                    )
+                    db.session.commit()
+                    lock_seconds = time.monotonic() - locked
+
+                    deleted += result.rowcount
+                    batches += 1
+                    max_lock = max(max_lock, lock_seconds)
+                    self._record_batch(lock_seconds)
+                else:
+                    db.session.rollback()
+
+                if not expired or len(window) < self.batch_size:
+                    finished = True
+                    break
+
+                cursor = window[-1].id
+                if time.monotonic() - started >= self.max_runtime:
+                    break
+                self._cancelled.wait(self.pause)
+
+            if finished:
+                # Minute rollups cover the same window as the raw events
+                HeartbeatRollups.prune_minutes(cutoff)
+                db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Heartbeat retention failed after {deleted} events: {str(e)}")
+            raise
+
+        finally:
+            self._resume = None if finished else (days_to_keep, cursor)
+            self._record_run(deleted, batches, dropped, archived, max_lock, started)
+
+        elapsed = time.monotonic() - started
+        if deleted:
+            logger.info(
+                f"Deleted {deleted} heartbeat events older than {cutoff} in "
+                f"{batches} batches over {elapsed:.1f}s (longest lock "
+                f"{max_lock:.3f}s){'' if finished else ', will resume'}"
+            )
+        return deleted
+
+    def _record_batch(self, lock_seconds):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["total_lock_seconds"] += lock_seconds
+            self._stats["max_lock_seconds"] = max(
+                self._stats["max_lock_seconds"], lock_seconds
+            )
+
+    def _archive_range(self, start, end, batch_size=10000):
+        """
+        Archive the events received in ``[start, end)`` before they are
+        dropped with their partition
+        """
+        result = db.session.execute(
+            select(
+                HeartbeatEvent.id,
+                HeartbeatEvent.application_id,
+                HeartbeatEvent.received_at,
+            )
+            .where(
+                HeartbeatEvent.received_at >= start, HeartbeatEvent.received_at < end
+            )
+            .order_by(HeartbeatEvent.application_id, HeartbeatEvent.received_at),
+            execution_options={"yield_per": batch_size},
+        )
+        try:
+            return sum(
+                heartbeat_archive.write(tuple(row) for row in rows)
+                for rows in result.partitions()
+            )
+        finally:
+            result.close()
+
+    def _record_run(self, deleted, batches, dropped, archived, max_lock, started):
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["deleted"] += deleted
+            self._stats["partitions_dropped"] += dropped
+            self._stats["archived"] += archived
+            self._stats["last_run_at"] = datetime.now().isoformat()
+            self._stats["last_run_deleted"] = deleted
+            self._stats["last_run_seconds"] = round(elapsed, 3)
+            self._stats["last_rows_per_second"] = (
+                round(deleted / elapsed, 1) if elapsed > 0 else 0.0
+            )
+            self._stats["last_run_batches"] = batches
+            self._stats["last_max_lock_seconds"] = round(max_lock, 4)
+
+    def get_status(self):
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats.update(
+            {
+                "days_to_keep": self.days_to_keep,
+                "interval": self.interval,
+                "batch_size": self.batch_size,
+                "pause": self.pause,
+                "resume_after_id": self._resume[1] if self._resume else None,
+                "archive_enabled": heartbeat_archive.enabled,
+                "running": self._run_lock.locked(),
+            }
+        )
+        return stats
+
+
+heartbeat_retention = HeartbeatRetention()
@@ -0,0 +1,336 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, case, delete, extract, func, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db
+from models import Application, HeartbeatEvent, HeartbeatRollup
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+
+
+def bucket_start(moment: datetime, resolution: int) -> datetime:
+    """
+    Get the start of the minute or hour bucket containing ``moment``
+    """
+    if resolution == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+class HeartbeatRollups:
+    """
+    Per-application heartbeat counts by minute and by hour.
+
+    Every write path that inserts ``HeartbeatEvent`` rows calls ``record``
+    in the same transaction, which upserts one row per touched bucket. Stats
+    then sum at most a day of hourly rows instead of counting raw events, so
+    they cost the same with a week or a year of history. Minute rollups are
+    only needed for the partial hours at the edges of a range and are
+    pruned with the raw events; hourly rollups are kept.
+    """
+
+    @staticmethod
+    def record(
+        events: Iterable[Tuple[int, datetime]],
+        previous: Optional[Dict[int, Optional[datetime]]] = None,
+    ) -> None:
+        """
+        Add heartbeats to the rollups without committing
+
+        Args:
+            events: (application_id, received_at) pairs
+            previous: Each application's last heartbeat before these events,
+                used to measure the gap before the first one
+        """
+        rows = HeartbeatRollups._aggregate(events, dict(previous or {}))
+        if rows:
+            HeartbeatRollups._upsert(rows)
+
+    @staticmethod
+    def record_one(application_id: int, received_at: datetime) -> None:
+        """
+        Add a single heartbeat to the rollups without committing
+
+        The gap is measured from ``Application.last_heartbeat`` inside the
+        upsert itself, so this must run before last_heartbeat is updated and
+        costs no extra round trip.
+        """
+        if db.session.get_bind().dialect.name not in ("sqlite", "postgresql"):
+            previous = db.session.execute(
+                select(Application.last_heartbeat).where(
+                    Application.id == application_id
+                )
+            ).scalar()
+            HeartbeatRollups.record(
+                [(application_id, received_at)], {application_id: previous}
+            )
+            return
+
+        last = (
+            select(Application.last_heartbeat)
+            .where(Application.id == application_id)
+            .scalar_subquery()
+        )
+        gap = _greatest(
+            func.coalesce(_seconds_between(last, literal(received_at, DateTime)), 0.0),
+            0.0,
+        )
+        HeartbeatRollups._upsert(
+            [
+                {
+                    "application_id": application_id,
+                    "resolution": resolution,
+                    "bucket_start": bucket_start(received_at, resolution),
+                    "heartbeats": 1,
+                    "first_seen": received_at,
+                    "last_seen": received_at,
+                    "max_gap": gap,
+                }
+                for resolution in (MINUTE, HOUR)
+            ],
+            multivalues=True,
+        )
+
+    @staticmethod
+    def _aggregate(events, previous):
+        by_application = {}
+        for application_id, received_at in events:
+            by_application.setdefault(application_id, []).append(received_at)
+
+        buckets = {}
+        for application_id, times in by_application.items():
+            last = previous.get(application_id)
+            for received_at in sorted(times):
+                # Late heartbeats older than the last one do not open a gap
+                gap = (received_at - last).total_seconds() if last else 0.0
+                gap = max(gap, 0.0)
+                if last is None or received_at > last:
+                    last = received_at
+
+                for resolution in (MINUTE, HOUR):
+                    key = (
+                        application_id,
+                        resolution,
+                        bucket_start(received_at, resolution),
+                    )
+                    row = buckets.get(key)
+                    if row is None:
+                        buckets[key] = {
+                            "application_id": application_id,
+                            "resolution": resolution,
+                            "bucket_start": key[2],
+                            "heartbeats": 1,
+                            "first_seen": received_at,
+                            "last_seen": received_at,
+                            "max_gap": gap,
+                        }
+                    else:
+                        row["heartbeats"] += 1
+                        row["first_seen"] = min(row["first_seen"], received_at)
+                        row["last_seen"] = max(row["last_seen"], received_at)
+                        row["max_gap"] = max(row["max_gap"], gap)
+
+            previous[application_id] = last
+
+        return list(buckets.values())
+
+    @staticmethod
+    def _upsert(rows, multivalues=False):
+        dialect = db.session.get_bind().dialect.name
+        if dialect not in ("sqlite", "postgresql"):
+            HeartbeatRollups._merge(rows)
+            return
+
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(HeartbeatRollup)
+        if multivalues:
+            # Values may be SQL expressions, so send one multi-row INSERT
+            statement, rows = statement.values(rows), None
+        table, excluded = HeartbeatRollup.__table__.c, statement.excluded
+
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["application_id", "resolution", "bucket_start"],
+                set_={
+                    "heartbeats": table.heartbeats + excluded.heartbeats,
+                    "first_seen": _least(table.first_seen, excluded.first_seen),
+                    "last_seen": _greatest(table.last_seen, excluded.last_seen),
+                    "max_gap": _greatest(table.max_gap, excluded.max_gap),
+                },
+            ),
+            rows,
+        )
+
+    @staticmethod
+    def _merge(rows):
+        """Read-modify-write fallback for databases without ON CONFLICT"""
+        for values in rows:
+            rollup = db.session.get(
+                HeartbeatRollup,
+                (
+                    values["application_id"],
+                    values["resolution"],
+                    values["bucket_start"],
+                ),
+            )
+            if rollup is None:
+                db.session.add(HeartbeatRollup(**values))
+                continue
+
+            rollup.heartbeats += values["heartbeats"]
+            rollup.first_seen = min(rollup.first_seen, values["first_seen"])
+            rollup.last_seen = max(rollup.last_seen, values["last_seen"])
+            rollup.max_gap = max(rollup.max_gap, values["max_gap"])
+
+    @staticmethod
+    def count(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        application_id: Optional[int] = None,
+    ) -> int:
+        """
+        Count heartbeats received between ``start`` and ``end``
+
+        Whole hours are read from hourly rollups and the partial hours at
+        either end from minute rollups, so the result is exact to the minute.
+
+        Args:
+            start: Beginning of the range, or None for all history
+            end: End of the range (exclusive), defaults to now
+            application_id: Only count this application's heartbeats
+        """
+        if start is None:
+            condition = HeartbeatRollup.resolution == HOUR
+        else:
+            end = end or datetime.now()
+            first_minute = bucket_start(start, MINUTE)
+            first_hour = bucket_start(first_minute + timedelta(seconds=HOUR - 1), HOUR)
+            last_hour = max(bucket_start(end, HOUR), first_hour)
+            condition = or_(
+                _buckets(MINUTE, first_minute, min(first_hour, end)),
+                _buckets(HOUR, first_hour, last_hour),
+                _buckets(MINUTE, last_hour, end),
+            )
+
+        query = select(func.coalesce(func.sum(HeartbeatRollup.heartbeats), 0)).where(
+            condition
+        )
+        if application_id is not None:
+            query = query.where(HeartbeatRollup.application_id == application_id)
+        return db.session.execute(query).scalar()
+
+    @staticmethod
+    def summary(application_id: int, start: Optional[datetime] = None) -> Dict:
+        """
+        Summarize an application's heartbeats from hourly rollups
+
+        Args:
+            application_id: Application ID
+            start: Only include hours from the one containing ``start``
+
+        Returns:
+            Dictionary with heartbeats, first_seen, last_seen and max_gap
+        """
+        query = select(
+            func.coalesce(func.sum(HeartbeatRollup.heartbeats), 0),
+            func.min(HeartbeatRollup.first_seen),
+            func.max(HeartbeatRollup.last_seen),
+            func.max(HeartbeatRollup.max_gap),
+        ).where(
+            HeartbeatRollup.application_id == application_id,
+            HeartbeatRollup.resolution == HOUR,
+        )
+        if start is not None:
+            query = query.where(
+                HeartbeatRollup.bucket_start >= bucket_start(start, HOUR)
+            )
+
+        heartbeats, first_seen, last_seen, max_gap = db.session.execute(query).one()
+        return {
+            "heartbeats": heartbeats,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "max_gap": max_gap,
+        }
+
+    @staticmethod
+    def prune_minutes(before: datetime) -> int:
+        """
+        Delete minute rollups older than ``before`` without committing
+
+        Returns:
+            Number of rollups deleted
+        """
+        result = db.session.execute(
+            delete(HeartbeatRollup).where(
+                HeartbeatRollup.resolution == MINUTE,
+                HeartbeatRollup.bucket_start < bucket_start(before, MINUTE),
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def backfill(batch_size: int = 10000) -> int:
+        """
+        Build rollups from existing heartbeat events when there are none yet
+
+        Returns:
+            Number of events rolled up
+        """
+        if db.session.execute(select(HeartbeatRollup.application_id).limit(1)).first():
+            return 0
+
+        result = db.session.execute(
+            select(HeartbeatEvent.application_id, HeartbeatEvent.received_at).order_by(
+                HeartbeatEvent.application_id, HeartbeatEvent.received_at
+            ),
+            execution_options={"yield_per": batch_size},
+        )
+
+        previous = {}
+        total = 0
+        try:
+            for rows in result.partitions():
+                rows = [tuple(row) for row in rows]
+                HeartbeatRollups.record(rows, previous)
+                for application_id, received_at in rows:
+                    previous[application_id] = received_at
+                total += len(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            result.close()
+
+        if total:
+            logger.info(f"Built heartbeat rollups from {total} existing events")
+        return total
+
+
+def _buckets(resolution, start, end):
+    return and_(
+        HeartbeatRollup.resolution == resolution,
+        HeartbeatRollup.bucket_start >= start,
+        HeartbeatRollup.bucket_start < end,
+    )
+
+
+def _seconds_between(start, end):
+    if db.session.get_bind().dialect.name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400.0
+    return extract("epoch", end - start)
+
+
+def _least(a, b):
+    return case((b < a, b), else_=a)
+
+
+def _greatest(a, b):
+    return case((b > a, b), else_=a)
@@ -0,0 +1,355 @@
+import heapq
+import logging
+import os
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from itertools import chain
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db
+from models import HeartbeatEvent, HeartbeatTimeline
+
+logger = logging.getLogger(__name__)
+
+# Heartbeats of one application-day fit well below this, so pseudo ids
+# built from the day and position sort like (received_at, id)
+IDS_PER_DAY = 1_000_000
+
+
+class TimelineHeartbeat(
+    namedtuple("TimelineHeartbeat", ["id", "application_id", "received_at"])
+):
+    """
+    A heartbeat shaped like a HeartbeatEvent, decoded from a timeline or
+    taken from an application's ``last_heartbeat``
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "application_id": self.application_id,
+            "received_at": self.received_at.isoformat() if self.received_at else None,
+        }
+
+
+def encode(offsets, previous=0):
+    """
+    Encode second offsets as zigzag varint deltas from ``previous``
+    """
+    data = bytearray()
+    for offset in offsets:
+        delta = offset - previous
+        previous = offset
+        value = (delta << 1) ^ (delta >> 63)  # zigzag keeps late heartbeats small
+        while value >= 0x80:
+            data.append((value & 0x7F) | 0x80)
+            value >>= 7
+        data.append(value)
+    return bytes(data)
+
+
+def decode(data):
+    """
+    Decode an encoded timeline back to second offsets, in append order
+    """
+    offsets = []
+    previous = value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+
+        previous += (value >> 1) ^ -(value & 1)
+        offsets.append(previous)
+        value = shift = 0
+    return offsets
+
+
+class HeartbeatTimelines:
+    """
+    Optional compact storage engine for heartbeat history.
+
+    With ``HEARTBEAT_STORAGE=timeline`` heartbeats are appended to one
+    ``HeartbeatTimeline`` row per application per day instead of inserting a
+    ``HeartbeatEvent`` row each. A heartbeat then costs one to three bytes,
+    the zigzag varint delta of its second of the day, instead of a row with
+    its key, foreign key, timestamp and two index entries. Timestamps are
+    kept to the second. History, export and retention decode timelines
+    transparently; statistics come from the rollups in either mode.
+
+    Appending rewrites the day's blob, so timeline storage turns on the
+    write-behind heartbeat buffer, which appends a batch at a time grouped
+    per application and day.
+
+    Events recorded before timeline storage was turned on are moved into
+    timelines once at startup by ``migrate_events``, so history is only
+    ever read from timelines.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("HEARTBEAT_STORAGE", "events").lower() == "timeline"
+
+    def append(self, events):
+        """
+        Append heartbeats to their timelines without committing
+
+        Missing timelines are inserted first and existing ones then read with
+        ``FOR UPDATE``, so concurrent appends to a day wait for each other
+        (on SQLite the insert takes the database write lock).
+
+        Args:
+            events: (application_id, received_at) pairs
+        """
+        days = {}
+        for application_id, received_at in events:
+            day = received_at.date()
+            offset = (received_at - datetime.combine(day, time())).seconds
+            days.setdefault((application_id, day), []).append(offset)
+
+        if not days:
+            return
+
+        self._create_missing(list(days))
+        timelines = db.session.execute(
+            select(HeartbeatTimeline)
+            .where(
+                tuple_(HeartbeatTimeline.application_id, HeartbeatTimeline.day).in_(
+                    list(days)
+                )
+            )
+            .with_for_update()
+        ).scalars()
+
+        for timeline in timelines:
+            offsets = sorted(days[(timeline.application_id, timeline.day)])
+            timeline.data = (timeline.data or b"") + encode(
+                offsets, timeline.last_offset or 0
+            )
+            timeline.heartbeats = (timeline.heartbeats or 0) + len(offsets)
+            timeline.last_offset = offsets[-1]
+
+    def migrate_events(self, batch_size=1000):
+        """
+        Move heartbeat events into timelines (requires an app context)
+
+        Each batch is appended and its rows deleted in one transaction, so
+        an interrupted migration carries on where it stopped next time.
+
+        Returns:
+            Number of events moved
+        """
+        moved = 0
+        try:
+            while True:
+                rows = db.session.execute(
+                    select(
+                        HeartbeatEvent.id,
+                        HeartbeatEvent.application_id,
+                        HeartbeatEvent.received_at,
+                    )
+                    .order_by(HeartbeatEvent.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+
+                self.append(
+                    (row.application_id, row.received_at)
+                    for row in rows
+                    if row.received_at is not None
+                )
+                db.session.execute(
+                    delete(HeartbeatEvent).where(HeartbeatEvent.id <= rows[-1].id)
+                )
+                db.session.commit()
+                moved += len(rows)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(
+                f"Moving heartbeat events to timelines failed after {moved}: {str(e)}"
+            )
+            raise
+
+        if moved:
+            logger.info(f"Moved {moved} heartbeat events to timelines")
+        return moved
+
+    def _create_missing(self, keys):
+        """
+        Insert empty timelines, leaving any that already exist alone
+        """
+        rows = [
+            {
+                "application_id": application_id,
+                "day": day,
+                "heartbeats": 0,
+                "last_offset": 0,
+                "data": b"",
+            }
+            for application_id, day in keys
+        ]
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            db.session.execute(insert(HeartbeatTimeline).on_conflict_do_nothing(), rows)
+            return
+
+        for values in rows:
+            if not db.session.get(
+                HeartbeatTimeline, (values["application_id"], values["day"])
+            ):
+                db.session.add(HeartbeatTimeline(**values))
+        db.session.flush()
+
+    def history(self, application_id, before=None, after=None):
+        """
+        Yield an application's heartbeats newest first, decoding a day at a
+        time so only the days actually read are loaded
+
+        Args:
+            application_id: Application ID
+            before: (received_at, id) key, only yield heartbeats before it
+            after: (received_at, id) key, yield heartbeats after it oldest
+                first instead
+        """
+        query = select(HeartbeatTimeline).where(
+            HeartbeatTimeline.application_id == application_id
+        )
+        if after:
+            query = query.where(HeartbeatTimeline.day >= after[0].date()).order_by(
+                HeartbeatTimeline.day
+            )
+        else:
+            if before:
+                query = query.where(HeartbeatTimeline.day <= before[0].date())
+            query = query.order_by(HeartbeatTimeline.day.desc())
+
+        result = db.session.execute(query.execution_options(yield_per=8)).scalars()
+        try:
+            for timeline in result:
+                heartbeats = self.heartbeats(timeline)
+                if not after:
+                    heartbeats.reverse()
+
+                for heartbeat in heartbeats:
+                    key = (heartbeat.received_at, heartbeat.id)
+                    if (after and key <= after) or (before and key >= before):
+                        continue
+                    yield heartbeat
+        finally:
+            result.close()
+
+    def heartbeats(self, timeline):
+        """
+        Decode a timeline into TimelineHeartbeats, oldest first
+        """
+        day_start = datetime.combine(timeline.day, time())
+        first_id = timeline.day.toordinal() * IDS_PER_DAY
+        return [
+            TimelineHeartbeat(
+                first_id + position,
+                timeline.application_id,
+                day_start + timedelta(seconds=offset),
+            )
+            for position, offset in enumerate(sorted(decode(timeline.data)))
+        ]
+
+    def total(self, application_id):
+        """Count an application's stored heartbeats"""
+        return db.session.execute(
+            select(func.coalesce(func.sum(HeartbeatTimeline.heartbeats), 0)).where(
+                HeartbeatTimeline.application_id == application_id
+            )
+        ).scalar()
+
+    def iter_events(self, application_id=None, start=None, end=None, batch_size=1000):
+        """
+        Stream heartbeats in batches, oldest first, merging every
+        application's timeline for a day at a time
+
+        Yields:
+            Lists of TimelineHeartbeats
+        """
+        query = select(HeartbeatTimeline).order_by(HeartbeatTimeline.day)
+        if application_id is not None:
+            query = query.where(HeartbeatTimeline.application_id == application_id)
+        if start is not None:
+            query = query.where(HeartbeatTimeline.day >= start.date())
+        if end is not None:
+            query = query.where(HeartbeatTimeline.day <= end.date())
+
+        result = db.session.execute(query.execution_options(yield_per=64)).scalars()
+        batch = []
+        day, timelines = None, []
+
+        try:
+            for timeline in chain(result, [None]):
+                if timeline is not None and timeline.day == day:
+                    timelines.append(self.heartbeats(timeline))
+                    continue
+
+                # Every timeline of the previous day is loaded, merge them
+                for heartbeat in heapq.merge(*timelines, key=_by_time):
+                    if start is not None and heartbeat.received_at < start:
+                        continue
+                    if end is not None and heartbeat.received_at >= end:
+                        continue
+                    batch.append(heartbeat)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+
+                if timeline is not None:
+                    day, timelines = timeline.day, [self.heartbeats(timeline)]
+
+            if batch:
+                yield batch
+        finally:
+            result.close()
+
+    def expired(self, cutoff, limit):
+        """
+        Get up to ``limit`` timelines for days that ended before ``cutoff``
+        """
+        return (
+            db.session.execute(
+                select(HeartbeatTimeline)
+                .where(HeartbeatTimeline.day < cutoff.date())
+                .order_by(HeartbeatTimeline.day, HeartbeatTimeline.application_id)
+                .limit(limit)
+            )
+            .scalars()
+            .all()
+        )
+
+    def delete(self, timelines):
+        """
+        Delete timelines without committing
+
+        Returns:
+            Number of heartbeats they held
+        """
+        if not timelines:
+            return 0
+
+        db.session.execute(
+            delete(HeartbeatTimeline).where(
+                tuple_(HeartbeatTimeline.application_id, HeartbeatTimeline.day).in_(
+                    [(timeline.application_id, timeline.day) for timeline in timelines]
+                )
+            )
+        )
+        return sum(timeline.heartbeats for timeline in timelines)
+
+
+def _by_time(heartbeat):
+    return (heartbeat.received_at, heartbeat.id)
+
+
+heartbeat_timeline = HeartbeatTimelines()
@@ -1,6 +1,8 @@
 import uuid
 from datetime import datetime, timedelta
 
+from sqlalchemy import event
+
 from database import db
 
 
@@ -17,14 +19,29 @@ class Application(db.Model):
     expected_interval = db.Column(db.Integer, nullable=False)  # seconds
     grace_period = db.Column(db.Integer, default=0)  # seconds
     last_heartbeat = db.Column(db.DateTime, nullable=True)
+    # last_heartbeat (or created_at) + expected_interval + grace_period
+    next_deadline = db.Column(db.DateTime, nullable=True)
+    # Last state reported by the monitor: healthy or overdue
+    monitor_state = db.Column(db.String(20), nullable=True)
+    monitor_state_changed_at = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
+    __table_args__ = (
+        db.Index("ix_application_active_deadline", "is_active", "next_deadline"),
+    )
+
     # Relationships
     heartbeat_events = db.relationship(
         "HeartbeatEvent", backref="application", lazy=True, cascade="all, delete-orphan"
     )
+    heartbeat_rollups = db.relationship(
+        "HeartbeatRollup", lazy=True, cascade="all, delete-orphan"
+    )
+    heartbeat_timelines = db.relationship(
+        "HeartbeatTimeline", lazy=True, cascade="all, delete-orphan"
+    )
     alert_configs = db.relationship(
         "ApplicationAlertConfig",
         backref="application",
@@ -45,27 +62,64 @@ class Application(db.Model):
             "last_heartbeat": (
                 self.last_heartbeat.isoformat() if self.last_heartbeat else None
             ),
+            "next_deadline": (
+                self.next_deadline.isoformat() if self.next_deadline else None
+            ),
             "is_active": self.is_active,
+            "monitor_state": self.monitor_state,
+            "monitor_state_changed_at": (
+                self.monitor_state_changed_at.isoformat()
+                if self.monitor_state_changed_at
+                else None
+            ),
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
 
+    @staticmethod
+    def calculate_deadline(last_heartbeat, created_at, expected_interval, grace_period):
+        """
+        Calculate when an application becomes overdue without another heartbeat
+
+        Applications that never sent a heartbeat are measured from creation.
+        """
+        reference = last_heartbeat or created_at
+        return reference + timedelta(
+            seconds=int(expected_interval) + int(grace_period or 0)
+        )
+
+    def get_deadline(self):
+        """
+        Get the moment this application becomes overdue
+        """
+        return self.calculate_deadline(
+            self.last_heartbeat,
+            self.created_at,
+            self.expected_interval,
+            self.grace_period,
+        )
+
     def is_overdue(self):
         """
         Check if this application is overdue for a heartbeat
+
+        True once the last heartbeat (or creation, if it never sent one) is
+        older than the expected interval plus grace period.
         """
-        if not self.last_heartbeat:
-            # Never received heartbeat, overdue if created > interval + grace ago
-            threshold = datetime.now() - timedelta(
-                seconds=self.expected_interval + self.grace_period
-            )
-            return self.created_at <= threshold
-
-        # Check if last heartbeat is older than expected interval + grace period
-        threshold = datetime.now() - timedelta(
-            seconds=self.expected_interval + self.grace_period
-        )
-        return self.last_heartbeat <= threshold
+        return self.get_deadline() <= datetime.now()
+
+
+@event.listens_for(Application, "before_insert")
+@event.listens_for(Application, "before_update")
+def _refresh_next_deadline(mapper, connection, application):
+    """
+    Keep the stored deadline in step with ORM changes to an application
+
+    Bulk heartbeat writes bypass this and set next_deadline themselves.
+    """
+    if application.created_at is None:
+        application.created_at = datetime.now()
+    application.next_deadline = application.get_deadline()
 
 
 class HeartbeatEvent(db.Model):
@@ -79,6 +133,23 @@ class HeartbeatEvent(db.Model):
     )
     received_at = db.Column(db.DateTime, default=datetime.now)
 
+    __table_args__ = (
+        # Latest event per application for the dashboard
+        db.Index("ix_heartbeat_event_application_id", "application_id", "id"),
+        # Keyset pagination of an application's history
+        db.Index(
+            "ix_heartbeat_event_application_received",
+            "application_id",
+            "received_at",
+            "id",
+        ),
+        # Monthly partitions on PostgreSQL, see heartbeat_partitions.py
+        {
+            "postgresql_partition_by": "RANGE (received_at)",
+            "info": {"partition_key": "received_at"},
+        },
+    )
+
     def __repr__(self):
         return f"<HeartbeatEvent {self.application_id}: {self.received_at}>"
 
@@ -90,6 +161,59 @@ class HeartbeatEvent(db.Model):
         }
 
 
+class HeartbeatRollup(db.Model):
+    """
+    Heartbeats per application per minute or hour, kept up to date at ingest
+    so statistics never have to count HeartbeatEvent rows
+    """
+
+    application_id = db.Column(
+        db.Integer, db.ForeignKey("application.id"), primary_key=True
+    )
+    resolution = db.Column(db.Integer, primary_key=True)  # bucket length in seconds
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    heartbeats = db.Column(db.Integer, nullable=False, default=0)
+    first_seen = db.Column(db.DateTime, nullable=False)
+    last_seen = db.Column(db.DateTime, nullable=False)
+    # Longest wait before a heartbeat in this bucket, in seconds
+    max_gap = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        # Heartbeats across all applications, e.g. today's total
+        db.Index("ix_heartbeat_rollup_resolution_bucket", "resolution", "bucket_start"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<HeartbeatRollup {self.application_id}: "
+            f"{self.bucket_start} ({self.resolution}s)>"
+        )
+
+
+class HeartbeatTimeline(db.Model):
+    """
+    Compact heartbeat storage, one row per application per day holding the
+    encoded second of every heartbeat (see heartbeat_timeline.py)
+    """
+
+    application_id = db.Column(
+        db.Integer, db.ForeignKey("application.id"), primary_key=True
+    )
+    day = db.Column(db.Date, primary_key=True)
+    heartbeats = db.Column(db.Integer, nullable=False, default=0)
+    # Offset the next appended delta is relative to, in seconds since midnight
+    last_offset = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False, default=b"")
+
+    __table_args__ = (
+        # Retention by day across all applications
+        db.Index("ix_heartbeat_timeline_day", "day"),
+    )
+
+    def __repr__(self):
+        return f"<HeartbeatTimeline {self.application_id}: {self.day}>"
+
+
 class ApplicationAlertConfig(db.Model):
     """
     Alert configurations for applications (separate from healthcheck alerts)
@@ -116,3 +240,59 @@ class ApplicationAlertConfig(db.Model):
             "is_active": self.is_active,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+
+class MonitorInstance(db.Model):
+    """
+    Lease held by a running HeartbeatMonitor, used to elect a leader or to
+    split applications between several monitors
+    """
+
+    instance_id = db.Column(db.String(100), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<MonitorInstance {self.instance_id}>"
+
+
+class AlertOutbox(db.Model):
+    """
+    Alert waiting for delivery, kept until a plugin accepts it so failed
+    deliveries are retried and restarts do not lose alerts
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    alert_type = db.Column(db.String(50), nullable=False)  # email, slack, discord, sms
+    kind = db.Column(db.String(20), nullable=False)  # missed_heartbeat, recovery
+    configuration = db.Column(db.JSON, nullable=False)  # plugin config when queued
+    application = db.Column(db.JSON, nullable=False)  # application fields for messages
+    context = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    claim_token = db.Column(db.String(32))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        db.Index("ix_alert_outbox_due", "status", "alert_type", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<AlertOutbox {self.id}: {self.alert_type} {self.kind}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "alert_type": self.alert_type,
+            "kind": self.kind,
+            "application_id": self.application.get("id"),
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": (
+                self.next_attempt_at.isoformat() if self.next_attempt_at else None
+            ),
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,118 @@
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from database import db
+from models import MonitorInstance
+
+logger = logging.getLogger(__name__)
+
+
+class MonitorCoordinator:
+    """
+    Database-backed coordination between HeartbeatMonitor instances.
+
+    Every instance holds a lease row in ``monitor_instance`` that it renews
+    every third of the lease. Live instances are ordered by start time:
+
+    - ``leader`` mode: only the oldest live instance monitors, the others
+      stand by and take over once its lease lapses.
+    - ``sharded`` mode: every live instance monitors the applications whose
+      ``id % instance_count`` equals its position.
+
+    A monitor that cannot renew its lease stops monitoring, so a partitioned
+    instance never keeps alerting alongside its replacement. Leases are
+    timed by the database's clock, so clock skew or time zones between
+    hosts cannot make two instances lead at once.
+    """
+
+    MODES = ("leader", "sharded")
+
+    def __init__(self, mode="leader", instance_id=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown monitor coordination mode: {mode}")
+
+        self.mode = mode
+        self.instance_id = (
+            instance_id
+            or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.lease_seconds = int(
+            os.getenv("HEARTBEAT_MONITOR_LEASE_SECONDS", 15)
+        )  # seconds
+        self.started_at = datetime.now()
+
+    @property
+    def renew_interval(self):
+        return max(1, self.lease_seconds // 3)
+
+    def renew(self):
+        """
+        Renew this instance's lease and work out what it should monitor
+        (requires an app context)
+
+        Returns:
+            (shard_index, shard_count) tuple, or None if this instance
+            should not monitor anything right now
+        """
+        try:
+            now = self._database_now()
+            instance = db.session.get(MonitorInstance, self.instance_id)
+            if instance is None:
+                instance = MonitorInstance(
+                    instance_id=self.instance_id, started_at=self.started_at
+                )
+                db.session.add(instance)
+            instance.expires_at = now + timedelta(seconds=self.lease_seconds)
+
+            # Forget instances that stopped renewing
+            MonitorInstance.query.filter(MonitorInstance.expires_at < now).delete()
+            db.session.commit()
+
+            live = list(
+                db.session.execute(
+                    select(MonitorInstance.instance_id)
+                    .where(MonitorInstance.expires_at >= now)
+                    .order_by(MonitorInstance.started_at, MonitorInstance.instance_id)
+                ).scalars()
+            )
+
+            # Missing if another instance expired this lease in the meantime
+            position = live.index(self.instance_id)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to renew monitor lease: {str(e)}")
+            return None
+
+        if self.mode == "sharded":
+            return position, len(live)
+
+        return (0, 1) if position == 0 else None
+
+    @staticmethod
+    def _database_now():
+        """
+        Current time by the database's clock, as naive UTC when the database
+        reports a time zone
+        """
+        now = db.session.execute(select(func.now())).scalar()
+        if now.tzinfo is not None:
+            now = now.astimezone(timezone.utc).replace(tzinfo=None)
+        return now
+
+    def release(self):
+        """
+        Give up this instance's lease so others take over immediately
+        (requires an app context)
+        """
+        try:
+            MonitorInstance.query.filter_by(instance_id=self.instance_id).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to release monitor lease: {str(e)}")
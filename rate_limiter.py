@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` events per second on average and bursts of ``burst``
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self):
+        """
+        Take a token if one is available
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limits for outbound alerts, per alert type and
+    destination.
+
+    Defaults follow the providers' documented ceilings: about one message
+    per second per Slack webhook, 30 per minute per Discord webhook and one
+    SMS per second per Twilio number. Override them with
+    ``ALERT_RATE_LIMIT_<TYPE>`` (messages per second, 0 for no limit) and
+    ``ALERT_RATE_BURST_<TYPE>``.
+    """
+
+    DEFAULT_LIMITS = {
+        "slack": (1.0, 1),
+        "discord": (0.5, 5),
+        "email": (5.0, 10),
+        "sms": (1.0, 1),
+    }
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def limit_for(cls, alert_type):
+        """
+        Get the (rate, burst) limit for an alert type, or None if unlimited
+        """
+        default_rate, default_burst = cls.DEFAULT_LIMITS.get(alert_type, (0, 1))
+        name = alert_type.upper()
+        rate = float(os.getenv(f"ALERT_RATE_LIMIT_{name}", default_rate))
+        burst = int(os.getenv(f"ALERT_RATE_BURST_{name}", default_burst))
+        return (rate, max(1, burst)) if rate > 0 else None
+
+    def try_acquire(self, alert_type, destination):
+        """
+        Take a token for a message to ``destination``
+
+        Returns:
+            0 if the message may be sent now, otherwise seconds to wait
+        """
+        key = (alert_type, destination)
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                limit = self.limit_for(alert_type)
+                if limit is None:
+                    return 0.0
+                bucket = self._buckets[key] = TokenBucket(*limit)
+
+            return bucket.try_acquire()
+
+    def get_status(self):
+        with self._lock:
+            destinations = len(self._buckets)
+
+        return {
+            "destinations": destinations,
+            "limits": {
+                alert_type: self.limit_for(alert_type)
+                for alert_type in self.DEFAULT_LIMITS
+            },
+        }
@@ -1,14 +1,31 @@
+import csv
+import io
+import json
 import logging
-from datetime import datetime
+import os
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
 
-from flask import jsonify, render_template, request
+from flask import Response, jsonify, render_template, request, stream_with_context
 
+from alert_dispatcher import alert_dispatcher
 from app import app
+from application_index import application_index
+from application_service import ApplicationService
 from database import db
+from deadline_index import deadline_index
+from event_broker import event_broker
+from heartbeat_archive import heartbeat_archive
+from heartbeat_buffer import heartbeat_buffer
+from heartbeat_retention import heartbeat_retention
+from heartbeat_timeline import heartbeat_timeline
 from models import (
+    AlertOutbox,
     Application,
     HeartbeatEvent,
 )
+from sqlite_engine import sqlite_engine
 
 logger = logging.getLogger(__name__)
 
@@ -28,11 +45,11 @@ def receive_heartbeat(app_uuid):
     to indicate they are alive and functioning.
     """
     try:
-        # Convert UUID to string for database lookup
+        # Convert UUID to string for lookup
         app_uuid_str = str(app_uuid)
 
         # Find the application by UUID
-        application = Application.query.filter_by(uuid=app_uuid_str).first()
+        application = ApplicationService.lookup_application(app_uuid_str)
 
         if not application:
             logger.warning(
@@ -46,16 +63,17 @@ def receive_heartbeat(app_uuid):
             )
             return jsonify({"error": "Application is not active"}), 400
 
-        # Update last heartbeat timestamp
-        application.last_heartbeat = datetime.now()
+        received_at = datetime.now()
 
-        # Optional: Log the heartbeat event for history/analytics
-        heartbeat_event = HeartbeatEvent(
-            application_id=application.id, received_at=datetime.now()
-        )
-
-        db.session.add(heartbeat_event)
-        db.session.commit()
+        if not ApplicationService.record_heartbeat(application, received_at):
+            logger.warning(
+                f"Heartbeat buffer full, rejected heartbeat from {application.name}"
+            )
+            return (
+                jsonify({"error": "Heartbeat buffer is full, retry later"}),
+                503,
+                {"Retry-After": "1"},
+            )
 
         logger.info(f"Heartbeat received from {application.name} ({app_uuid_str})")
 
@@ -64,7 +82,7 @@ def receive_heartbeat(app_uuid):
                 {
                     "status": "ok",
                     "application": application.name,
-                    "timestamp": application.last_heartbeat.isoformat(),
+                    "timestamp": received_at.isoformat(),
                 }
             ),
             200,
@@ -76,40 +94,281 @@ def receive_heartbeat(app_uuid):
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/heartbeat/batch", methods=["POST"])
+def receive_heartbeat_batch():
+    """
+    Receive heartbeats for many applications in one request
+
+    Intended for agents reporting on behalf of several applications. The
+    body is ``{"heartbeats": [...]}`` where each item is either an
+    application UUID or ``{"uuid": ..., "timestamp": ...}`` with an
+    optional ISO 8601 client timestamp.
+    """
+    data = request.get_json(silent=True)
+    items = data.get("heartbeats") if isinstance(data, dict) else None
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty heartbeats list is required"}), 400
+
+    max_batch_size = int(os.getenv("HEARTBEAT_BATCH_MAX_SIZE", 1000))
+    if len(items) > max_batch_size:
+        return (
+            jsonify({"error": f"Batch exceeds {max_batch_size} heartbeats"}),
+            413,
+        )
+
+    now = datetime.now()
+    heartbeats = []
+    results = {}
+
+    for position, item in enumerate(items):
+        try:
+            heartbeats.append((position, *_parse_batch_heartbeat(item, now)))
+        except ValueError as e:
+            results[position] = {
+                "uuid": item.get("uuid") if isinstance(item, dict) else item,
+                "status": "error",
+                "error": str(e),
+            }
+
+    try:
+        recorded = ApplicationService.record_heartbeats(
+            [(app_uuid, received_at) for _, app_uuid, received_at in heartbeats]
+        )
+    except Exception as e:
+        logger.error(f"Error processing heartbeat batch: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    for (position, _, _), result in zip(heartbeats, recorded):
+        results[position] = result
+
+    ordered = [results[position] for position in range(len(items))]
+    accepted = sum(1 for result in ordered if result["status"] == "ok")
+
+    return jsonify(
+        {"accepted": accepted, "rejected": len(ordered) - accepted, "results": ordered}
+    )
+
+
+def _parse_batch_heartbeat(item, now):
+    """
+    Parse one batch item into a (UUID, received_at) pair
+
+    Client timestamps in the future are clamped to the server time so a
+    skewed clock cannot push an application's deadline forward.
+    """
+    timestamp = None
+    if isinstance(item, dict):
+        timestamp = item.get("timestamp")
+        item = item.get("uuid")
+
+    if not isinstance(item, str):
+        raise ValueError("Missing application UUID")
+
+    try:
+        app_uuid = str(uuid.UUID(item))
+    except ValueError:
+        raise ValueError("Invalid application UUID") from None
+
+    if timestamp is None:
+        return app_uuid, now
+
+    return app_uuid, min(_parse_timestamp(timestamp), now)
+
+
+def _parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp into the server's local naive time
+    """
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}") from None
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+
+    return parsed
+
+
+@app.route("/api/heartbeats/export", methods=["GET"])
+def export_heartbeats():
+    """
+    Stream heartbeat history as NDJSON (default) or CSV
+
+    Optional filters: ``application_id``, and ``start``/``end`` ISO 8601
+    timestamps (start inclusive, end exclusive).
+    """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    application_id = request.args.get("application_id")
+    if application_id is not None and not application_id.isdigit():
+        return jsonify({"error": "application_id must be an integer"}), 400
+
+    try:
+        start = request.args.get("start")
+        end = request.args.get("end")
+        batches = ApplicationService.iter_heartbeat_events(
+            application_id=int(application_id) if application_id else None,
+            start=_parse_timestamp(start) if start else None,
+            end=_parse_timestamp(end) if end else None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if export_format == "csv":
+        body, mimetype = _csv_export(batches), "text/csv"
+    else:
+        body, mimetype = _ndjson_export(batches), "application/x-ndjson"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=heartbeats.{export_format}"
+        },
+    )
+
+
+def _ndjson_export(batches):
+    for rows in batches:
+        yield "".join(
+            json.dumps(
+                {
+                    "id": row.id,
+                    "application_id": row.application_id,
+                    "received_at": row.received_at.isoformat(),
+                }
+            )
+            + "\n"
+            for row in rows
+        )
+
+
+def _csv_export(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "application_id", "received_at"])
+
+    for rows in batches:
+        writer.writerows(
+            (row.id, row.application_id, row.received_at.isoformat()) for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header only when there is nothing to export
+    yield buffer.getvalue()
+
+
+@app.route("/api/heartbeat-buffer/status", methods=["GET"])
+def get_heartbeat_buffer_status():
+    """Get write-behind heartbeat buffer counters"""
+    return jsonify(heartbeat_buffer.get_status())
+
+
+@app.route("/api/retention/status", methods=["GET"])
+def get_retention_status():
+    """Get heartbeat retention progress, throughput and lock times"""
+    return jsonify(heartbeat_retention.get_status())
+
+
+@app.route("/api/database/status", methods=["GET"])
+def get_database_status():
+    """Get SQLite production mode settings and connection pool usage"""
+    return jsonify(sqlite_engine.get_status())
+
+
+@app.route("/api/alert-dispatcher/status", methods=["GET"])
+def get_alert_dispatcher_status():
+    """Get alert queue depths, delivery latency and failure counts"""
+    return jsonify(alert_dispatcher.get_status())
+
+
+@app.route("/api/alert-outbox", methods=["GET"])
+def get_alert_outbox():
+    """List alerts awaiting delivery, or given up on with ``?status=failed``"""
+    status = request.args.get("status", "pending")
+    alerts = (
+        AlertOutbox.query.filter_by(status=status)
+        .order_by(AlertOutbox.next_attempt_at)
+        .limit(100)
+        .all()
+    )
+    return jsonify([alert.to_dict() for alert in alerts])
+
+
 @app.route("/")
 def dashboard():
     """Main dashboard showing all applications"""
-    applications = Application.query.all()
-    application_data = []
+    return render_template("dashboard.html", application_data=_dashboard_items())
 
-    for application in applications:
-        # Get the latest heartbeat
-        latest_heartbeat = (
-            HeartbeatEvent.query.filter_by(application_id=application.id)
-            .order_by(HeartbeatEvent.id.desc())
-            .first()
-        )
 
-        # Determine status
-        if not application.is_active:
-            status = "monitoring_disabled"
-        elif application.is_overdue():
-            status = "overdue"
-        elif application.last_heartbeat:
-            status = "healthy"
-        else:
-            status = "unknown"
+@app.route("/dashboard/applications/cards")
+def dashboard_application_cards():
+    """Render every dashboard card, used by the live dashboard to resync"""
+    return render_template(
+        "_application_cards.html", application_data=_dashboard_items()
+    )
 
-        application_data.append(
-            {
-                "application": application,
-                "latest_heartbeat": latest_heartbeat,
-                "status": status,
-                "is_overdue": application.is_overdue(),
-            }
-        )
 
-    return render_template("dashboard.html", application_data=application_data)
+@app.route("/dashboard/applications/<int:app_id>/card")
+def dashboard_application_card(app_id):
+    """Render one dashboard card, used by the live dashboard after changes"""
+    application = Application.query.get_or_404(app_id)
+    latest_heartbeat = ApplicationService.get_latest_heartbeats([application]).get(
+        app_id
+    )
+    return render_template(
+        "_application_card.html", item=_dashboard_item(application, latest_heartbeat)
+    )
+
+
+def _dashboard_items():
+    applications = Application.query.all()
+
+    # Latest heartbeats come from last_heartbeat, not a heartbeat_event query
+    latest_heartbeats = ApplicationService.get_latest_heartbeats(applications)
+
+    return [
+        _dashboard_item(application, latest_heartbeats.get(application.id))
+        for application in applications
+    ]
+
+
+def _dashboard_item(application, latest_heartbeat):
+    is_overdue = application.is_overdue()
+
+    # Determine status
+    if not application.is_active:
+        status = "monitoring_disabled"
+    elif is_overdue:
+        status = "overdue"
+    elif application.last_heartbeat:
+        status = "healthy"
+    else:
+        status = "unknown"
+
+    return {
+        "application": application,
+        "latest_heartbeat": latest_heartbeat,
+        "status": status,
+        "is_overdue": is_overdue,
+    }
+
+
+@app.route("/api/events")
+def stream_events():
+    """Stream application state changes to the dashboard as Server-Sent Events"""
+    subscriber = event_broker.subscribe()
+    return Response(
+        event_broker.stream(subscriber),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # Application Management API Routes
@@ -138,6 +397,9 @@ def create_application():
 
         db.session.add(application)
         db.session.commit()
+        application_index.put(application)
+        deadline_index.schedule_application(application)
+        event_broker.publish("application_created", {"id": application.id})
 
         logger.info(
             f"Created application: {application.name} (UUID: {application.uuid})"
@@ -160,13 +422,9 @@ def get_application(app_id):
     app_data["is_overdue"] = application.is_overdue()
 
     # Get recent heartbeat events
-    recent_events = (
-        HeartbeatEvent.query.filter_by(application_id=app_id)
-        .order_by(HeartbeatEvent.id.desc())
-        .limit(10)
-        .all()
-    )
-    app_data["recent_heartbeats"] = [event.to_dict() for event in recent_events]
+    app_data["recent_heartbeats"] = ApplicationService.get_heartbeat_page(
+        app_id, limit=10, include_total=False
+    )["heartbeats"]
 
     return jsonify(app_data)
 
@@ -195,6 +453,9 @@ def update_application(app_id):
 
         application.updated_at = datetime.now()
         db.session.commit()
+        application_index.put(application)
+        deadline_index.schedule_application(application)
+        event_broker.publish("application_updated", {"id": application.id})
 
         # Log state changes for is_active field
         if "is_active" in data and old_is_active != application.is_active:
@@ -221,6 +482,9 @@ def delete_application(app_id):
     try:
         db.session.delete(application)
         db.session.commit()
+        application_index.remove(application.uuid)
+        deadline_index.discard(application.id)
+        event_broker.publish("application_deleted", {"id": app_id})
 
         logger.info(
             f"Deleted application: {application.name} (UUID: {application.uuid})"
@@ -235,24 +499,116 @@ def delete_application(app_id):
 
 @app.route("/api/applications/<int:app_id>/heartbeats", methods=["GET"])
 def get_application_heartbeats(app_id):
-    """Get heartbeat history for an application"""
+    """
+    Get heartbeat history for an application
+
+    Serves offset pages (``page``/``per_page``) by default; passing
+    ``before``, ``after`` or ``limit`` switches to cursor pagination.
+    """
     Application.query.get_or_404(app_id)  # Verify application exists
 
     # Get pagination parameters
-    page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 50, type=int)
+    per_page = min(max(request.args.get("limit", per_page, type=int), 1), 1000)
+    use_cursors = any(arg in request.args for arg in ("before", "after", "limit"))
+
+    if not use_cursors and heartbeat_timeline.enabled:
+        # Timelines have no rows to offset into, decode from the newest day
+        page = max(request.args.get("page", 1, type=int), 1)
+        total = heartbeat_timeline.total(app_id)
+        offset = (page - 1) * per_page
+        heartbeats = islice(
+            heartbeat_timeline.history(app_id), offset, offset + per_page
+        )
 
-    heartbeats = (
-        HeartbeatEvent.query.filter_by(application_id=app_id)
-        .order_by(HeartbeatEvent.id.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
-    )
+        return jsonify(
+            {
+                "heartbeats": [heartbeat.to_dict() for heartbeat in heartbeats],
+                "total": total,
+                "pages": -(-total // per_page),
+                "current_page": page,
+            }
+        )
+
+    if not use_cursors:
+        page = request.args.get("page", 1, type=int)
+        heartbeats = (
+            HeartbeatEvent.query.filter_by(application_id=app_id)
+            .order_by(HeartbeatEvent.id.desc())
+            .paginate(page=page, per_page=per_page, error_out=False)
+        )
+
+        return jsonify(
+            {
+                "heartbeats": [heartbeat.to_dict() for heartbeat in heartbeats.items],
+                "total": heartbeats.total,
+                "pages": heartbeats.pages,
+                "current_page": page,
+            }
+        )
+
+    try:
+        return jsonify(
+            ApplicationService.get_heartbeat_page(
+                app_id,
+                limit=per_page,
+                before=request.args.get("before"),
+                after=request.args.get("after"),
+                include_total=request.args.get("count", "true").lower() != "false",
+            )
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/applications/<int:app_id>/archive", methods=["GET"])
+def get_application_archive(app_id):
+    """
+    Summarize archived heartbeat history for SLA reporting
+
+    Reads the archive files written by retention for ``start`` to ``end``
+    (ISO 8601, default the whole archived span, or the last 30 days if
+    nothing is archived yet).
+    """
+    application = Application.query.get_or_404(app_id)
+    if not heartbeat_archive.enabled:
+        return jsonify({"error": "Heartbeat archive is not enabled"}), 404
 
+    span = heartbeat_archive.span(app_id)
+    try:
+        end = request.args.get("end")
+        if end:
+            end = _parse_timestamp(end)
+        else:
+            end = span[1] if span else datetime.now()
+        start = request.args.get("start")
+        if start:
+            start = _parse_timestamp(start)
+        else:
+            start = span[0] if span else end - timedelta(days=30)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if start >= end:
+        return jsonify({"error": "start must be before end"}), 400
+
+    summary = heartbeat_archive.summary(app_id, start, end)
     return jsonify(
         {
-            "heartbeats": [heartbeat.to_dict() for heartbeat in heartbeats.items],
-            "total": heartbeats.total,
-            "pages": heartbeats.pages,
-            "current_page": page,
+            "application_id": app_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "heartbeats": summary["heartbeats"],
+            "first_seen": (
+                summary["first_seen"].isoformat() if summary["first_seen"] else None
+            ),
+            "last_seen": (
+                summary["last_seen"].isoformat() if summary["last_seen"] else None
+            ),
+            "longest_gap_seconds": summary["max_gap"],
+            "archived_days": summary["days"],
+            "uptime_percentage": heartbeat_archive.uptime(
+                app_id, start, end, application.expected_interval, summary
+            ),
         }
     )
@@ -0,0 +1,152 @@
+import logging
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+from sqlalchemy.engine import make_url
+
+from database import READER_BIND, db
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteEngine:
+    """
+    Production settings for SQLite databases.
+
+    With ``SQLITE_PRODUCTION_MODE=true`` every connection to the database
+    file is opened with WAL journaling, ``synchronous=NORMAL``, a busy
+    timeout and a memory-mapped read window. Writes share a single pooled
+    connection that opens its transactions with ``BEGIN IMMEDIATE``, so
+    writers queue for it instead of failing with "database is locked" when
+    a read transaction cannot be upgraded. Plain reads go to a separate pool
+    of read-only connections through the ``reader`` bind, which WAL lets run
+    alongside the writer. Heartbeats are group-committed by the heartbeat
+    buffer, which production mode starts.
+
+    Other databases, and SQLite in memory, are left alone.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("SQLITE_PRODUCTION_MODE", "False").lower() == "true"
+        self.busy_timeout = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # milliseconds
+        self.mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))  # bytes
+        self.read_pool_size = int(os.getenv("SQLITE_READ_POOL_SIZE", 4))
+        self.pool_timeout = float(
+            os.getenv("SQLITE_POOL_TIMEOUT", 30)
+        )  # seconds to wait for a free connection
+        self.path = None
+        self._lock = threading.Lock()
+        self._stats = {"writer_connections": 0, "reader_connections": 0}
+
+    @property
+    def active(self):
+        return self.path is not None
+
+    def configure(self, app):
+        """
+        Set up the writer and reader engines, before ``db.init_app(app)``
+
+        Returns:
+            True if production mode applies to the app's database
+        """
+        if not self.enabled:
+            return False
+
+        url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+        if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+            logger.warning("SQLite production mode needs an SQLite database file")
+            return False
+
+        # Relative paths are relative to the instance folder, as for Flask-SQLAlchemy
+        path = url.database
+        if not os.path.isabs(path):
+            os.makedirs(app.instance_path, exist_ok=True)
+            path = os.path.join(app.instance_path, path)
+        self.path = path
+
+        # Create the file and switch it to WAL before any reader opens it
+        self._connect_writer().close()
+
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "creator": self._connect_writer,
+            "pool_size": 1,
+            "max_overflow": 0,
+            "pool_timeout": self.pool_timeout,
+        }
+        app.config["SQLALCHEMY_BINDS"] = {
+            READER_BIND: {
+                "url": app.config["SQLALCHEMY_DATABASE_URI"],
+                "creator": self._connect_reader,
+                "pool_size": self.read_pool_size,
+                "max_overflow": 0,
+                "pool_timeout": self.pool_timeout,
+            }
+        }
+        logger.info(
+            f"SQLite production mode for {path} - WAL, one writer connection "
+            f"and {self.read_pool_size} read-only connections"
+        )
+        return True
+
+    def _connect_writer(self):
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout / 1000,
+            isolation_level="IMMEDIATE",
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        self._apply_pragmas(connection)
+        self._increment("writer_connections")
+        return connection
+
+    def _connect_reader(self):
+        connection = sqlite3.connect(
+            f"file:{pathname2url(self.path)}?mode=ro",
+            uri=True,
+            timeout=self.busy_timeout / 1000,
+            check_same_thread=False,
+        )
+        self._apply_pragmas(connection)
+        self._increment("reader_connections")
+        return connection
+
+    def _apply_pragmas(self, connection):
+        connection.execute(f"PRAGMA busy_timeout={self.busy_timeout}")
+        connection.execute(f"PRAGMA mmap_size={self.mmap_size}")
+
+    def _increment(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get_status(self):
+        """
+        Get the settings and connection pool usage (requires an app context)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats.update(
+            {
+                "active": self.active,
+                "path": self.path,
+                "busy_timeout": self.busy_timeout,
+                "mmap_size": self.mmap_size,
+            }
+        )
+        if self.active:
+            writer, reader = db.engines[None].pool, db.engines[READER_BIND].pool
+            stats.update(
+                {
+                    "writer_checked_out": writer.checkedout(),
+                    "readers_checked_out": reader.checkedout(),
+                    "read_pool_size": reader.size(),
+                }
+            )
+        return stats
+
+
+sqlite_engine = SQLiteEngine()
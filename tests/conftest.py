@@ -0,0 +1,77 @@
+"""Shared fixtures for the heartbeat monitor tests."""
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from database import db
+
+
+@pytest.fixture
+def client():
+    """Create a test client."""
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+
+@pytest.fixture
+def statements(client):
+    """Record the SQL statements executed during a test."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def create_application(client):
+    """Create applications through the API and return their JSON."""
+
+    def create(name="Test App", expected_interval=60, **fields):
+        payload = {"name": name, "expected_interval": expected_interval, **fields}
+        return client.post("/api/applications", json=payload).get_json()
+
+    return create
+
+
+@pytest.fixture
+def send_heartbeats(client):
+    """Send timestamped heartbeats for an application as one batch."""
+
+    def send(app_uuid, times):
+        return client.post(
+            "/heartbeat/batch",
+            json={
+                "heartbeats": [
+                    {"uuid": app_uuid, "timestamp": received_at.isoformat()}
+                    for received_at in times
+                ]
+            },
+        )
+
+    return send
+
+
+@pytest.fixture
+def wait_for():
+    """Poll a condition until it holds or a timeout passes."""
+
+    def wait(condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return condition()
+
+    return wait
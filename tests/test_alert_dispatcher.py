@@ -0,0 +1,215 @@
+"""Tests for background alert delivery through the alert outbox."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from alert_dispatcher import AlertDispatcher
+from alert_plugins.base import BaseAlertPlugin
+from app import app
+from database import db
+from models import AlertOutbox
+
+APPLICATION = SimpleNamespace(
+    id=1, name="Test App", uuid="abc", expected_interval=60, grace_period=0
+)
+
+
+@pytest.fixture(autouse=True)
+def no_coalesce_window(monkeypatch):
+    """Deliver alerts as soon as they are queued."""
+    monkeypatch.setenv("ALERT_COALESCE_WINDOW", "0")
+
+
+class RecordingPlugin(BaseAlertPlugin):
+    """Plugin stand-in that records delivered alerts."""
+
+    delivered = []
+
+    def validate_config(self):
+        pass
+
+    def send_failure_alert(self, application, alert_context):
+        self.delivered.append(("missed_heartbeat", alert_context["checked_at"]))
+
+    def send_recovery_alert(self, application, alert_context):
+        self.delivered.append(("recovery", application.name))
+
+
+class DigestPlugin(RecordingPlugin):
+    """Plugin stand-in that supports digests per webhook URL."""
+
+    digests = []
+
+    def destination(self):
+        return self.config["webhook_url"]
+
+    def send_digest(self, alerts):
+        self.digests.append(sorted(application.name for application, _, _ in alerts))
+
+
+class BlockingPlugin(RecordingPlugin):
+    """Plugin stand-in that hangs until released."""
+
+    release = threading.Event()
+
+    def send_failure_alert(self, application, alert_context):
+        self.release.wait(5)
+
+
+class FlakyPlugin(RecordingPlugin):
+    """Plugin stand-in that fails on its first call."""
+
+    calls = 0
+
+    def send_failure_alert(self, application, alert_context):
+        FlakyPlugin.calls += 1
+        if FlakyPlugin.calls == 1:
+            raise ConnectionError("webhook unreachable")
+        super().send_failure_alert(application, alert_context)
+
+
+def test_slow_plugin_does_not_delay_other_alert_types(client, wait_for):
+    """Test that dispatch returns at once and other types keep delivering."""
+    RecordingPlugin.delivered = []
+    BlockingPlugin.release.clear()
+    dispatcher = AlertDispatcher(app, {"slow": BlockingPlugin, "fast": RecordingPlugin})
+    dispatcher.start()
+    try:
+        started = time.monotonic()
+        assert dispatcher.dispatch("slow", {}, APPLICATION, "missed_heartbeat", {})
+        assert dispatcher.dispatch("fast", {}, APPLICATION, "recovery", {})
+        assert time.monotonic() - started < 0.5
+
+        assert wait_for(lambda: RecordingPlugin.delivered)
+        assert RecordingPlugin.delivered == [("recovery", "Test App")]
+
+        status = dispatcher.get_status()["plugins"]
+        assert status["fast"]["delivered"] == 1
+        assert status["slow"]["delivered"] == 0
+        assert status["slow"]["pending"] == 1
+    finally:
+        BlockingPlugin.release.set()
+        dispatcher.stop()
+
+    assert dispatcher.get_status()["plugins"]["slow"]["delivered"] == 1
+
+
+def test_failed_delivery_is_retried(client, monkeypatch, wait_for):
+    """Test that a failed alert stays in the outbox and is retried."""
+    monkeypatch.setenv("ALERT_RETRY_BASE_DELAY", "0.2")
+    RecordingPlugin.delivered = []
+    FlakyPlugin.calls = 0
+    dispatcher = AlertDispatcher(app, {"flaky": FlakyPlugin})
+    checked_at = datetime.now()
+
+    dispatcher.start()
+    try:
+        dispatcher.dispatch(
+            "flaky", {}, APPLICATION, "missed_heartbeat", {"checked_at": checked_at}
+        )
+        assert wait_for(lambda: FlakyPlugin.calls == 1)
+        assert wait_for(lambda: RecordingPlugin.delivered)
+    finally:
+        dispatcher.stop()
+
+    assert RecordingPlugin.delivered == [("missed_heartbeat", checked_at)]
+    assert AlertOutbox.query.count() == 0
+    assert dispatcher.get_status()["plugins"]["flaky"]["failed"] == 1
+
+
+def test_alert_is_marked_failed_after_max_attempts(client, monkeypatch, wait_for):
+    """Test that an alert is given up on once it runs out of attempts."""
+    monkeypatch.setenv("ALERT_MAX_ATTEMPTS", "1")
+    FlakyPlugin.calls = 0
+    dispatcher = AlertDispatcher(app, {"flaky": FlakyPlugin})
+
+    dispatcher.start()
+    try:
+        dispatcher.dispatch("flaky", {}, APPLICATION, "missed_heartbeat", {})
+        assert wait_for(lambda: dispatcher.get_status()["plugins"]["flaky"]["dead"])
+    finally:
+        dispatcher.stop()
+
+    alert = AlertOutbox.query.one()
+    assert alert.status == "failed"
+    assert alert.attempts == 1
+    assert alert.last_error == "webhook unreachable"
+
+
+def test_abandoned_claim_is_delivered_after_restart(client, wait_for):
+    """Test that alerts claimed by a crashed worker are picked up again."""
+    RecordingPlugin.delivered = []
+    db.session.add(
+        AlertOutbox(
+            alert_type="recording",
+            kind="recovery",
+            configuration={},
+            application=APPLICATION.__dict__,
+            context={},
+            claim_token="crashed-worker",
+            next_attempt_at=datetime.now() - timedelta(seconds=1),
+        )
+    )
+    db.session.commit()
+
+    dispatcher = AlertDispatcher(app, {"recording": RecordingPlugin})
+    dispatcher.start()
+    try:
+        assert wait_for(lambda: RecordingPlugin.delivered)
+    finally:
+        dispatcher.stop()
+
+    assert RecordingPlugin.delivered == [("recovery", "Test App")]
+
+
+def test_alert_storm_is_coalesced_per_destination(client, monkeypatch, wait_for):
+    """Test that alerts to one destination within the window become a digest."""
+    monkeypatch.setenv("ALERT_COALESCE_WINDOW", "0.5")
+    RecordingPlugin.delivered = []
+    DigestPlugin.digests = []
+    dispatcher = AlertDispatcher(app, {"digest": DigestPlugin})
+
+    dispatcher.start()
+    try:
+        for number in range(3):
+            application = SimpleNamespace(
+                **dict(APPLICATION.__dict__, name=f"App {number}")
+            )
+            dispatcher.dispatch(
+                "digest", {"webhook_url": "a"}, application, "missed_heartbeat", {}
+            )
+        dispatcher.dispatch("digest", {"webhook_url": "b"}, APPLICATION, "recovery", {})
+        assert wait_for(lambda: AlertOutbox.query.count() == 0)
+    finally:
+        dispatcher.stop()
+
+    assert DigestPlugin.digests == [["App 0", "App 1", "App 2"]]
+    assert RecordingPlugin.delivered == [("recovery", "Test App")]
+    assert dispatcher.get_status()["plugins"]["digest"]["digests"] == 1
+
+
+def test_rate_limited_alerts_are_deferred_not_dropped(client, monkeypatch, wait_for):
+    """Test that alerts over a destination's rate wait for a token."""
+    monkeypatch.setenv("ALERT_RATE_LIMIT_DIGEST", "2")
+    DigestPlugin.digests = []
+    RecordingPlugin.delivered = []
+    dispatcher = AlertDispatcher(app, {"digest": DigestPlugin})
+
+    dispatcher.start()
+    try:
+        for _ in range(2):
+            dispatcher.dispatch(
+                "digest", {"webhook_url": "a"}, APPLICATION, "recovery", {}
+            )
+            assert wait_for(lambda: AlertOutbox.query.count() == 0)
+    finally:
+        dispatcher.stop()
+
+    status = dispatcher.get_status()["plugins"]["digest"]
+    assert RecordingPlugin.delivered == [("recovery", "Test App")] * 2
+    assert status["deferred"] >= 1
+    assert status["failed"] == 0
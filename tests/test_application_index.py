@@ -0,0 +1,101 @@
+"""Tests for the in-memory application index used by heartbeat ingestion."""
+
+import uuid
+
+import pytest
+
+from app import app
+from application_index import application_index
+from database import db
+from heartbeat_monitor import HeartbeatMonitor
+from models import Application
+
+
+@pytest.fixture(autouse=True)
+def loaded_index(client):
+    """Load the application index for each test."""
+    application_index.load()
+    yield application_index
+    application_index.clear()
+
+
+def test_index_tracks_create_update_delete(client):
+    """Test that the application routes keep the index current."""
+    response = client.post(
+        "/api/applications", json={"name": "Indexed App", "expected_interval": 60}
+    )
+    app_data = response.get_json()
+    assert application_index.get(app_data["uuid"]).name == "Indexed App"
+
+    client.put(f"/api/applications/{app_data['id']}", json={"is_active": False})
+    assert application_index.get(app_data["uuid"]).is_active is False
+
+    client.delete(f"/api/applications/{app_data['id']}")
+    assert application_index.get(app_data["uuid"]) is None
+
+
+def test_rejected_heartbeats_do_not_query(client, statements):
+    """Test that known inactive and recently unknown UUIDs skip the database."""
+    response = client.post(
+        "/api/applications",
+        json={"name": "Paused App", "expected_interval": 60, "is_active": False},
+    )
+    app_uuid = response.get_json()["uuid"]
+    unknown = "00000000-0000-0000-0000-000000000000"
+    statements.clear()
+
+    response = client.post(f"/heartbeat/{unknown}")
+    assert response.status_code == 404
+    assert len(statements) == 1
+    statements.clear()
+
+    response = client.post(f"/heartbeat/{unknown}")
+    assert response.status_code == 404
+
+    response = client.post(f"/heartbeat/{app_uuid}")
+    assert response.status_code == 400
+
+    assert statements == []
+
+
+def test_index_miss_falls_back_to_database(client, monkeypatch):
+    """Test that applications created by another process are accepted."""
+    other = Application(name="Elsewhere", uuid=str(uuid.uuid4()), expected_interval=60)
+    db.session.add(other)
+    db.session.commit()
+    assert application_index.get(other.uuid) is None
+
+    response = client.post(f"/heartbeat/{other.uuid}")
+    assert response.status_code == 200
+    assert application_index.get(other.uuid).id == other.id
+
+    # Unknown UUIDs are cached only briefly
+    monkeypatch.setattr(application_index, "miss_ttl", 0)
+    late = Application(name="Late", uuid=str(uuid.uuid4()), expected_interval=60)
+    assert client.post(f"/heartbeat/{late.uuid}").status_code == 404
+    db.session.add(late)
+    db.session.commit()
+    assert client.post(f"/heartbeat/{late.uuid}").status_code == 200
+
+
+def test_standalone_monitor_refreshes_the_index(client):
+    """Test that the index is reloaded without a coordinator too."""
+    monitor = HeartbeatMonitor(app)
+    monitor.start()
+    try:
+        assert monitor.scheduler.get_job("application_index_refresh")
+    finally:
+        monitor.stop()
+
+
+def test_accepted_heartbeat_only_writes(client, statements):
+    """Test that a valid heartbeat skips the application SELECT."""
+    response = client.post(
+        "/api/applications", json={"name": "Live App", "expected_interval": 60}
+    )
+    app_uuid = response.get_json()["uuid"]
+    statements.clear()
+
+    response = client.post(f"/heartbeat/{app_uuid}")
+    assert response.status_code == 200
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
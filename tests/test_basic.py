@@ -1,23 +1,13 @@
 """Basic tests for the heartbeat monitor application."""
 
-import pytest
-
-from app import app
-from database import db
-from models import Application
+import json
+from datetime import datetime, timedelta
 
+from sqlalchemy import insert
 
-@pytest.fixture
-def client():
-    """Create a test client."""
-    app.config["TESTING"] = True
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
-
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.drop_all()
+from application_service import ApplicationService
+from database import db
+from models import Application, HeartbeatEvent
 
 
 def test_health_endpoint(client):
@@ -192,3 +182,237 @@ def test_application_model_default_active(client):
         data = app.to_dict()
         assert "is_active" in data
         assert data["is_active"] is True
+
+
+def test_heartbeat_batch_endpoint(client):
+    """Test recording heartbeats for several applications in one request."""
+    active = client.post(
+        "/api/applications", json={"name": "Batch App", "expected_interval": 60}
+    ).get_json()
+    inactive = client.post(
+        "/api/applications",
+        json={"name": "Batch Paused", "expected_interval": 60, "is_active": False},
+    ).get_json()
+
+    payload = {
+        "heartbeats": [
+            active["uuid"],
+            {"uuid": active["uuid"], "timestamp": "2024-01-01T12:00:00"},
+            inactive["uuid"],
+            "00000000-0000-0000-0000-000000000000",
+            "not-a-uuid",
+        ]
+    }
+    response = client.post("/heartbeat/batch", json=payload)
+    assert response.status_code == 200
+
+    data = response.get_json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 3
+    assert [result["status"] for result in data["results"]] == [
+        "ok",
+        "ok",
+        "error",
+        "error",
+        "error",
+    ]
+    assert data["results"][1]["timestamp"] == "2024-01-01T12:00:00"
+
+    # The older client timestamp must not move last_heartbeat backwards
+    application = db.session.get(Application, active["id"])
+    assert application.last_heartbeat.year > 2024
+
+    response = client.get(f"/api/applications/{active['id']}/heartbeats")
+    assert response.get_json()["total"] == 2
+
+
+def test_heartbeat_batch_endpoint_invalid(client):
+    """Test that the batch endpoint requires a heartbeats list."""
+    response = client.post("/heartbeat/batch", json={"heartbeats": []})
+    assert response.status_code == 400
+
+
+def test_next_deadline_tracks_heartbeats_and_config(client):
+    """Test that next_deadline is stored and used for the overdue query."""
+    data = client.post(
+        "/api/applications", json={"name": "Deadline App", "expected_interval": 60}
+    ).get_json()
+    application = db.session.get(Application, data["id"])
+    assert application.next_deadline == application.get_deadline()
+
+    # Backdating creation moves the stored deadline into the past
+    application.created_at = application.created_at.replace(year=2020)
+    db.session.commit()
+    assert [app.id for app in ApplicationService.get_overdue_applications()] == [
+        data["id"]
+    ]
+
+    client.post(f"/heartbeat/{data['uuid']}")
+    db.session.expire_all()
+    application = db.session.get(Application, data["id"])
+    assert application.next_deadline == application.get_deadline()
+    assert ApplicationService.get_overdue_applications() == []
+
+    client.put(f"/api/applications/{data['id']}", json={"grace_period": 30})
+    db.session.expire_all()
+    application = db.session.get(Application, data["id"])
+    assert application.next_deadline == application.get_deadline()
+
+
+def test_dashboard_query_count_is_constant(client, statements):
+    """Test that the dashboard does not run a query per application."""
+
+    def add_applications(count):
+        for _ in range(count):
+            response = client.post(
+                "/api/applications", json={"name": "App", "expected_interval": 60}
+            )
+            client.post(f"/heartbeat/{response.get_json()['uuid']}")
+
+    def dashboard_queries():
+        statements.clear()
+        assert client.get("/").status_code == 200
+        return len(statements)
+
+    add_applications(2)
+    baseline = dashboard_queries()
+
+    add_applications(10)
+    assert dashboard_queries() == baseline
+
+
+def test_dashboard_does_not_read_heartbeat_history(client, statements):
+    """Test that dashboard cost does not grow with heartbeat history."""
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    applications = [
+        Application(
+            name=f"App {number}",
+            uuid=f"history-{number}",
+            expected_interval=60,
+            last_heartbeat=start + timedelta(minutes=number),
+        )
+        for number in range(200)
+    ]
+    db.session.add_all(applications)
+    db.session.flush()
+    db.session.execute(
+        insert(HeartbeatEvent),
+        [
+            {
+                "application_id": application.id,
+                "received_at": start + timedelta(seconds=second),
+            }
+            for application in applications
+            for second in range(50)
+        ],
+    )
+    db.session.commit()
+
+    statements.clear()
+    response = client.get("/")
+    assert response.status_code == 200
+    assert not [s for s in statements if "heartbeat_event" in s]
+    assert "2024-01-01 15:19:00" in response.get_data(as_text=True)
+
+
+def test_heartbeat_history_cursor_pagination(client):
+    """Test paging through heartbeat history with before/after cursors."""
+    response = client.post(
+        "/api/applications", json={"name": "History App", "expected_interval": 60}
+    )
+    app_data = response.get_json()
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    client.post(
+        "/heartbeat/batch",
+        json={
+            "heartbeats": [
+                {
+                    "uuid": app_data["uuid"],
+                    "timestamp": (start + timedelta(minutes=minute)).isoformat(),
+                }
+                for minute in range(5)
+            ]
+        },
+    )
+    url = f"/api/applications/{app_data['id']}/heartbeats"
+
+    first = client.get(f"{url}?limit=2").get_json()
+    assert first["total"] == 5
+    assert first["prev_cursor"] is None
+    assert [h["received_at"] for h in first["heartbeats"]] == [
+        "2024-01-01T12:04:00",
+        "2024-01-01T12:03:00",
+    ]
+
+    middle = client.get(
+        f"{url}?limit=2&count=false&before={first['next_cursor']}"
+    ).get_json()
+    assert "total" not in middle
+    last = client.get(f"{url}?limit=2&before={middle['next_cursor']}").get_json()
+    assert [h["received_at"] for h in last["heartbeats"]] == ["2024-01-01T12:00:00"]
+    assert last["next_cursor"] is None
+
+    newer = client.get(f"{url}?limit=2&after={last['prev_cursor']}").get_json()
+    assert [h["received_at"] for h in newer["heartbeats"]] == [
+        "2024-01-01T12:02:00",
+        "2024-01-01T12:01:00",
+    ]
+
+    assert client.get(f"{url}?before=not-a-cursor").status_code == 400
+
+    # Without cursor parameters the offset response is kept
+    default = client.get(url).get_json()
+    assert (default["total"], default["pages"], default["current_page"]) == (5, 1, 1)
+    assert len(default["heartbeats"]) == 5
+    second = client.get(f"{url}?page=2&per_page=2").get_json()
+    assert (second["pages"], second["current_page"]) == (3, 2)
+    assert "next_cursor" not in second
+
+
+def test_heartbeat_export_streams_ndjson_and_csv(client):
+    """Test exporting heartbeat history filtered by application and time."""
+    apps = [
+        client.post(
+            "/api/applications", json={"name": name, "expected_interval": 60}
+        ).get_json()
+        for name in ("Export App", "Other App")
+    ]
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    client.post(
+        "/heartbeat/batch",
+        json={
+            "heartbeats": [
+                {
+                    "uuid": app_data["uuid"],
+                    "timestamp": (start + timedelta(minutes=minute)).isoformat(),
+                }
+                for app_data in apps
+                for minute in range(4)
+            ]
+        },
+    )
+
+    response = client.get(
+        f"/api/heartbeats/export?application_id={apps[0]['id']}"
+        "&start=2024-01-01T12:01:00&end=2024-01-01T12:03:00"
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row["application_id"], row["received_at"]) for row in rows] == [
+        (apps[0]["id"], "2024-01-01T12:01:00"),
+        (apps[0]["id"], "2024-01-01T12:02:00"),
+    ]
+
+    response = client.get("/api/heartbeats/export?format=csv")
+    assert response.mimetype == "text/csv"
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "id,application_id,received_at"
+    assert len(lines) == 9
+
+    assert client.get("/api/heartbeats/export?format=xml").status_code == 400
+    assert client.get("/api/heartbeats/export?start=yesterday").status_code == 400
+    for bad_id in ("abc", "", "1.5", "-1"):
+        response = client.get(f"/api/heartbeats/export?application_id={bad_id}")
+        assert response.status_code == 400
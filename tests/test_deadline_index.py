@@ -0,0 +1,135 @@
+"""Tests for the deadline index and deadline-driven heartbeat monitor."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app
+from database import db
+from deadline_index import DeadlineIndex
+from heartbeat_monitor import HeartbeatMonitor
+from models import Application
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    """Create a monitor with its deadline index active and alerts recorded."""
+    monitor = HeartbeatMonitor(app)
+    monitor.alerts = []
+    monkeypatch.setattr(
+        monitor,
+        "_send_missed_heartbeat_alert",
+        lambda application: monitor.alerts.append(("missed", application.id)),
+    )
+    monkeypatch.setattr(
+        monitor,
+        "_send_heartbeat_recovery_alert",
+        lambda application: monitor.alerts.append(("recovery", application.id)),
+    )
+    monitor.deadlines.activate()
+    yield monitor
+    monitor.deadlines.deactivate()
+
+
+def test_pop_expired_orders_by_deadline():
+    """Test that only expired deadlines are returned, earliest first."""
+    index = DeadlineIndex()
+    index.activate()
+    now = datetime.now()
+
+    index.schedule(1, now + timedelta(seconds=5))
+    index.schedule(2, now - timedelta(seconds=5))
+    index.schedule(3, now - timedelta(seconds=10))
+
+    assert index.pop_expired(now) == [
+        (3, now - timedelta(seconds=10)),
+        (2, now - timedelta(seconds=5)),
+    ]
+    assert index.next_deadline() == now + timedelta(seconds=5)
+
+
+def test_touch_postpones_deadline_lazily():
+    """Test that a heartbeat moves a deadline later without a new heap entry."""
+    index = DeadlineIndex()
+    index.activate()
+    now = datetime.now()
+
+    index.schedule(1, now - timedelta(seconds=1))
+    index.touch(1, now + timedelta(seconds=30))
+
+    assert index.pop_expired(now) == []
+    assert index.next_deadline() == now + timedelta(seconds=30)
+
+
+def test_touch_after_expiry_marks_recovery():
+    """Test that a heartbeat for an expired application wakes the listener."""
+    wakeups = []
+    index = DeadlineIndex()
+    index.activate(wakeups.append)
+    now = datetime.now()
+
+    index.schedule(1, now - timedelta(seconds=1))
+    assert index.pop_expired(now) == [(1, now - timedelta(seconds=1))]
+    index.mark_expired(1)
+
+    index.touch(1, now + timedelta(seconds=30))
+    assert index.pop_recovered() == {1}
+    assert wakeups[-1] is None
+
+
+def test_inactive_index_ignores_heartbeats():
+    """Test that the index does nothing until a monitor activates it."""
+    index = DeadlineIndex()
+    index.touch(1, datetime.now())
+    assert len(index) == 0
+
+
+def test_monitor_alerts_on_expiry_and_recovery(client, monitor):
+    """Test that the monitor alerts from deadlines rather than a full scan."""
+    application = Application(
+        name="Deadline App",
+        expected_interval=1,
+        created_at=datetime.now() - timedelta(seconds=10),
+    )
+    healthy = Application(name="Healthy App", expected_interval=3600)
+    db.session.add_all([application, healthy])
+    db.session.commit()
+
+    monitor._load_deadlines()
+    monitor._process_deadlines()
+    assert monitor.alerts == [("missed", application.id)]
+
+    response = client.post(f"/heartbeat/{application.uuid}")
+    assert response.status_code == 200
+
+    monitor._process_deadlines()
+    assert monitor.alerts[-1] == ("recovery", application.id)
+    assert monitor.get_status()["overdue_applications"] == 0
+
+
+def test_restarted_monitor_does_not_realert(client, monitor):
+    """Test that overdue state persists across monitor restarts."""
+    application = Application(
+        name="Down App",
+        expected_interval=1,
+        created_at=datetime.now() - timedelta(seconds=10),
+    )
+    db.session.add(application)
+    db.session.commit()
+
+    monitor._load_deadlines()
+    monitor._process_deadlines()
+    assert monitor.alerts == [("missed", application.id)]
+
+    db.session.expire_all()
+    assert db.session.get(Application, application.id).monitor_state == "overdue"
+
+    # A fresh monitor warm-starts from the stored state without alerting
+    monitor.deadlines.clear()
+    restarted = HeartbeatMonitor(app)
+    restarted._send_missed_heartbeat_alert = monitor._send_missed_heartbeat_alert
+    restarted._load_deadlines()
+    restarted._process_deadlines()
+
+    assert monitor.alerts == [("missed", application.id)]
+    assert restarted.get_status()["overdue_app_ids"] == [application.id]
@@ -0,0 +1,115 @@
+"""Tests for the live dashboard event stream."""
+
+import json
+
+from event_broker import EventBroker, event_broker
+
+
+def read_event(stream):
+    event_type, data = next(stream).strip().split("\n")
+    return event_type.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def test_state_changes_are_streamed(client):
+    """Test that application changes and heartbeats reach subscribers."""
+    subscriber = event_broker.subscribe()
+    stream = event_broker.stream(subscriber)
+    assert next(stream).startswith("retry:")
+
+    try:
+        response = client.post(
+            "/api/applications", json={"name": "Live App", "expected_interval": 60}
+        )
+        app_data = response.get_json()
+        client.post(f"/heartbeat/{app_data['uuid']}")
+        client.delete(f"/api/applications/{app_data['id']}")
+
+        assert read_event(stream) == ("application_created", {"id": app_data["id"]})
+        event_type, data = read_event(stream)
+        assert event_type == "heartbeat"
+        assert data["id"] == app_data["id"]
+        assert read_event(stream) == ("application_deleted", {"id": app_data["id"]})
+    finally:
+        stream.close()
+
+    assert len(event_broker) == 0
+
+
+def test_slow_subscriber_is_told_to_resync(monkeypatch):
+    """Test that a subscriber that falls behind gets a resync event."""
+    monkeypatch.setenv("EVENT_STREAM_QUEUE_SIZE", "2")
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+
+    for number in range(5):
+        broker.publish("heartbeat", {"id": number})
+
+    messages = list(broker.stream(subscriber))
+    assert len(messages) == 4  # retry, two events, resync
+    assert messages[-1].startswith("event: resync")
+    assert len(broker) == 0
+
+
+def test_heartbeats_are_coalesced_per_application(monkeypatch):
+    """Test that rapid heartbeats send one event per interval with the latest."""
+    monkeypatch.setenv("EVENT_STREAM_HEARTBEAT_INTERVAL", "0.2")
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+    stream = broker.stream(subscriber)
+    assert next(stream).startswith("retry:")
+
+    try:
+        for number in range(5):
+            broker.publish("heartbeat", {"id": 1, "last_heartbeat": number})
+        broker.publish("heartbeat", {"id": 2, "last_heartbeat": 0})
+        assert subscriber.queue.qsize() == 2
+
+        assert read_event(stream) == ("heartbeat", {"id": 1, "last_heartbeat": 0})
+        assert read_event(stream) == ("heartbeat", {"id": 2, "last_heartbeat": 0})
+        # The held heartbeat follows once the interval has passed
+        assert read_event(stream) == ("heartbeat", {"id": 1, "last_heartbeat": 4})
+    finally:
+        stream.close()
+
+
+def test_held_heartbeat_is_sent_before_other_events(monkeypatch):
+    """Test that coalescing never reorders an application's events."""
+    monkeypatch.setenv("EVENT_STREAM_HEARTBEAT_INTERVAL", "60")
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+
+    broker.publish("heartbeat", {"id": 1, "last_heartbeat": 0})
+    broker.publish("heartbeat", {"id": 1, "last_heartbeat": 1})
+    broker.publish("application_deleted", {"id": 1})
+
+    messages = [subscriber.queue.get_nowait() for _ in range(3)]
+    assert [message.split("\n")[0] for message in messages] == [
+        "event: heartbeat",
+        "event: heartbeat",
+        "event: application_deleted",
+    ]
+    assert '"last_heartbeat": 1' in messages[1]
+
+
+def test_dashboard_card_fragment(client):
+    """Test that a single dashboard card can be rendered for live updates."""
+    response = client.post(
+        "/api/applications", json={"name": "Card App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+
+    response = client.get(f"/dashboard/applications/{app_id}/card")
+    assert response.status_code == 200
+    assert f'id="app-card-{app_id}"'.encode() in response.data
+    assert b"Card App" in response.data
+
+
+def test_dashboard_cards_fragment(client):
+    """Test that all dashboard cards can be rendered for a resync."""
+    for name in ("First App", "Second App"):
+        client.post("/api/applications", json={"name": name, "expected_interval": 60})
+
+    response = client.get("/dashboard/applications/cards")
+    assert response.status_code == 200
+    assert response.data.count(b'id="app-card-') == 2
+    assert b"Second App" in response.data
@@ -0,0 +1,132 @@
+"""Tests for the compressed columnar heartbeat archive."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from database import db
+from heartbeat_archive import HeartbeatArchive, heartbeat_archive
+from heartbeat_retention import HeartbeatRetention
+from models import HeartbeatEvent
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = HeartbeatArchive()
+    archive.directory = str(tmp_path)
+    return archive
+
+
+def test_write_round_trips_and_merges_days(archive):
+    """Test that days read back in order and rewrites do not duplicate."""
+    day = datetime(2024, 3, 1)
+    events = [
+        (3, 7, day + timedelta(hours=1, milliseconds=250)),
+        (1, 7, day + timedelta(minutes=5)),
+        (9, 7, day + timedelta(days=1, minutes=1)),
+    ]
+    assert archive.write(events) == 3
+    assert archive.write(events[:1] + [(4, 7, day + timedelta(hours=2))]) == 2
+
+    assert archive.read_day(7, date(2024, 3, 1)) == [
+        (1, day + timedelta(minutes=5)),
+        (3, day + timedelta(hours=1, milliseconds=250)),
+        (4, day + timedelta(hours=2)),
+    ]
+    assert archive.read_day(7, date(2024, 3, 2)) == [
+        (9, day + timedelta(days=1, minutes=1))
+    ]
+    assert archive.read_day(8, date(2024, 3, 1)) == []
+
+
+def test_summary_uses_headers_and_partial_days(archive):
+    """Test range summaries across whole and partial archived days."""
+    start = datetime(2024, 3, 1)
+    archive.write(
+        (minute, 1, start + timedelta(minutes=minute))
+        for minute in range(0, 3 * 24 * 60, 10)
+        if not 1500 <= minute < 1620  # two hours without heartbeats on day 2
+    )
+
+    summary = archive.summary(1, start, start + timedelta(days=3))
+    assert summary["heartbeats"] == 3 * 144 - 12
+    assert summary["first_seen"] == start
+    assert summary["max_gap"] == 130 * 60
+    assert summary["days"] == 3
+
+    partial = archive.summary(
+        1, start + timedelta(hours=23), start + timedelta(days=1, hours=1)
+    )
+    assert partial["heartbeats"] == 12
+    assert partial["max_gap"] == 600
+
+    assert archive.uptime(1, start, start + timedelta(days=1), 600) == 100.0
+    assert archive.uptime(1, start, start + timedelta(days=3), 600) == round(
+        (3 * 144 - 12) / (3 * 144) * 100, 2
+    )
+
+
+def test_uptime_only_expects_archived_days(archive):
+    """Test that days missing from the archive do not count as downtime."""
+    start = datetime(2024, 3, 1)
+    archive.write(
+        (minute, 1, start + timedelta(minutes=minute))
+        for minute in range(0, 24 * 60, 10)
+    )
+
+    assert archive.span(1) == (start, start + timedelta(days=1))
+    assert archive.span(2) is None
+    assert (
+        archive.uptime(1, start - timedelta(days=29), start + timedelta(days=1), 600)
+        == 100.0
+    )
+    assert (
+        archive.uptime(1, start + timedelta(hours=12), start + timedelta(days=5), 600)
+        == 100.0
+    )
+    assert (
+        archive.uptime(1, start + timedelta(days=2), start + timedelta(days=3), 600)
+        is None
+    )
+
+
+def test_retention_archives_before_deleting(client, tmp_path, monkeypatch):
+    """Test that retention writes expired events to the archive."""
+    monkeypatch.setattr(heartbeat_archive, "directory", str(tmp_path))
+    response = client.post(
+        "/api/applications", json={"name": "Archived App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+    old = datetime.now().replace(microsecond=0) - timedelta(days=60)
+    db.session.execute(
+        insert(HeartbeatEvent),
+        [
+            {"application_id": app_id, "received_at": old + timedelta(minutes=i)}
+            for i in range(5)
+        ],
+    )
+    db.session.commit()
+
+    retention = HeartbeatRetention()
+    retention.pause = 0
+    assert retention.run(30) == 5
+    assert retention.get_status()["archived"] == 5
+    assert HeartbeatEvent.query.count() == 0
+
+    response = client.get(
+        f"/api/applications/{app_id}/archive?start={old.isoformat()}"
+        f"&end={(old + timedelta(hours=1)).isoformat()}"
+    )
+    data = response.get_json()
+    assert data["heartbeats"] == 5
+    assert data["first_seen"] == old.isoformat()
+    assert data["longest_gap_seconds"] == 60
+
+    # Without a range the whole archived span is summarized
+    data = client.get(f"/api/applications/{app_id}/archive").get_json()
+    assert data["start"] == old.replace(hour=0, minute=0, second=0).isoformat()
+    assert data["heartbeats"] == 5
+    assert data["archived_days"] == len(
+        {(old + timedelta(minutes=i)).date() for i in range(5)}
+    )
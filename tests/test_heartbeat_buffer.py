@@ -0,0 +1,121 @@
+"""Tests for the write-behind heartbeat buffer."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from app import app
+from database import db
+from heartbeat_buffer import HeartbeatBuffer, heartbeat_buffer
+from heartbeat_rollups import HeartbeatRollups
+from models import Application, HeartbeatEvent
+
+
+def test_flush_merges_updates_and_inserts_events(client):
+    """Test that a flush writes every event but one update per application."""
+    response = client.post(
+        "/api/applications", json={"name": "Buffered App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+
+    buffer = HeartbeatBuffer(app)
+    first = datetime.now()
+    for offset in range(3):
+        received_at = first + timedelta(seconds=offset)
+        assert buffer.submit(app_id, received_at, received_at + timedelta(seconds=60))
+
+    assert buffer.flush() == 3
+
+    db.session.expire_all()
+    application = db.session.get(Application, app_id)
+    assert application.last_heartbeat == first + timedelta(seconds=2)
+    assert application.next_deadline == first + timedelta(seconds=62)
+    assert HeartbeatEvent.query.filter_by(application_id=app_id).count() == 3
+
+    status = buffer.get_status()
+    assert status["buffered"] == 3
+    assert status["written"] == 3
+    assert status["merged_updates"] == 2
+    assert status["flushes"] == 1
+    assert status["pending"] == 0
+
+
+def test_submit_rejects_when_full(monkeypatch):
+    """Test that a full buffer applies backpressure instead of growing."""
+    monkeypatch.setenv("HEARTBEAT_BUFFER_SIZE", "1")
+    monkeypatch.setenv("HEARTBEAT_BUFFER_PUT_TIMEOUT", "0")
+    buffer = HeartbeatBuffer(app)
+
+    now = datetime.now()
+    assert buffer.submit(1, now, now)
+    assert not buffer.submit(1, now, now)
+    assert buffer.get_status()["rejected"] == 1
+
+
+def test_heartbeat_endpoint_uses_running_buffer(client):
+    """Test that heartbeats are acknowledged and written by the buffer thread."""
+    response = client.post(
+        "/api/applications", json={"name": "Async App", "expected_interval": 60}
+    )
+    app_data = response.get_json()
+
+    heartbeat_buffer.init_app(app)
+    heartbeat_buffer.start()
+    try:
+        response = client.post(f"/heartbeat/{app_data['uuid']}")
+        assert response.status_code == 200
+    finally:
+        heartbeat_buffer.stop()
+
+    assert HeartbeatEvent.query.filter_by(application_id=app_data["id"]).count() == 1
+
+
+def test_failed_flush_is_retried(client, monkeypatch):
+    """Test that a batch whose write fails is written on the next attempt."""
+    response = client.post(
+        "/api/applications", json={"name": "Retried App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+    record = HeartbeatRollups.record
+    failures = []
+
+    def fail_once(*args):
+        if not failures:
+            failures.append(True)
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return record(*args)
+
+    monkeypatch.setattr(HeartbeatRollups, "record", fail_once)
+    buffer = HeartbeatBuffer(app)
+    buffer.retry_delay = 0
+    now = datetime.now()
+    buffer.submit(app_id, now, now + timedelta(seconds=60))
+    buffer.submit(app_id, now + timedelta(seconds=1), now + timedelta(seconds=61))
+
+    assert buffer.flush() == 2
+    assert HeartbeatEvent.query.filter_by(application_id=app_id).count() == 2
+    assert buffer.get_status()["retries"] == 1
+    assert buffer.get_status()["failed"] == 0
+
+
+def test_batch_is_dropped_after_retries(client, monkeypatch):
+    """Test that a batch that keeps failing is dropped and counted."""
+    response = client.post(
+        "/api/applications", json={"name": "Failing App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+
+    def fail(*args):
+        raise OperationalError("INSERT", {}, Exception("disk I/O error"))
+
+    monkeypatch.setattr(HeartbeatRollups, "record", fail)
+    buffer = HeartbeatBuffer(app)
+    buffer.max_retries = 2
+    buffer.retry_delay = 0
+    now = datetime.now()
+    buffer.submit(app_id, now, now + timedelta(seconds=60))
+
+    assert buffer.flush() == 0
+    assert HeartbeatEvent.query.count() == 0
+    assert buffer.get_status()["retries"] == 2
+    assert buffer.get_status()["failed"] == 1
@@ -0,0 +1,85 @@
+"""Tests for the UDP/TCP heartbeat listener."""
+
+import socket
+
+import pytest
+
+from app import app
+from heartbeat_buffer import heartbeat_buffer
+from heartbeat_listener import HeartbeatListener
+from models import HeartbeatEvent
+
+
+@pytest.fixture
+def listener(client, monkeypatch):
+    """Start a listener on ephemeral UDP and TCP ports."""
+    monkeypatch.setenv("HEARTBEAT_LISTENER_HOST", "127.0.0.1")
+    monkeypatch.setenv("HEARTBEAT_UDP_PORT", "0")
+    monkeypatch.setenv("HEARTBEAT_TCP_PORT", "0")
+    monkeypatch.setenv("HEARTBEAT_LISTENER_TOKEN", "s3cret")
+
+    listener = HeartbeatListener(app)
+    listener.start()
+    yield listener
+    listener.stop()
+
+
+def test_tcp_listener_replies_per_line(listener, create_application, wait_for):
+    """Test that TCP lines are acknowledged or rejected individually."""
+    active = create_application()
+    inactive = create_application(name="Paused", is_active=False)
+
+    lines = [
+        f"{active['uuid']} s3cret",
+        f"{active['uuid']} wrong",
+        f"{inactive['uuid']} s3cret",
+        "00000000-0000-0000-0000-000000000000 s3cret",
+    ]
+    with socket.create_connection(("127.0.0.1", listener.tcp_port)) as sock:
+        sock.sendall("".join(f"{line}\n" for line in lines).encode())
+        sock.shutdown(socket.SHUT_WR)
+        replies = sock.makefile().read().splitlines()
+
+    assert replies == ["OK", "ERR unauthorized", "ERR inactive", "ERR not_found"]
+    assert wait_for(
+        lambda: HeartbeatEvent.query.filter_by(application_id=active["id"]).count()
+    )
+
+
+def test_udp_listener_records_heartbeat(listener, create_application, wait_for):
+    """Test that a UDP datagram records a heartbeat."""
+    active = create_application()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(
+            f"{active['uuid']} s3cret".encode(), ("127.0.0.1", listener.udp_port)
+        )
+
+    assert wait_for(lambda: listener.get_status()["accepted"])
+    assert wait_for(
+        lambda: HeartbeatEvent.query.filter_by(application_id=active["id"]).count()
+    )
+
+
+def test_listener_queues_heartbeats_in_the_buffer(
+    listener, create_application, wait_for
+):
+    """Test that listener heartbeats are written in batches by the buffer."""
+    active = create_application()
+    buffered = heartbeat_buffer.get_status()["buffered"]
+    assert heartbeat_buffer.running
+
+    with socket.create_connection(("127.0.0.1", listener.tcp_port)) as sock:
+        sock.sendall(f"{active['uuid']} s3cret\n".encode() * 20)
+        sock.shutdown(socket.SHUT_WR)
+        replies = sock.makefile().read().splitlines()
+
+    assert replies == ["OK"] * 20
+    assert heartbeat_buffer.get_status()["buffered"] - buffered == 20
+    assert wait_for(
+        lambda: HeartbeatEvent.query.filter_by(application_id=active["id"]).count()
+        == 20
+    )
+
+    listener.stop()
+    assert not heartbeat_buffer.running
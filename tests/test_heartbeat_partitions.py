@@ -0,0 +1,101 @@
+"""Tests for monthly heartbeat_event partitioning."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from app import app
+from application_service import ApplicationService
+from database import db
+from heartbeat_monitor import HeartbeatMonitor
+from heartbeat_partitions import heartbeat_partitions, month_start
+from models import HeartbeatEvent
+
+
+def test_postgresql_table_is_range_partitioned():
+    """Test that PostgreSQL DDL partitions by received_at."""
+    ddl = str(
+        CreateTable(HeartbeatEvent.__table__).compile(dialect=postgresql.dialect())
+    )
+    assert "PARTITION BY RANGE (received_at)" in ddl
+    assert "PRIMARY KEY (id, received_at)" in ddl
+
+
+def test_sqlite_table_keeps_rowid_primary_key():
+    """Test that SQLite DDL is unchanged by partitioning."""
+    ddl = str(CreateTable(HeartbeatEvent.__table__).compile(dialect=sqlite.dialect()))
+    assert "PARTITION" not in ddl
+    assert "PRIMARY KEY (id)," in ddl
+
+
+def test_month_start():
+    """Test month arithmetic across year boundaries."""
+    moment = datetime(2024, 11, 15, 8, 30)
+    assert month_start(moment) == datetime(2024, 11, 1)
+    assert month_start(moment, 2) == datetime(2025, 1, 1)
+    assert month_start(moment, -11) == datetime(2023, 12, 1)
+
+
+def test_cleanup_deletes_rows_without_partitions(client):
+    """Test that retention falls back to row deletes on SQLite."""
+    response = client.post(
+        "/api/applications", json={"name": "Old App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+    now = datetime.now()
+    db.session.add_all(
+        [
+            HeartbeatEvent(application_id=app_id, received_at=now - timedelta(days=40)),
+            HeartbeatEvent(application_id=app_id, received_at=now),
+        ]
+    )
+    db.session.commit()
+
+    assert not heartbeat_partitions.enabled()
+    assert heartbeat_partitions.ensure() == 0
+    assert ApplicationService.cleanup_old_heartbeat_events(30) == 1
+    assert HeartbeatEvent.query.count() == 1
+
+
+def test_drop_before_estimates_rows_instead_of_counting(monkeypatch):
+    """Test that dropping a partition does not scan it to count its rows."""
+    executed = []
+
+    class Result:
+        def scalar(self):
+            return 1200
+
+    def execute(statement, parameters=None):
+        executed.append(str(statement))
+        return Result()
+
+    monkeypatch.setattr(
+        heartbeat_partitions,
+        "expired",
+        lambda cutoff: [("heartbeat_event_p202401", None, None)],
+    )
+    monkeypatch.setattr(db.session, "execute", execute)
+
+    assert heartbeat_partitions.drop_before(datetime(2024, 3, 1)) == 1200
+    assert not [statement for statement in executed if "count(" in statement]
+    assert "reltuples" in executed[0]
+    assert executed[1] == "DROP TABLE heartbeat_event_p202401"
+
+
+def test_monitor_schedules_partitions_without_retention(client, monkeypatch):
+    """Test that upcoming partitions are created even with retention off."""
+    monitor = HeartbeatMonitor(app)
+    monkeypatch.setattr(monitor.retention, "days_to_keep", 0)
+    ensured = []
+    monkeypatch.setattr(heartbeat_partitions, "ensure", lambda: ensured.append(1))
+
+    monitor.start()
+    try:
+        status = monitor.get_status()
+        assert status["partitions_scheduled"]
+        assert not status["retention_scheduled"]
+        monitor._ensure_partitions()
+        assert ensured == [1]
+    finally:
+        monitor.stop()
@@ -0,0 +1,90 @@
+"""Tests for the batched heartbeat retention job."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import app
+from database import db
+from heartbeat_monitor import HeartbeatMonitor
+from heartbeat_retention import HeartbeatRetention
+from models import HeartbeatEvent
+
+
+@pytest.fixture
+def retention():
+    retention = HeartbeatRetention()
+    retention.batch_size = 10
+    retention.pause = 0
+    return retention
+
+
+def _seed(client, old, new):
+    response = client.post(
+        "/api/applications", json={"name": "Retained App", "expected_interval": 60}
+    )
+    app_id = response.get_json()["id"]
+    now = datetime.now()
+    db.session.execute(
+        insert(HeartbeatEvent),
+        [
+            {"application_id": app_id, "received_at": now - timedelta(days=60)}
+            for _ in range(old)
+        ]
+        + [{"application_id": app_id, "received_at": now} for _ in range(new)],
+    )
+    db.session.commit()
+
+
+def test_run_deletes_expired_events_in_batches(client, retention):
+    """Test that expired events go in primary-key batches, newer ones stay."""
+    _seed(client, old=25, new=5)
+
+    assert retention.run(30) == 25
+    assert HeartbeatEvent.query.count() == 5
+
+    status = retention.get_status()
+    assert status["last_run_batches"] == 3
+    assert status["batches"] == 3
+    assert status["resume_after_id"] is None
+    assert status["last_rows_per_second"] > 0
+    assert status["max_lock_seconds"] > 0
+
+    assert retention.run(30) == 0
+
+
+def test_run_resumes_where_it_stopped(client, retention):
+    """Test that a run cut short continues from the same id."""
+    _seed(client, old=25, new=5)
+    retention.max_runtime = 0
+
+    assert retention.run(30) == 10
+    assert retention.get_status()["resume_after_id"] == 10
+    assert retention.run(30) == 10
+    assert retention.run(30) == 5
+    assert retention.run(30) == 0
+    assert retention.get_status()["resume_after_id"] is None
+    assert HeartbeatEvent.query.count() == 5
+
+
+def test_run_rejects_non_positive_days(client, retention):
+    """Test that retention refuses to delete everything."""
+    with pytest.raises(ValueError):
+        retention.run(0)
+
+
+def test_retention_is_disabled_by_default(client, monkeypatch):
+    """Test that upgraded installs keep their history unless configured."""
+    monkeypatch.delenv("HEARTBEAT_RETENTION_DAYS", raising=False)
+    _seed(client, old=3, new=1)
+    monitor = HeartbeatMonitor(app)
+    monitor.retention = HeartbeatRetention()
+    assert monitor.retention.days_to_keep == 0
+
+    monitor.start()
+    try:
+        assert not monitor.get_status()["retention_scheduled"]
+    finally:
+        monitor.stop()
+    assert HeartbeatEvent.query.count() == 4
@@ -0,0 +1,105 @@
+"""Tests for the per-minute and per-hour heartbeat rollups."""
+
+from datetime import datetime, timedelta
+
+from application_service import ApplicationService
+from database import db
+from heartbeat_rollups import HOUR, MINUTE, HeartbeatRollups
+from models import HeartbeatRollup
+
+
+def test_batches_update_minute_and_hour_rollups(create_application, send_heartbeats):
+    """Test that ingest upserts counts, first/last seen and gaps."""
+    app_data = create_application()
+    start = datetime(2024, 1, 1, 12, 59, 0)
+    send_heartbeats(app_data["uuid"], [start, start + timedelta(seconds=30)])
+    send_heartbeats(app_data["uuid"], [start + timedelta(minutes=3)])
+
+    rollups = {
+        (rollup.resolution, rollup.bucket_start): rollup
+        for rollup in HeartbeatRollup.query.filter_by(application_id=app_data["id"])
+    }
+    assert set(rollups) == {
+        (MINUTE, datetime(2024, 1, 1, 12, 59)),
+        (MINUTE, datetime(2024, 1, 1, 13, 2)),
+        (HOUR, datetime(2024, 1, 1, 12)),
+        (HOUR, datetime(2024, 1, 1, 13)),
+    }
+
+    hour = rollups[(HOUR, datetime(2024, 1, 1, 12))]
+    assert hour.heartbeats == 2
+    assert hour.first_seen == start
+    assert hour.last_seen == start + timedelta(seconds=30)
+    assert hour.max_gap == 30
+    assert rollups[(HOUR, datetime(2024, 1, 1, 13))].max_gap == 150
+
+    assert HeartbeatRollups.count(application_id=app_data["id"]) == 3
+    assert HeartbeatRollups.count(start + timedelta(seconds=30), application_id=0) == 0
+    assert (
+        HeartbeatRollups.count(
+            datetime(2024, 1, 1, 12, 30), datetime(2024, 1, 1, 13, 1)
+        )
+        == 2
+    )
+
+
+def test_count_combines_hours_and_edge_minutes(create_application, send_heartbeats):
+    """Test that ranges are exact to the minute across hour boundaries."""
+    app_data = create_application()
+    start = datetime(2024, 1, 1, 10, 0, 0)
+    send_heartbeats(
+        app_data["uuid"],
+        [start + timedelta(minutes=minute) for minute in range(0, 180, 10)],
+    )
+
+    assert HeartbeatRollups.count(start, start + timedelta(hours=3)) == 18
+    assert HeartbeatRollups.count(start + timedelta(minutes=25)) == 15
+    assert (
+        HeartbeatRollups.count(
+            start + timedelta(minutes=5), start + timedelta(minutes=135)
+        )
+        == 13
+    )
+    assert (
+        HeartbeatRollups.count(
+            start + timedelta(minutes=61), start + timedelta(minutes=79)
+        )
+        == 1
+    )
+
+
+def test_single_heartbeat_gap_measured_from_last_heartbeat(client, create_application):
+    """Test that the unbatched path measures gaps inside the upsert."""
+    app_data = create_application()
+    client.post(f"/heartbeat/{app_data['uuid']}")
+    client.post(f"/heartbeat/{app_data['uuid']}")
+
+    status = ApplicationService.get_application_status(app_data["id"])
+    assert status["total_heartbeats"] == 2
+    assert status["recent_heartbeats_24h"] == 2
+    assert 0 < status["longest_gap_seconds"] < 60
+    assert status["first_heartbeat"] is not None
+
+
+def test_backfill_matches_ingest(create_application, send_heartbeats):
+    """Test that rollups rebuilt from events match those kept at ingest."""
+    app_data = create_application()
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    send_heartbeats(
+        app_data["uuid"],
+        [start + timedelta(seconds=seconds) for seconds in (0, 45, 400, 4000, 4010)],
+    )
+
+    def snapshot():
+        return sorted(
+            (r.resolution, r.bucket_start, r.heartbeats, r.max_gap)
+            for r in HeartbeatRollup.query.all()
+        )
+
+    expected = snapshot()
+    assert HeartbeatRollups.backfill() == 0
+
+    HeartbeatRollup.query.delete()
+    db.session.commit()
+    assert HeartbeatRollups.backfill() == 5
+    assert snapshot() == expected
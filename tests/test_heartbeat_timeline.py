@@ -0,0 +1,180 @@
+"""Tests for compact per-application per-day heartbeat timelines."""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import app
+from database import db
+from heartbeat_buffer import HeartbeatBuffer
+from heartbeat_retention import HeartbeatRetention
+from heartbeat_timeline import decode, encode, heartbeat_timeline
+from models import HeartbeatEvent, HeartbeatTimeline
+
+
+@pytest.fixture(autouse=True)
+def timeline_storage(monkeypatch):
+    """Store heartbeats as timelines."""
+    monkeypatch.setattr(heartbeat_timeline, "enabled", True)
+
+
+def test_encode_round_trips_late_heartbeats():
+    """Test that deltas survive out-of-order appends."""
+    offsets = [0, 10, 20, 15, 86399, 3]
+    data = encode(offsets[:3]) + encode(offsets[3:], previous=20)
+    assert decode(data) == offsets
+    assert len(encode(range(0, 3600, 10))) == 360
+
+
+def test_ingest_appends_to_day_timelines(client, create_application, send_heartbeats):
+    """Test that heartbeats are appended to timelines, not event rows."""
+    app_data = create_application()
+    start = datetime(2024, 5, 1, 23, 59, 40)
+    send_heartbeats(
+        app_data["uuid"], [start + timedelta(seconds=10 * i) for i in range(3)]
+    )
+    send_heartbeats(app_data["uuid"], [start + timedelta(seconds=30)])
+    client.post(f"/heartbeat/{app_data['uuid']}")
+
+    assert HeartbeatEvent.query.count() == 0
+    timelines = {t.day.isoformat(): t for t in HeartbeatTimeline.query.all()}
+    assert timelines["2024-05-01"].heartbeats == 2
+    assert timelines["2024-05-02"].heartbeats == 2
+    assert len(timelines["2024-05-02"].data) == 2
+    assert heartbeat_timeline.total(app_data["id"]) == 5
+
+
+def test_history_pages_across_days(client, create_application, send_heartbeats):
+    """Test that cursor pagination decodes timelines transparently."""
+    app_data = create_application()
+    start = datetime(2024, 5, 1, 23, 59, 30)
+    send_heartbeats(
+        app_data["uuid"], [start + timedelta(seconds=15 * i) for i in range(5)]
+    )
+    url = f"/api/applications/{app_data['id']}/heartbeats"
+
+    first = client.get(f"{url}?limit=2").get_json()
+    assert first["total"] == 5
+    assert [h["received_at"] for h in first["heartbeats"]] == [
+        "2024-05-02T00:00:30",
+        "2024-05-02T00:00:15",
+    ]
+
+    second = client.get(f"{url}?limit=2&before={first['next_cursor']}").get_json()
+    assert [h["received_at"] for h in second["heartbeats"]] == [
+        "2024-05-02T00:00:00",
+        "2024-05-01T23:59:45",
+    ]
+
+    newer = client.get(f"{url}?limit=2&after={second['prev_cursor']}").get_json()
+    assert newer["heartbeats"] == first["heartbeats"]
+
+    recent = client.get(f"/api/applications/{app_data['id']}").get_json()
+    assert len(recent["recent_heartbeats"]) == 5
+    assert client.get("/").status_code == 200
+
+
+def test_history_serves_offset_pages(client, create_application, send_heartbeats):
+    """Test that ?page= pages through timelines like event rows."""
+    app_data = create_application()
+    start = datetime(2024, 5, 1, 23, 59, 30)
+    send_heartbeats(
+        app_data["uuid"], [start + timedelta(seconds=15 * i) for i in range(5)]
+    )
+    url = f"/api/applications/{app_data['id']}/heartbeats"
+
+    second = client.get(f"{url}?page=2&per_page=2").get_json()
+    assert (second["total"], second["pages"], second["current_page"]) == (5, 3, 2)
+    assert [h["received_at"] for h in second["heartbeats"]] == [
+        "2024-05-02T00:00:00",
+        "2024-05-01T23:59:45",
+    ]
+    assert len(client.get(url).get_json()["heartbeats"]) == 5
+
+
+def test_existing_events_move_to_timelines(client, create_application):
+    """Test that events stored before switching storage stay in history."""
+    app_data = create_application()
+    start = datetime(2024, 5, 1, 23, 59, 0)
+    db.session.execute(
+        insert(HeartbeatEvent),
+        [
+            {
+                "application_id": app_data["id"],
+                "received_at": start + timedelta(seconds=30 * i),
+            }
+            for i in range(5)
+        ],
+    )
+    db.session.commit()
+
+    assert heartbeat_timeline.migrate_events(batch_size=2) == 5
+    assert HeartbeatEvent.query.count() == 0
+    assert heartbeat_timeline.total(app_data["id"]) == 5
+    assert heartbeat_timeline.migrate_events() == 0
+
+    history = client.get(f"/api/applications/{app_data['id']}/heartbeats")
+    assert [h["received_at"] for h in history.get_json()["heartbeats"]] == [
+        (start + timedelta(seconds=30 * i)).isoformat() for i in reversed(range(5))
+    ]
+
+
+def test_export_merges_applications_by_time(
+    client, create_application, send_heartbeats
+):
+    """Test that exports interleave every application's timeline."""
+    apps = [create_application(name) for name in ("First", "Second")]
+    start = datetime(2024, 5, 1, 12, 0, 0)
+    send_heartbeats(apps[0]["uuid"], [start, start + timedelta(seconds=20)])
+    send_heartbeats(apps[1]["uuid"], [start + timedelta(seconds=10)])
+
+    response = client.get(
+        "/api/heartbeats/export?start=2024-05-01T00:00:00&end=2024-05-02T00:00:00"
+    )
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row["application_id"], row["received_at"]) for row in rows] == [
+        (apps[0]["id"], "2024-05-01T12:00:00"),
+        (apps[1]["id"], "2024-05-01T12:00:10"),
+        (apps[0]["id"], "2024-05-01T12:00:20"),
+    ]
+
+
+def test_retention_expires_whole_days(create_application, send_heartbeats):
+    """Test that retention deletes timelines for days past the cutoff."""
+    app_data = create_application()
+    now = datetime.now()
+    send_heartbeats(
+        app_data["uuid"],
+        [now - timedelta(days=40), now - timedelta(days=39), now],
+    )
+
+    retention = HeartbeatRetention()
+    retention.pause = 0
+    assert retention.run(30) == 2
+    assert heartbeat_timeline.total(app_data["id"]) == 1
+
+
+def test_timeline_storage_runs_the_buffer(create_application, monkeypatch):
+    """Test that timelines turn on the buffer and append a batch at a time."""
+    monkeypatch.delenv("HEARTBEAT_BUFFER_ENABLED", raising=False)
+    buffer = HeartbeatBuffer(app)
+    assert buffer.enabled
+
+    app_data = create_application()
+    appends = []
+    append = heartbeat_timeline.append
+    monkeypatch.setattr(
+        heartbeat_timeline,
+        "append",
+        lambda events: appends.append(len(events)) or append(events),
+    )
+    start = datetime(2024, 5, 1, 12, 0, 0)
+    for second in range(30):
+        received_at = start + timedelta(seconds=second)
+        buffer.submit(app_data["id"], received_at, received_at + timedelta(minutes=1))
+
+    assert buffer.flush() == 30
+    assert appends == [30]
+    assert heartbeat_timeline.total(app_data["id"]) == 30
@@ -0,0 +1,88 @@
+"""Tests for coordinating several heartbeat monitors through the database."""
+
+from datetime import datetime, timedelta
+
+from database import db
+from deadline_index import DeadlineIndex
+from models import MonitorInstance
+from monitor_coordinator import MonitorCoordinator
+
+
+def test_leader_mode_fails_over(client):
+    """Test that a standby monitor takes over once the leader releases."""
+    first = MonitorCoordinator("leader", instance_id="first")
+    second = MonitorCoordinator("leader", instance_id="second")
+    second.started_at = first.started_at + timedelta(seconds=1)
+
+    assert first.renew() == (0, 1)
+    assert second.renew() is None
+
+    first.release()
+    assert second.renew() == (0, 1)
+
+
+def test_leader_mode_expires_stale_lease(client):
+    """Test that a leader which stops renewing loses its lease."""
+    first = MonitorCoordinator("leader", instance_id="first")
+    second = MonitorCoordinator("leader", instance_id="second")
+    second.started_at = first.started_at + timedelta(seconds=1)
+    first.renew()
+
+    db.session.get(MonitorInstance, "first").expires_at = (
+        MonitorCoordinator._database_now() - timedelta(seconds=1)
+    )
+    db.session.commit()
+
+    assert second.renew() == (0, 1)
+    assert db.session.get(MonitorInstance, "first") is None
+
+
+def test_leases_ignore_host_clock_skew(client, monkeypatch):
+    """Test that a host with a fast clock does not take over a live lease."""
+    first = MonitorCoordinator("leader", instance_id="first")
+    second = MonitorCoordinator("leader", instance_id="second")
+    second.started_at = first.started_at + timedelta(seconds=1)
+    assert first.renew() == (0, 1)
+
+    class FastClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(hours=2)
+
+    monkeypatch.setattr("monitor_coordinator.datetime", FastClock)
+    assert second.renew() is None
+    assert db.session.get(MonitorInstance, "first") is not None
+
+
+def test_renew_survives_losing_its_lease(client):
+    """Test that a lease expired under a renewing instance is not a crash."""
+    coordinator = MonitorCoordinator("leader", instance_id="late")
+    coordinator.lease_seconds = -5
+
+    assert coordinator.renew() is None
+
+
+def test_sharded_mode_splits_applications(client):
+    """Test that live instances get distinct shards."""
+    first = MonitorCoordinator("sharded", instance_id="first")
+    second = MonitorCoordinator("sharded", instance_id="second")
+    second.started_at = first.started_at + timedelta(seconds=1)
+
+    assert first.renew() == (0, 1)
+    assert second.renew() == (1, 2)
+    assert first.renew() == (0, 2)
+
+
+def test_deadline_index_ignores_other_shards():
+    """Test that the deadline index only tracks applications it owns."""
+    index = DeadlineIndex()
+    index.activate(owns=lambda app_id: app_id % 2 == 0)
+    now = datetime.now()
+
+    index.schedule(1, now)
+    index.schedule(2, now)
+    index.touch(3, now)
+
+    assert index.get_deadline(1) is None
+    assert index.get_deadline(2) == now
+    assert index.get_deadline(3) is None
@@ -0,0 +1,50 @@
+"""Tests for the alert plugin instance cache."""
+
+from alert_manager import PluginCache, plugin_cache
+from alert_plugins.slack_plugin import SlackAlertPlugin
+from database import db
+from models import Application, ApplicationAlertConfig
+
+
+def test_plugins_are_reused_per_configuration():
+    """Test cache hits for equal configs and LRU eviction."""
+    cache = PluginCache(max_size=2)
+    first = {"webhook_url": "https://hooks.example.com/a", "channel": "#ops"}
+
+    plugin = cache.get("slack", SlackAlertPlugin, first)
+    assert cache.get("slack", SlackAlertPlugin, dict(reversed(first.items()))) is plugin
+
+    cache.get("slack", SlackAlertPlugin, {"webhook_url": "https://hooks.example.com/b"})
+    cache.get("slack", SlackAlertPlugin, {"webhook_url": "https://hooks.example.com/c"})
+    assert cache.get("slack", SlackAlertPlugin, first) is not plugin
+
+    status = cache.get_status()
+    assert status["hits"] == 1
+    assert status["misses"] == 4
+    assert status["evictions"] == 2
+
+
+def test_changed_alert_config_is_invalidated(client):
+    """Test that editing or deleting an alert config drops its cached plugin."""
+    application = Application(name="Cached App", expected_interval=60)
+    db.session.add(application)
+    db.session.commit()
+
+    configuration = {"webhook_url": "https://hooks.example.com/a"}
+    alert_config = ApplicationAlertConfig(
+        application_id=application.id, alert_type="slack", configuration=configuration
+    )
+    db.session.add(alert_config)
+    db.session.commit()
+
+    plugin_cache.clear()
+    plugin = plugin_cache.get("slack", SlackAlertPlugin, configuration)
+
+    alert_config.configuration = {"webhook_url": "https://hooks.example.com/b"}
+    db.session.commit()
+    assert plugin_cache.get("slack", SlackAlertPlugin, configuration) is not plugin
+
+    plugin_cache.get("slack", SlackAlertPlugin, alert_config.configuration)
+    db.session.delete(alert_config)
+    db.session.commit()
+    assert plugin_cache.get_status()["size"] == 1
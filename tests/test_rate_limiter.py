@@ -0,0 +1,26 @@
+"""Tests for outbound alert rate limiting."""
+
+from rate_limiter import RateLimiter
+
+
+def test_bucket_allows_burst_then_waits(monkeypatch):
+    """Test that a destination may burst and is then paced."""
+    monkeypatch.setenv("ALERT_RATE_LIMIT_SLACK", "2")
+    monkeypatch.setenv("ALERT_RATE_BURST_SLACK", "2")
+    limiter = RateLimiter()
+
+    assert limiter.try_acquire("slack", "hook-a") == 0
+    assert limiter.try_acquire("slack", "hook-a") == 0
+    assert 0.4 < limiter.try_acquire("slack", "hook-a") <= 0.5
+
+    # Other destinations have their own bucket
+    assert limiter.try_acquire("slack", "hook-b") == 0
+
+
+def test_zero_rate_disables_limit(monkeypatch):
+    """Test that a rate of 0 leaves an alert type unlimited."""
+    monkeypatch.setenv("ALERT_RATE_LIMIT_SMS", "0")
+    limiter = RateLimiter()
+
+    assert all(limiter.try_acquire("sms", "+15550100") == 0 for _ in range(10))
+    assert limiter.try_acquire("custom", "anywhere") == 0
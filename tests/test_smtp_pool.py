@@ -0,0 +1,141 @@
+"""Tests for pooled SMTP connections in the email alert plugin."""
+
+import smtplib
+import socketserver
+import threading
+from datetime import datetime
+from email.message import EmailMessage
+from types import SimpleNamespace
+
+import pytest
+
+from alert_plugins import email_plugin
+from alert_plugins.email_plugin import EmailAlertPlugin
+from alert_plugins.smtp_pool import SMTPConnectionPool
+
+APPLICATION = SimpleNamespace(
+    id=1, name="Test App", uuid="abc", expected_interval=60, grace_period=0
+)
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to log in, send messages and answer NOOP."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost ESMTP")
+
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+
+            if command.startswith("EHLO"):
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command.startswith("AUTH"):
+                server.logins += 1
+                self.reply("235 Authenticated")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                server.messages += 1
+                self.reply("250 Queued")
+                if server.drop_after_message:
+                    return
+            elif command.startswith("RCPT") and server.reject_recipients:
+                self.reply("550 No such user")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """Run a local SMTP stand-in and skip STARTTLS against it."""
+    monkeypatch.setattr(smtplib.SMTP, "starttls", lambda self: (220, b"Ready"))
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StubSMTPHandler)
+    server.daemon_threads = True
+    server.connections = server.logins = server.messages = 0
+    server.drop_after_message = False
+    server.reject_recipients = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    pool = SMTPConnectionPool()
+    monkeypatch.setattr(email_plugin, "smtp_pool", pool)
+    server.pool = pool
+
+    yield server
+
+    pool.close_all()
+    server.shutdown()
+    server.server_close()
+
+
+def make_plugin(server):
+    return EmailAlertPlugin(
+        {
+            "to_email": "admin@example.com",
+            "smtp_server": "127.0.0.1",
+            "smtp_port": server.server_address[1],
+            "username": "alerts",
+            "password": "secret",
+        }
+    )
+
+
+def test_alert_burst_shares_one_session(smtp_server):
+    """Test that many alerts reuse one authenticated connection."""
+    plugin = make_plugin(smtp_server)
+
+    for _ in range(5):
+        plugin.send_failure_alert(APPLICATION, {"checked_at": datetime.now()})
+
+    assert smtp_server.messages == 5
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == 1
+    assert smtp_server.pool.get_status()["reused"] == 4
+
+
+def test_dropped_connection_is_replaced(smtp_server):
+    """Test that a connection closed by the server is detected and reopened."""
+    plugin = make_plugin(smtp_server)
+    smtp_server.drop_after_message = True
+
+    plugin.send_failure_alert(APPLICATION, {"checked_at": datetime.now()})
+    plugin.send_failure_alert(APPLICATION, {"checked_at": datetime.now()})
+
+    assert smtp_server.messages == 2
+    assert smtp_server.connections == 2
+    assert smtp_server.pool.get_status()["discarded"] == 1
+
+
+def test_rejected_message_keeps_connection_and_is_not_resent(smtp_server):
+    """Test that a server rejection is raised once and the session reused."""
+    smtp_server.reject_recipients = True
+    message = EmailMessage()
+    message["From"] = "alerts@example.com"
+    message["To"] = "nobody@example.com"
+    message.set_content("Heartbeat missed")
+    port = smtp_server.server_address[1]
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        smtp_server.pool.send_message(message, "127.0.0.1", port, "alerts", "secret")
+
+    status = smtp_server.pool.get_status()
+    assert (status["opened"], status["discarded"], status["idle"]) == (1, 0, 1)
+    assert smtp_server.logins == 1
+
+    # The returned connection is reused rather than opening another
+    smtp_server.reject_recipients = False
+    smtp_server.pool.send_message(message, "127.0.0.1", port, "alerts", "secret")
+    assert smtp_server.messages == 1
+    assert smtp_server.connections == 1
@@ -0,0 +1,105 @@
+"""Tests for SQLite production mode."""
+
+import threading
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import OperationalError
+
+from database import READER_BIND, db
+from models import Application, HeartbeatEvent
+from sqlite_engine import SQLiteEngine
+
+
+@pytest.fixture
+def production_app(tmp_path):
+    """Create an app on an SQLite file in production mode."""
+    engine = SQLiteEngine()
+    engine.enabled = True
+    engine.busy_timeout = 2000
+
+    production_app = Flask(__name__, instance_path=str(tmp_path))
+    production_app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///production.db"
+    assert engine.configure(production_app)
+    db.init_app(production_app)
+
+    with production_app.app_context():
+        db.create_all()
+        yield production_app, engine
+        db.session.remove()
+        for bind in db.engines.values():
+            bind.dispose()
+
+
+def test_connections_use_wal_and_tuned_pragmas(production_app):
+    """Test that the writer and readers are opened with production settings."""
+    _, engine = production_app
+    with db.engines[None].connect() as writer:
+        assert writer.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert writer.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert writer.execute(text("PRAGMA busy_timeout")).scalar() == 2000
+
+    with db.engines[READER_BIND].connect() as reader:
+        assert reader.execute(text("PRAGMA mmap_size")).scalar() == engine.mmap_size
+        with pytest.raises(OperationalError, match="readonly"):
+            reader.execute(text("DELETE FROM application"))
+
+    assert engine.path.endswith("production.db")
+    assert engine.get_status()["read_pool_size"] == engine.read_pool_size
+
+
+def test_reads_use_readers_until_the_session_writes(production_app):
+    """Test that sessions route reads to readers and writes to the writer."""
+    query = select(Application)
+    assert db.session.get_bind(clause=query) is db.engines[READER_BIND]
+    assert db.session.get_bind(clause=query.with_for_update()) is db.engines[None]
+
+    db.session.add(Application(name="Routed", uuid="routed", expected_interval=60))
+    assert db.session.execute(select(func.count(Application.id))).scalar() == 1
+    assert db.session.get_bind(clause=query) is db.engines[None]
+
+    db.session.commit()
+    assert db.session.get_bind(clause=query) is db.engines[READER_BIND]
+    assert Application.query.one().name == "Routed"
+
+
+def test_concurrent_writers_do_not_hit_locks(production_app):
+    """Test that many threads can write at once without lock errors."""
+    flask_app, _ = production_app
+    application = Application(name="Busy", uuid="busy", expected_interval=60)
+    db.session.add(application)
+    db.session.commit()
+    application_id = application.id
+    errors = []
+
+    def write():
+        with flask_app.app_context():
+            try:
+                for _ in range(20):
+                    # Read first, so each transaction upgrades to a write
+                    db.session.get(Application, application_id)
+                    db.session.execute(
+                        insert(HeartbeatEvent),
+                        [
+                            {
+                                "application_id": application_id,
+                                "received_at": datetime.now(),
+                            }
+                        ],
+                    )
+                    db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert HeartbeatEvent.query.count() == 160
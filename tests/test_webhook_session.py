@@ -0,0 +1,121 @@
+"""Tests for the pooled HTTP session used by the webhook alert plugins."""
+
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from alert_plugins import discord_plugin, slack_plugin
+from alert_plugins.discord_plugin import DiscordAlertPlugin
+from alert_plugins.http_session import WebhookSession
+from alert_plugins.slack_plugin import SlackAlertPlugin
+
+APPLICATION = SimpleNamespace(
+    id=1, name="Test App", uuid="abc", expected_interval=60, grace_period=0
+)
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """Keep-alive webhook stand-in that can fail a few times first."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+
+        status, retry_after = 200, None
+        if self.server.unavailable > 0:
+            self.server.unavailable -= 1
+            status, retry_after = self.server.error_status, self.server.retry_after
+
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def webhook_server(monkeypatch):
+    """Run a local webhook stand-in and give the plugins a fresh session."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWebhookHandler)
+    server.daemon_threads = True
+    server.connections = server.requests = server.unavailable = 0
+    server.error_status, server.retry_after = 503, None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    session = WebhookSession()
+    monkeypatch.setattr(slack_plugin, "webhook_session", session)
+    monkeypatch.setattr(discord_plugin, "webhook_session", session)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+
+    yield server
+
+    session.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_alert_burst_reuses_connection(webhook_server):
+    """Test that Slack and Discord alerts to one host share a connection."""
+    slack = SlackAlertPlugin({"webhook_url": webhook_server.url})
+    discord = DiscordAlertPlugin({"webhook_url": webhook_server.url})
+
+    for _ in range(5):
+        slack.send_failure_alert(APPLICATION, {"checked_at": datetime.now()})
+        discord.send_failure_alert(APPLICATION, {"checked_at": datetime.now()})
+
+    assert webhook_server.requests == 10
+    assert webhook_server.connections == 1
+
+
+def test_throttled_webhook_is_retried(webhook_server):
+    """Test that a 429 response is retried before the alert fails."""
+    webhook_server.unavailable = 1
+    webhook_server.error_status = 429
+    slack = SlackAlertPlugin({"webhook_url": webhook_server.url})
+
+    slack.send_recovery_alert(APPLICATION, {"recovered_at": datetime.now()})
+
+    assert webhook_server.requests == 2
+
+
+def test_server_errors_are_not_resent(webhook_server):
+    """Test that a 503 fails the alert at once, leaving retries to the outbox."""
+    webhook_server.unavailable = 1
+    slack = SlackAlertPlugin({"webhook_url": webhook_server.url})
+
+    with pytest.raises(requests.HTTPError):
+        slack.send_recovery_alert(APPLICATION, {"recovered_at": datetime.now()})
+
+    assert webhook_server.requests == 1
+
+
+def test_retry_after_is_capped(webhook_server, monkeypatch):
+    """Test that a long Retry-After does not stall the alert worker."""
+    monkeypatch.setenv("HTTP_MAX_RETRY_AFTER", "0.2")
+    session = WebhookSession()
+    monkeypatch.setattr(slack_plugin, "webhook_session", session)
+    webhook_server.unavailable = 1
+    webhook_server.error_status, webhook_server.retry_after = 429, "3600"
+    slack = SlackAlertPlugin({"webhook_url": webhook_server.url})
+
+    started = time.monotonic()
+    slack.send_recovery_alert(APPLICATION, {"recovered_at": datetime.now()})
+    session.close()
+
+    assert webhook_server.requests == 2
+    assert time.monotonic() - started < 5